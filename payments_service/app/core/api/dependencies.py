@@ -1,7 +1,6 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 import redis
+import redis.asyncio
 
 from payments_service.app.core.repositories.merchant_repository import MerchantRepository
 from payments_service.app.core.repositories.customer_repository import CustomerRepository
@@ -9,13 +8,21 @@ from payments_service.app.core.repositories.payment_repository import PaymentRep
 from payments_service.app.core.services.merchant_service import MerchantService
 from payments_service.app.core.services.customer_service import CustomerService
 from payments_service.app.core.services.payment_service import PaymentService
+from payments_service.app.core.services.hedging import HedgingPolicy
 from payments_service.app.core.repositories.subscription_repository import SubscriptionRepository
 from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.repositories.precalculated_route_cache import PrecalculatedRouteCache
 from payments_service.app.core.repositories.metadata_repository import CardBINRepository, InterchangeFeeRepository
+from payments_service.app.core.repositories.database import create_db_engine, create_session_factory
+from payments_service.app.core.repositories.migrations import check_schema_version
+from payments_service.app.core.utils.cache import TTLCache
 
-from payments_service.app.routing.preprocessing import RoutingService, FeeService
+from payments_service.app.routing.preprocessing import RoutingService, FeeService, CompiledRoutingTable, ProviderHealthCache
 from payments_service.app.routing.decisioning import RoutingPerformanceRepository, StaticAggregationStrategy
+from payments_service.app.routing.decisioning.repository import redis_performance_store
 from payments_service.app.routing.decisioning.decision_strategies import PlannerRoutingStrategy, DeterministicLeastCostStrategy
+from payments_service.app.routing.decisioning.decision_cache import DecisionCache
+from payments_service.app.routing.decisioning.latency_budget import BudgetedDecisionStrategy, RoutingLatencyBudget
 from payments_service.app.routing.ingestion import DataIngestor
 
 from payments_service.app.processors.adapters.stripe_adapter import StripeProcessor
@@ -49,17 +56,19 @@ REDIS_URL = os.getenv("REDIS_URL")
 # --- Storage Layer Setup ---
 
 if DATABASE_URL:
-    engine = create_engine(DATABASE_URL)
-    Base.metadata.create_all(bind=engine)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db_session = SessionLocal()
+    engine = create_db_engine(DATABASE_URL)
+    # Schema changes are applied by scripts/migrate.py (start.sh via seed_local.py), never by the API
+    check_schema_version(engine)
+    # Stores check a session out of the pool per unit of work, so concurrent
+    # requests never share one
+    SessionLocal = create_session_factory(engine)
     
     # Bridge between SQLAlchemy and Pydantic
-    merchant_store = PostgresRelationalStore(db_session, MerchantORM, Merchant)
-    customer_store = PostgresRelationalStore(db_session, CustomerORM, Customer)
-    payment_store = PostgresRelationalStore(db_session, PaymentORM, Payment)
-    card_bin_store = PostgresRelationalStore(db_session, CardBINORM, CardBIN)
-    interchange_fee_store = PostgresRelationalStore(db_session, InterchangeFeeORM, InterchangeFee)
+    merchant_store = PostgresRelationalStore(SessionLocal, MerchantORM, Merchant)
+    customer_store = PostgresRelationalStore(SessionLocal, CustomerORM, Customer)
+    payment_store = PostgresRelationalStore(SessionLocal, PaymentORM, Payment)
+    card_bin_store = PostgresRelationalStore(SessionLocal, CardBINORM, CardBIN)
+    interchange_fee_store = PostgresRelationalStore(SessionLocal, InterchangeFeeORM, InterchangeFee)
 else:
     merchant_store = InMemoryRelationalStore()
     customer_store = InMemoryRelationalStore()
@@ -68,12 +77,17 @@ else:
     interchange_fee_store = InMemoryRelationalStore()
 
 redis_client = None
+async_redis_client = None
 if REDIS_URL:
     redis_client = redis.from_url(REDIS_URL)
+    # Used by the async charge path when the provider health view has gone stale
+    async_redis_client = redis.asyncio.from_url(REDIS_URL)
     # The store expects a model_class for validation. 
     # For List[ProviderPerformance], we'll need a wrapper or just use JSON.
     # RoutingPerformanceRepository uses KeyValueStore[List[ProviderPerformance]]
-    intelligence_store = RedisKeyValueStore(redis_client, list) 
+    # One hash per dimension (provider -> record) so single-provider updates don't rewrite the list
+    # Keys from before the namespace are converted by scripts/migrate.py
+    intelligence_store = redis_performance_store(redis_client)
 else:
     intelligence_store = InMemoryKeyValueStore()
 
@@ -82,9 +96,23 @@ else:
 merchant_repo = MerchantRepository(merchant_store)
 customer_repo = CustomerRepository(customer_store)
 payment_repo = PaymentRepository(payment_store)
-performance_repo = RoutingPerformanceRepository(intelligence_store)
-subscription_repo = SubscriptionRepository(db_session) if DATABASE_URL else None
-precalc_repo = PrecalculatedRouteRepository(db_session) if DATABASE_URL else None
+if redis_client:
+    # Serve hot dimensions from memory; other nodes' writes arrive via pub/sub
+    performance_repo = RoutingPerformanceRepository(
+        intelligence_store,
+        cache=TTLCache(
+            maxsize=int(os.getenv("PERFORMANCE_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("PERFORMANCE_CACHE_TTL_SECONDS", "30"))
+        ),
+        pubsub_client=redis_client
+    )
+    performance_repo.start_invalidation_listener()
+else:
+    performance_repo = RoutingPerformanceRepository(intelligence_store)
+subscription_repo = SubscriptionRepository(SessionLocal) if DATABASE_URL else None
+# Renewal charges resolve their route from memory/Redis; the renewal worker fills Redis as it writes
+precalc_route_cache = PrecalculatedRouteCache.from_env(redis_client)
+precalc_repo = PrecalculatedRouteRepository(SessionLocal, cache=precalc_route_cache) if DATABASE_URL else None
 card_bin_repo = CardBINRepository(card_bin_store)
 interchange_fee_repo = InterchangeFeeRepository(interchange_fee_store)
 
@@ -108,7 +136,8 @@ if not DATABASE_URL:
     ))
 
 # --- Processors Registration ---
-processor_registry = ProcessorRegistry()
+# Per-provider circuit breakers; state changes are shared with other nodes via Redis
+processor_registry = ProcessorRegistry(redis_client=redis_client)
 processor_registry.register(PaymentProvider.STRIPE, StripeProcessor())
 processor_registry.register(PaymentProvider.ADYEN, AdyenProcessor())
 processor_registry.register(
@@ -116,7 +145,9 @@ processor_registry.register(
     PayPalProcessor(
         client_id=os.getenv("PAYPAL_CLIENT_ID"),
         secret=os.getenv("PAYPAL_SECRET"),
-        environment=os.getenv("PAYPAL_ENVIRONMENT", "sandbox")
+        environment=os.getenv("PAYPAL_ENVIRONMENT", "sandbox"),
+        # Share the OAuth token across worker processes
+        redis_client=redis_client
     )
 )
 processor_registry.register(
@@ -129,9 +160,14 @@ processor_registry.register(
     )
 )
 processor_registry.register(PaymentProvider.INTERNAL, InternalMockProcessor())
+if redis_client:
+    processor_registry.start_circuit_listener()
 
 # --- Services ---
 fee_service = FeeService()
+# One MGET per refresh for every provider_health:* flag; routing and the API read from memory
+provider_health_cache = ProviderHealthCache.from_env(redis_client, async_redis_client=async_redis_client)
+provider_health_cache.start_refresher()
 
 # --- Strategy Selection ---
 STRATEGY_TYPE = os.getenv("ROUTING_STRATEGY", "LEAST_COST").upper()
@@ -146,14 +182,27 @@ def _initialize_strategy() -> RoutingDecisionStrategy:
         if not AISUITE_AVAILABLE:
             print("Warning: ROUTING_STRATEGY=PLANNER requested but aisuite not available. Falling back to LEAST_COST.")
             return DeterministicLeastCostStrategy()
-        return PlannerRoutingStrategy(objective=ROUTING_OBJECTIVE, model=ROUTING_MODEL)
+        return BudgetedDecisionStrategy(
+            # Model failures are raised to the budget wrapper, which counts them and falls back
+            PlannerRoutingStrategy(
+                objective=ROUTING_OBJECTIVE, model=ROUTING_MODEL,
+                decision_cache=DecisionCache.from_env(), fallback_on_error=False
+            ),
+            RoutingLatencyBudget.from_env()
+        )
     
     if STRATEGY_TYPE == "LLM":
         if not AISUITE_AVAILABLE:
             print("Warning: ROUTING_STRATEGY=LLM requested but aisuite not available. Falling back to LEAST_COST.")
             return DeterministicLeastCostStrategy()
         from payments_service.app.routing.decisioning.decision_strategies import LLMDecisionStrategy
-        return LLMDecisionStrategy(objective=ROUTING_OBJECTIVE, model=ROUTING_MODEL)
+        return BudgetedDecisionStrategy(
+            LLMDecisionStrategy(
+                objective=ROUTING_OBJECTIVE, model=ROUTING_MODEL,
+                decision_cache=DecisionCache.from_env(), fallback_on_error=False
+            ),
+            RoutingLatencyBudget.from_env()
+        )
     
     if STRATEGY_TYPE == "FIXED":
         # Default fixed to INTERNAL for now, could be further parameterized
@@ -167,7 +216,16 @@ print(f"Initialized Routing Strategy: {routing_strategy.__class__.__name__} (Con
 routing_service = RoutingService(
     fee_service=fee_service, 
     performance_repository=performance_repo,
-    strategy=routing_strategy
+    strategy=routing_strategy,
+    processor_registry=processor_registry,
+    health_cache=provider_health_cache,
+    async_redis_client=async_redis_client,
+    # Bounds how long writes from other nodes to the shared intelligence store take to show up
+    routing_table=CompiledRoutingTable(
+        fee_service,
+        performance_repo,
+        max_age_seconds=float(os.getenv("ROUTING_TABLE_MAX_AGE_SECONDS", "30"))
+    )
 )
 
 # Ingestion
@@ -182,7 +240,9 @@ payment_service = PaymentService(
     customer_repo=customer_repo,
     routing_service=routing_service,
     processor_registry=processor_registry,
-    precalculated_route_repository=precalc_repo
+    precalculated_route_repository=precalc_repo,
+    # Opt-in per merchant via HEDGED_MERCHANT_IDS
+    hedging_policy=HedgingPolicy.from_env()
 )
 
 def get_payment_service():
@@ -196,3 +256,37 @@ def get_customer_service():
 
 def get_redis_client():
     return redis_client
+
+def get_async_redis_client():
+    return async_redis_client
+
+def get_provider_health_cache():
+    return provider_health_cache
+
+def routing_stats() -> dict:
+    """
+    Counters of the routing components, for the stats endpoint and the shutdown log.
+    """
+    stats = {
+        "strategy": routing_strategy.__class__.__name__,
+        "provider_health": provider_health_cache.stats()
+    }
+    if isinstance(routing_strategy, BudgetedDecisionStrategy):
+        stats["latency_budget"] = routing_strategy.stats()
+    # Hit rate and evictions of the model decision cache, behind the budget wrapper if any
+    decision_cache = getattr(getattr(routing_strategy, "primary", routing_strategy), "decision_cache", None)
+    if decision_cache is not None:
+        stats["decision_cache"] = decision_cache.stats()
+    return stats
+
+def warm_precalculated_routes():
+    """
+    Bulk-loads the routes of upcoming renewals into the cache. Runs off the
+    request path at startup; failures only cost cache misses.
+    """
+    if not precalc_repo:
+        return
+    try:
+        precalc_repo.warm_cache(horizon_hours=float(os.getenv("PRECALC_ROUTE_CACHE_WARM_HOURS", "48")))
+    except Exception as e:
+        print(f"[PrecalculatedRouteCache] Warm-up failed: {e}")
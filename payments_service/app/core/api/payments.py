@@ -2,17 +2,18 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List
 from payments_service.app.core.models.payment import Payment, PaymentCreate
 from payments_service.app.core.services.payment_service import PaymentService
-from payments_service.app.core.api.dependencies import get_payment_service, get_redis_client
+from payments_service.app.core.api.dependencies import get_payment_service, get_provider_health_cache, routing_stats
+from payments_service.app.routing.preprocessing import ProviderHealthCache
 
 router = APIRouter()
 
 @router.post("/charge", response_model=Payment, status_code=status.HTTP_201_CREATED)
-def create_charge(
+async def create_charge(
     charge_in: PaymentCreate,
     service: PaymentService = Depends(get_payment_service)
 ):
     try:
-        return service.create_charge(charge_in)
+        return await service.create_charge_async(charge_in)
     except KeyError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except ValueError as e:
@@ -37,26 +38,28 @@ def get_charge(
 
 @router.get("/providers/health")
 def get_providers_health(
-    redis_client = Depends(get_redis_client)
+    health_cache: ProviderHealthCache = Depends(get_provider_health_cache)
 ):
     """
     Returns real-time health status of registered payment providers.
     """
     providers = ["stripe", "paypal", "braintree", "adyen"]
+    health = health_cache.snapshot()
     health_results = []
     
     for p in providers:
-        status = "up"
-        if redis_client:
-            # Check for "down" flag in Redis
-            down_flag = redis_client.get(f"provider_health:{p}")
-            if down_flag == b"down":
-                status = "down"
-        
         health_results.append({
             "provider": p,
-            "status": status,
+            "status": "down" if health.get(p) == "down" else "up",
             "latency_ms": 150 # Mock latency for now
         })
     
-    return health_results
\ No newline at end of file
+    return health_results
+
+@router.get("/routing/stats")
+def get_routing_stats():
+    """
+    Routing counters: latency budget fallbacks and overruns, decision cache
+    hit rate and evictions, health cache hits.
+    """
+    return routing_stats()
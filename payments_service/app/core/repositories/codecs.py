@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+from typing import Any, Generic, Type, TypeVar, Union
+
+T = TypeVar("T")
+
+class RecordCodec(ABC, Generic[T]):
+    """
+    Serializes the individual items of item-keyed (hash layout) store values.
+    """
+    @abstractmethod
+    def encode(self, item: T) -> Union[bytes, str]:
+        pass
+
+    @abstractmethod
+    def decode(self, data: Union[bytes, str]) -> T:
+        pass
+
+class JsonRecordCodec(RecordCodec[T]):
+    """
+    Human-readable pydantic JSON. Slower and larger, but inspectable with redis-cli.
+    """
+    def __init__(self, model_class: Type[T]):
+        self.model_class = model_class
+
+    def encode(self, item: Any) -> str:
+        return item.model_dump_json()
+
+    def decode(self, data: Union[bytes, str]) -> T:
+        return self.model_class.model_validate_json(data)
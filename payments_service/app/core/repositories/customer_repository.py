@@ -12,5 +12,8 @@ class CustomerRepository:
     def find_by_id(self, customer_id: str) -> Optional[Customer]:
         return self._store.find_by_id(customer_id)
 
+    async def find_by_id_async(self, customer_id: str) -> Optional[Customer]:
+        return await self._store.find_by_id_async(customer_id)
+
     def find_by_merchant_id(self, merchant_id: str) -> List[Customer]:
         return self._store.query(merchant_id=merchant_id)
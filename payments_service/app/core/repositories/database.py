@@ -0,0 +1,47 @@
+import os
+from contextlib import contextmanager
+from typing import Callable, Iterator, Union
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+# A bound Session (caller owns its lifecycle) or a factory producing one per unit of work
+SessionSource = Union[Session, Callable[[], Session]]
+
+def create_db_engine(database_url: str) -> Engine:
+    """
+    Creates an engine with a connection pool tuned from the environment.
+    """
+    if database_url.startswith("sqlite"):
+        # SQLite uses its own single-connection pools; QueuePool options don't apply
+        return create_engine(database_url)
+
+    return create_engine(
+        database_url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800")),
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    )
+
+def create_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@contextmanager
+def session_scope(source: SessionSource) -> Iterator[Session]:
+    """
+    Yields the session for a single unit of work.
+    A factory opens a fresh session (checking a connection out of the pool only
+    while it is in use) and closes it afterwards, so concurrent requests and
+    threads never share one.
+    """
+    if isinstance(source, Session):
+        yield source
+        return
+
+    session = source()
+    try:
+        yield session
+    finally:
+        session.close()
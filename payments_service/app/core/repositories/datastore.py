@@ -1,9 +1,12 @@
 import json
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, TypeVar, Generic, Callable, Type
+from typing import Dict, Any, Iterator, List, Optional, TypeVar, Generic, Callable, Type
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 import redis
+from .database import SessionSource, session_scope
+from .codecs import RecordCodec
 
 T = TypeVar("T")
 
@@ -28,6 +31,36 @@ class KeyValueStore(ABC, Generic[T]):
     def get_all(self) -> List[T]:
         pass
 
+    def iter_all(self, batch_size: int = 500) -> Iterator[T]:
+        """
+        Streams every value in the store. Network-backed stores fetch in batches
+        of batch_size instead of loading everything at once.
+        """
+        return iter(self.get_all())
+
+    def get_many(self, keys: List[str]) -> List[Optional[T]]:
+        return [self.get(key) for key in keys]
+
+    def set_many(self, items: Dict[str, T]) -> None:
+        for key, value in items.items():
+            self.set(key, value)
+
+    def upsert_items(self, updates: Dict[str, List[Any]], item_key: Callable[[Any], str]) -> Dict[str, List[Any]]:
+        """
+        Merges items into the list stored at each key, replacing existing items with
+        the same item_key in place. Returns the merged lists.
+        Stores override this to batch the round-trips.
+        """
+        keys = list(updates)
+        merged = {}
+        for key, existing in zip(keys, self.get_many(keys)):
+            by_item_key = {item_key(item): item for item in existing or []}
+            for item in updates[key]:
+                by_item_key[item_key(item)] = item
+            merged[key] = list(by_item_key.values())
+        self.set_many(merged)
+        return merged
+
 class RelationalStore(ABC, Generic[T]):
     """
     Interface for consistent, queryable storage.
@@ -49,6 +82,18 @@ class RelationalStore(ABC, Generic[T]):
     def list_all(self) -> List[T]:
         pass
 
+    async def save_async(self, id: Any, entity: T) -> T:
+        """
+        Non-blocking save. Defaults to running the sync driver in a worker thread.
+        """
+        return await asyncio.to_thread(self.save, id, entity)
+
+    async def find_by_id_async(self, id: Any) -> Optional[T]:
+        """
+        Non-blocking lookup. Defaults to running the sync driver in a worker thread.
+        """
+        return await asyncio.to_thread(self.find_by_id, id)
+
 class LogAppendStore(ABC, Generic[T]):
     """
     Interface for write-heavy append-only storage.
@@ -69,9 +114,29 @@ class LogAppendStore(ABC, Generic[T]):
 # --- Redis Implementation ---
 
 class RedisKeyValueStore(KeyValueStore[T]):
-    def __init__(self, redis_client: redis.Redis, model_class: Type[T] = None):
+    """
+    Keys are prefixed with "<namespace>:" so a store only ever sees (and scans) its own
+    keys, not unrelated ones like provider_health:*.
+    With item_key set, list values are stored as a Redis hash (item_key -> item) so a
+    single item can be updated without rewriting the whole list; an optional codec
+    controls how those items are encoded.
+    """
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        model_class: Type[T] = None,
+        item_key: Optional[Callable[[Any], str]] = None,
+        namespace: Optional[str] = None,
+        codec: Optional[RecordCodec] = None
+    ):
         self.client = redis_client
         self.model_class = model_class
+        self.item_key = item_key
+        self.namespace = namespace
+        self.codec = codec
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
 
     def _serialize(self, value: T) -> str:
         if isinstance(value, list):
@@ -83,37 +148,163 @@ class RedisKeyValueStore(KeyValueStore[T]):
     def _deserialize(self, value: str) -> T:
         data = json.loads(value)
         if self.model_class == list:
-            # This is a bit hacky, but for this use case we know it's List[ProviderPerformance]
-            # In a real app we'd use a more robust registry or TypeAdapters
-            from payments_service.app.routing.decisioning.models import ProviderPerformance
-            return [ProviderPerformance.model_validate(v) for v in data]
+            return [self._deserialize_item(v) for v in data]
         if hasattr(self.model_class, "model_validate"):
             return self.model_class.model_validate(data)
         return data
 
+    def _serialize_item(self, item: Any):
+        if self.codec is not None:
+            return self.codec.encode(item)
+        return item.model_dump_json() if hasattr(item, "model_dump_json") else json.dumps(item)
+
+    def _deserialize_item(self, data: Any) -> Any:
+        if self.codec is not None and isinstance(data, (str, bytes)):
+            return self.codec.decode(data)
+        # This is a bit hacky, but for this use case we know it's List[ProviderPerformance]
+        # In a real app we'd use a more robust registry or TypeAdapters
+        from payments_service.app.routing.decisioning.models import ProviderPerformance
+        if isinstance(data, (str, bytes)):
+            return ProviderPerformance.model_validate_json(data)
+        return ProviderPerformance.model_validate(data)
+
+    def _decode(self, value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def _from_hash(self, fields: Dict[Any, Any]) -> Optional[List[Any]]:
+        if not fields:
+            return None
+        return [self._deserialize_item(v) for v in fields.values()]
+
+    def _from_string(self, value) -> Optional[T]:
+        return self._deserialize(self._decode(value)) if value else None
+
+    def _write_hash(self, pipe, redis_key: str, items: List[Any]):
+        pipe.delete(redis_key)
+        if items:
+            pipe.hset(redis_key, mapping={self.item_key(item): self._serialize_item(item) for item in items})
+
+    def _fetch(self, redis_keys: List[Any]) -> List[Optional[T]]:
+        """
+        Reads already-namespaced keys in a single round-trip.
+        """
+        if not redis_keys:
+            return []
+        if not self.item_key:
+            return [self._from_string(v) for v in self.client.mget(redis_keys)]
+
+        pipe = self.client.pipeline(transaction=False)
+        for redis_key in redis_keys:
+            pipe.hgetall(redis_key)
+        results = []
+        for redis_key, fields in zip(redis_keys, pipe.execute(raise_on_error=False)):
+            if isinstance(fields, redis.ResponseError):
+                # Written before the hash layout; readable until the next save converts it
+                results.append(self._from_string(self.client.get(redis_key)))
+            else:
+                results.append(self._from_hash(fields))
+        return results
+
     def set(self, key: str, value: T):
-        self.client.set(key, self._serialize(value))
+        if self.item_key:
+            pipe = self.client.pipeline()
+            self._write_hash(pipe, self._key(key), value)
+            pipe.execute()
+            return
+        self.client.set(self._key(key), self._serialize(value))
 
     def get(self, key: str) -> Optional[T]:
-        value = self.client.get(key)
-        if value:
-            return self._deserialize(value.decode('utf-8') if isinstance(value, bytes) else value)
-        return None
+        if self.item_key:
+            return self._fetch([self._key(key)])[0]
+        return self._from_string(self.client.get(self._key(key)))
+
+    def get_many(self, keys: List[str]) -> List[Optional[T]]:
+        return self._fetch([self._key(key) for key in keys])
+
+    def set_many(self, items: Dict[str, T]) -> None:
+        if not items:
+            return
+        if not self.item_key:
+            self.client.mset({self._key(key): self._serialize(value) for key, value in items.items()})
+            return
+        pipe = self.client.pipeline()
+        for key, value in items.items():
+            self._write_hash(pipe, self._key(key), value)
+        pipe.execute()
+
+    def upsert_items(self, updates: Dict[str, List[Any]], item_key: Callable[[Any], str]) -> Dict[str, List[Any]]:
+        if not self.item_key or not updates:
+            return super().upsert_items(updates, item_key)
+
+        # One round-trip: per-field HSET, then read back the merged hash
+        pipe = self.client.pipeline()
+        for key, items in updates.items():
+            redis_key = self._key(key)
+            pipe.hset(redis_key, mapping={self.item_key(item): self._serialize_item(item) for item in items})
+            pipe.hgetall(redis_key)
+        try:
+            responses = pipe.execute()
+        except redis.ResponseError:
+            # A key still holds a legacy JSON string; merge in memory and rewrite it as a hash
+            return super().upsert_items(updates, item_key)
+        return {key: self._from_hash(fields) or [] for key, fields in zip(updates, responses[1::2])}
 
     def delete(self, key: str) -> bool:
-        return bool(self.client.delete(key))
+        return bool(self.client.delete(self._key(key)))
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[T]:
+        """
+        Walks the namespace with a cursor-based SCAN (never KEYS, which blocks Redis)
+        and fetches each batch of keys in one round-trip.
+        """
+        # No type filter: _fetch still reads values written before the hash layout
+        match = f"{self.namespace}:*" if self.namespace else "*"
+        batch = []
+        for redis_key in self.client.scan_iter(match=match, count=batch_size):
+            batch.append(redis_key)
+            if len(batch) >= batch_size:
+                yield from (v for v in self._fetch(batch) if v)
+                batch = []
+        if batch:
+            yield from (v for v in self._fetch(batch) if v)
 
     def get_all(self) -> List[T]:
-        keys = self.client.keys("*")
-        if not keys:
-            return []
-        values = self.client.mget(keys)
-        return [self._deserialize(v.decode('utf-8') if isinstance(v, bytes) else v) for v in values if v]
+        return list(self.iter_all())
+
+    def migrate_legacy_keys(self, legacy_match: Optional[str] = None, batch_size: int = 500) -> int:
+        """
+        One-off conversion of values written by older layouts: JSON strings under
+        the namespace are rewritten as hashes (with item_key), and un-namespaced
+        keys matching legacy_match are moved into the namespace. Fields already
+        written in the new layout win. Safe to re-run; returns the keys converted.
+        """
+        patterns = []
+        if self.item_key and self.namespace:
+            patterns.append(f"{self.namespace}:*")
+        if self.namespace and legacy_match:
+            patterns.append(legacy_match)
+
+        converted = 0
+        for match in patterns:
+            for redis_key in list(self.client.scan_iter(match=match, count=batch_size, _type="string")):
+                key = self._decode(redis_key)
+                target = key if key.startswith(f"{self.namespace}:") else self._key(key)
+                value = self._from_string(self.client.get(redis_key))
+                pipe = self.client.pipeline()
+                pipe.delete(redis_key)
+                if value is not None and self.item_key:
+                    for item in value:
+                        pipe.hsetnx(target, self.item_key(item), self._serialize_item(item))
+                elif value is not None:
+                    pipe.set(target, self._serialize(value), nx=True)
+                pipe.execute()
+                converted += 1
+        return converted
 
 # --- Postgres Implementation ---
 
 class PostgresRelationalStore(RelationalStore[T]):
-    def __init__(self, session: Session, sqlalchemy_model: Type[Any], pydantic_model: Type[T]):
+    def __init__(self, session: SessionSource, sqlalchemy_model: Type[Any], pydantic_model: Type[T]):
         self.session = session
         self.sqlalchemy_model = sqlalchemy_model
         self.pydantic_model = pydantic_model
@@ -130,21 +321,25 @@ class PostgresRelationalStore(RelationalStore[T]):
 
     def save(self, id: Any, entity: T) -> T:
         sqla_obj = self._to_sqla(entity)
-        self.session.merge(sqla_obj)
-        self.session.commit()
+        with session_scope(self.session) as session:
+            session.merge(sqla_obj)
+            session.commit()
         return entity
 
     def find_by_id(self, id: Any) -> Optional[T]:
-        sqla_obj = self.session.get(self.sqlalchemy_model, id)
-        return self._to_pydantic(sqla_obj) if sqla_obj else None
+        with session_scope(self.session) as session:
+            sqla_obj = session.get(self.sqlalchemy_model, id)
+            return self._to_pydantic(sqla_obj) if sqla_obj else None
 
     def query(self, **kwargs) -> List[T]:
-        sqla_objs = self.session.query(self.sqlalchemy_model).filter_by(**kwargs).all()
-        return [self._to_pydantic(obj) for obj in sqla_objs]
+        with session_scope(self.session) as session:
+            sqla_objs = session.query(self.sqlalchemy_model).filter_by(**kwargs).all()
+            return [self._to_pydantic(obj) for obj in sqla_objs]
 
     def list_all(self) -> List[T]:
-        sqla_objs = self.session.query(self.sqlalchemy_model).all()
-        return [self._to_pydantic(obj) for obj in sqla_objs]
+        with session_scope(self.session) as session:
+            sqla_objs = session.query(self.sqlalchemy_model).all()
+            return [self._to_pydantic(obj) for obj in sqla_objs]
 
 # --- In-Memory Implementations ---
 
@@ -188,6 +383,12 @@ class InMemoryRelationalStore(RelationalStore[T]):
     def list_all(self) -> List[T]:
         return list(self._data.values())
 
+    async def save_async(self, id: Any, entity: T) -> T:
+        return self.save(id, entity)
+
+    async def find_by_id_async(self, id: Any) -> Optional[T]:
+        return self.find_by_id(id)
+
 class InMemoryLogAppendStore(LogAppendStore[T]):
     def __init__(self):
         self._logs: List[T] = []
@@ -17,6 +17,9 @@ class MerchantRepository:
     def find_by_id(self, merchant_id: str) -> Optional[Merchant]:
         return self._store.find_by_id(merchant_id)
 
+    async def find_by_id_async(self, merchant_id: str) -> Optional[Merchant]:
+        return await self._store.find_by_id_async(merchant_id)
+
     def find_by_tax_id(self, tax_id: str) -> Optional[Merchant]:
         results = self._store.query(tax_id=tax_id)
         return results[0] if results else None
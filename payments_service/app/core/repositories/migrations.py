@@ -0,0 +1,339 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Set
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+from payments_service.app.core.repositories.models import Base, PaymentORM, SubscriptionORM, PrecalculatedRouteORM, subscription_shard_key
+from payments_service.app.core.utils.datetime_utils import now_utc
+from payments_service.app.routing.decisioning.repository import RoutingPerformanceRepository, redis_performance_store
+
+# Serializes migrations across app instances starting at the same time (PostgreSQL)
+MIGRATION_LOCK_ID = 7_305_114
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False)
+)
+
+class Migration:
+    """
+    One schema change. apply receives the engine and manages its own
+    transactions, since some DDL (CREATE INDEX CONCURRENTLY) can't run in one.
+    Every migration must be safe to re-run after a partial failure.
+    """
+    def __init__(self, version: int, description: str, apply: Callable[[Engine], None]):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+def _create_tables(engine: Engine):
+    Base.metadata.create_all(bind=engine)
+
+def _create_indexes(engine: Engine):
+    """
+    The indexes declared on the models, for databases created before them.
+    create_all only adds indexes together with a new table.
+    """
+    tables = [SubscriptionORM.__table__, PaymentORM.__table__, PrecalculatedRouteORM.__table__]
+    postgres = engine.dialect.name == "postgresql"
+    # CONCURRENTLY doesn't block writes while a large table is indexed, but needs autocommit
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in tables:
+            if postgres and _relkind(conn, table.name) == "p":
+                # Partitioned parents can't be indexed concurrently; their indexes already exist
+                continue
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                if postgres:
+                    # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+                    invalid = conn.execute(text(
+                        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                        "WHERE c.relname = :name AND NOT i.indisvalid"
+                    ), {"name": index.name}).first()
+                    if invalid:
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+                    ddl = ddl.replace("CREATE INDEX ", "CREATE INDEX CONCURRENTLY ", 1)
+                print(f"[Migrations] {ddl}")
+                conn.execute(text(ddl))
+
+def partition_payments(engine: Engine):
+    """
+    Opt-in (scripts/migrate.py --partition-payments): converts payments into a
+    table range-partitioned by month of created_at (PostgreSQL only), so
+    time-bounded scans prune to the months they touch and old months can be
+    detached or dropped instead of deleted row by row.
+
+    Runs in one transaction: rows are copied into the new table and the old
+    one dropped, so payments is locked against reads and writes (charges,
+    refunds) for the duration of the copy. Run it in a maintenance window.
+
+    The primary key becomes (id, created_at), as partition keys must be part
+    of it, so the database no longer enforces that id alone is unique.
+    PaymentORM still maps id as its primary key: ids are generated UUIDs and
+    payments are looked up by id, which stays correct as long as nothing
+    writes a payment id twice.
+    """
+    if engine.dialect.name != "postgresql":
+        print("[Migrations] Payment partitioning needs PostgreSQL; skipped")
+        return
+    with engine.begin() as conn:
+        if _relkind(conn, "payments") == "p":
+            return
+        conn.execute(text("LOCK TABLE payments IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("UPDATE payments SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL"))
+        conn.execute(text("ALTER TABLE payments RENAME TO payments_unpartitioned"))
+        conn.execute(text(
+            "CREATE TABLE payments (LIKE payments_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+        ))
+        oldest = conn.execute(text("SELECT min(created_at) FROM payments_unpartitioned")).scalar()
+        _create_month_partitions(conn, oldest or now_utc(), now_utc(), months_ahead=3)
+        # Catches anything outside the monthly partitions (e.g. far-future timestamps)
+        conn.execute(text("CREATE TABLE payments_default PARTITION OF payments DEFAULT"))
+        conn.execute(text("INSERT INTO payments SELECT * FROM payments_unpartitioned"))
+        conn.execute(text("DROP TABLE payments_unpartitioned"))
+        conn.execute(text("ALTER TABLE payments ADD PRIMARY KEY (id, created_at)"))
+        for index in PaymentORM.__table__.indexes:
+            conn.execute(CreateIndex(index))
+
+def _add_subscription_shard_keys(engine: Engine, batch_size: int = 1000):
+    """
+    subscriptions.shard_key for databases created before it, backfilled in
+    batches: renewal shards select on it, so a NULL would leave a subscription
+    in no shard.
+    """
+    table = SubscriptionORM.__table__
+    with engine.begin() as conn:
+        if "shard_key" not in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN shard_key INTEGER"))
+    backfill = update(table).where(table.c.id == bindparam("sub_id")).values(shard_key=bindparam("key"))
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(select(table.c.id).where(table.c.shard_key.is_(None)).limit(batch_size)).scalars().all()
+            if not ids:
+                return
+            conn.execute(backfill, [{"sub_id": sub_id, "key": subscription_shard_key(sub_id)} for sub_id in ids])
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create tables", _create_tables),
+    Migration(2, "Indexes for renewal scans, route expiry and payment listings", _create_indexes),
+    Migration(3, "Hash-based renewal shard keys for subscriptions", _add_subscription_shard_keys),
+]
+
+def applied_versions(engine: Engine) -> Set[int]:
+    schema_migrations.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {row.version for row in conn.execute(schema_migrations.select())}
+
+def check_schema_version(engine: Engine):
+    """
+    Raises if migrations are pending. The app calls this at startup instead of
+    migrating, so no instance runs DDL (or waits on another one running it)
+    while serving traffic; scripts/migrate.py applies them.
+    """
+    done = set()
+    if inspect(engine).has_table(schema_migrations.name):
+        with engine.connect() as conn:
+            done = {row.version for row in conn.execute(schema_migrations.select())}
+    pending = [m.version for m in MIGRATIONS if m.version not in done]
+    if pending:
+        raise RuntimeError(f"Schema migrations {pending} are pending; run scripts/migrate.py")
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Applies pending migrations in order, up to target (default: all), then
+    makes sure upcoming payment partitions exist if payments is partitioned
+    (so run it at least every few months). Returns the versions applied.
+    """
+    lock = None
+    if engine.dialect.name == "postgresql":
+        lock = engine.connect()
+        lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    try:
+        done = applied_versions(engine)
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version in done or (target is not None and migration.version > target):
+                continue
+            print(f"[Migrations] Applying {migration.version}: {migration.description}")
+            migration.apply(engine)
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=now_utc()
+                ))
+            applied.append(migration.version)
+        try:
+            ensure_payment_partitions(engine)
+        except Exception as e:
+            # e.g. rows for that month already sit in the default partition; payments still insert
+            print(f"[Migrations] Could not create upcoming payment partitions: {e}")
+        return applied
+    finally:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            lock.close()
+
+def migrate_routing_performance_keys(redis_client) -> int:
+    """
+    Moves routing performance written before the intelligence store was
+    namespaced (bare dimension-JSON keys holding a JSON list) into the
+    namespaced hash layout. Without it routing sees no history after upgrading.
+    Safe to re-run; returns the keys converted.
+    """
+    converted = redis_performance_store(redis_client).migrate_legacy_keys(RoutingPerformanceRepository.LEGACY_KEY_PATTERN)
+    if converted:
+        print(f"[Migrations] Converted {converted} legacy routing performance key(s) in Redis")
+    return converted
+
+def ensure_payment_partitions(engine: Engine, months_ahead: int = 3) -> List[str]:
+    """
+    Creates the monthly payment partitions from the current month to
+    months_ahead months out, if payments is partitioned. Run at startup so
+    new payments never fall into the default partition.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    with engine.begin() as conn:
+        if _relkind(conn, "payments") != "p":
+            return []
+        now = now_utc()
+        return _create_month_partitions(conn, now, now, months_ahead)
+
+def payment_partition_name(month_start: datetime) -> str:
+    return f"payments_{month_start.year:04d}_{month_start.month:02d}"
+
+def _create_month_partitions(conn: Connection, first: datetime, now: datetime, months_ahead: int) -> List[str]:
+    month = _month_start(first)
+    last = _add_months(_month_start(now), months_ahead)
+    existing = _partitions(conn, "payments")
+    created = []
+    while month <= last:
+        name = payment_partition_name(month)
+        if name not in existing:
+            upper = _add_months(month, 1)
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF payments "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+        month = _add_months(month, 1)
+    if created:
+        print(f"[Migrations] Created payment partitions: {', '.join(created)}")
+    return created
+
+def partition_precalculated_routes(engine: Engine, days_ahead: int = 14):
+    """
+    Opt-in (scripts/migrate.py --partition-routes): converts precalculated_routes
+    into a table range-partitioned by day of expires_at (PostgreSQL only), so
+    expired routes are removed by dropping whole days
+    (PRECALC_ROUTE_RETENTION=partition) instead of deleting rows that share
+    pages with live ones.
+
+    The primary key becomes (subscription_id, expires_at); the repository
+    keeps one row per subscription by replacing rather than upserting. Only
+    unexpired routes are carried over.
+    """
+    if engine.dialect.name != "postgresql":
+        print("[Migrations] Route partitioning needs PostgreSQL; skipped")
+        return
+    with engine.begin() as conn:
+        if _relkind(conn, "precalculated_routes") == "p":
+            return
+        conn.execute(text("LOCK TABLE precalculated_routes IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("ALTER TABLE precalculated_routes RENAME TO precalculated_routes_unpartitioned"))
+        conn.execute(text(
+            "CREATE TABLE precalculated_routes (LIKE precalculated_routes_unpartitioned INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (expires_at)"
+        ))
+        today = _day_start(now_utc())
+        _create_day_partitions(conn, today, today + timedelta(days=days_ahead))
+        conn.execute(text("CREATE TABLE precalculated_routes_default PARTITION OF precalculated_routes DEFAULT"))
+        conn.execute(text(
+            "INSERT INTO precalculated_routes SELECT * FROM precalculated_routes_unpartitioned WHERE expires_at >= now()"
+        ))
+        conn.execute(text("DROP TABLE precalculated_routes_unpartitioned"))
+        conn.execute(text("ALTER TABLE precalculated_routes ADD PRIMARY KEY (subscription_id, expires_at)"))
+        for index in PrecalculatedRouteORM.__table__.indexes:
+            conn.execute(CreateIndex(index))
+
+def is_partitioned(conn: Connection, table_name: str) -> bool:
+    return conn.dialect.name == "postgresql" and _relkind(conn, table_name) == "p"
+
+def ensure_route_partitions(engine: Engine, days_ahead: int = 14) -> List[str]:
+    """
+    Creates daily route partitions through days_ahead days out. Routes expire
+    a day after their renewal, so this should exceed the renewal lookahead.
+    """
+    with engine.begin() as conn:
+        today = _day_start(now_utc())
+        return _create_day_partitions(conn, today, today + timedelta(days=days_ahead))
+
+def drop_expired_route_partitions(engine: Engine, before: datetime, lock_timeout_ms: int = 2000) -> List[str]:
+    """
+    Drops daily route partitions whose whole range ends at or before before.
+    Each drop is a brief metadata lock on the parent; lock_timeout_ms keeps it
+    from queueing behind long-running reads (it is retried on the next sweep).
+    """
+    dropped = []
+    with engine.connect() as conn:
+        names = sorted(n for n in _partitions(conn, "precalculated_routes") if n != "precalculated_routes_default")
+    for name in names:
+        day = datetime.strptime(name[len("precalculated_routes_"):], "%Y_%m_%d").replace(tzinfo=timezone.utc)
+        if day + timedelta(days=1) > before:
+            continue
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+        except Exception as e:
+            print(f"[Migrations] Could not drop {name}, retrying next sweep: {e}")
+    return dropped
+
+def route_partition_name(day: datetime) -> str:
+    return f"precalculated_routes_{day.year:04d}_{day.month:02d}_{day.day:02d}"
+
+def _create_day_partitions(conn: Connection, first: datetime, last: datetime) -> List[str]:
+    existing = _partitions(conn, "precalculated_routes")
+    created = []
+    day = _day_start(first)
+    while day <= last:
+        name = route_partition_name(day)
+        if name not in existing:
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF precalculated_routes "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+            created.append(name)
+        day += timedelta(days=1)
+    if created:
+        print(f"[Migrations] Created route partitions: {', '.join(created)}")
+    return created
+
+def _partitions(conn: Connection, parent: str) -> Set[str]:
+    return {row[0] for row in conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:parent)"
+    ), {"parent": parent})}
+
+def _relkind(conn: Connection, table_name: str) -> Optional[str]:
+    # 'r' for a plain table, 'p' for a partitioned one
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": table_name}
+    ).scalar()
+
+def _day_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _month_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
@@ -1,12 +1,23 @@
-from sqlalchemy import Column, String, Float, JSON, Enum as SQLEnum, DateTime
+from sqlalchemy import Column, String, Float, Integer, JSON, Enum as SQLEnum, DateTime, Index, text
 from sqlalchemy.orm import declarative_base
 from payments_service.app.core.models.merchant import MerchantStatus
 from payments_service.app.core.models.payment import PaymentStatus, PaymentProvider
 from datetime import datetime, timezone
 import uuid
+import zlib
 
 Base = declarative_base()
 
+# Renewal shards split this keyspace into contiguous ranges of shard_key
+SHARD_KEYSPACE = 2 ** 16
+
+def subscription_shard_key(subscription_id: str) -> int:
+    """
+    Stable hash bucket of a subscription id: uniform whatever the id format
+    (uuid4 or "sub_..."), and independent of database collation.
+    """
+    return zlib.crc32(subscription_id.encode()) % SHARD_KEYSPACE
+
 class MerchantORM(Base):
     __tablename__ = "merchants"
 
@@ -49,6 +60,14 @@ class PaymentORM(Base):
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+    # Existing databases get these indexes through migrations.py, which also
+    # range-partitions the table by created_at on PostgreSQL
+    __table_args__ = (
+        # Merchant and customer listings, newest first
+        Index("ix_payments_merchant_created", "merchant_id", "created_at"),
+        Index("ix_payments_customer_created", "customer_id", "created_at"),
+    )
+
 class SubscriptionORM(Base):
     __tablename__ = "subscriptions"
 
@@ -61,6 +80,17 @@ class SubscriptionORM(Base):
     status = Column(String, default="active")
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Set from id on insert; backfilled for older rows by migration 3
+    shard_key = Column(Integer, default=lambda ctx: subscription_shard_key(ctx.get_current_parameters()["id"]))
+
+    __table_args__ = (
+        # Upcoming renewals, paged by (next_renewal_at, id); cancelled subscriptions aren't indexed
+        Index(
+            "ix_subscriptions_active_renewal", "next_renewal_at", "id",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'")
+        ),
+    )
 
 class PrecalculatedRouteORM(Base):
     __tablename__ = "precalculated_routes"
@@ -71,6 +101,19 @@ class PrecalculatedRouteORM(Base):
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        # Expiry sweeps and cache warm-up, paged by (expires_at, subscription_id)
+        Index("ix_precalculated_routes_expiry", "expires_at", "subscription_id"),
+    )
+
+class RenewalShardLeaseORM(Base):
+    __tablename__ = "renewal_shard_leases"
+
+    shard = Column(Integer, primary_key=True)
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_completed_at = Column(DateTime(timezone=True), nullable=True)
+
 class CardBINORM(Base):
     __tablename__ = "card_bins"
 
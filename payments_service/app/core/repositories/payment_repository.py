@@ -9,8 +9,14 @@ class PaymentRepository:
     def save(self, payment: Payment) -> Payment:
         return self._store.save(payment.id, payment)
 
+    async def save_async(self, payment: Payment) -> Payment:
+        return await self._store.save_async(payment.id, payment)
+
     def find_by_id(self, payment_id: str) -> Optional[Payment]:
         return self._store.find_by_id(payment_id)
 
+    async def find_by_id_async(self, payment_id: str) -> Optional[Payment]:
+        return await self._store.find_by_id_async(payment_id)
+
     def find_all(self) -> List[Payment]:
         return self._store.list_all()
@@ -0,0 +1,135 @@
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+import redis
+from payments_service.app.core.models.precalculated_route import PrecalculatedRoute
+from payments_service.app.core.utils.cache import TTLCache
+from payments_service.app.core.utils.datetime_utils import now_utc, normalize_to_utc
+
+class PrecalculatedRouteCache:
+    """
+    Pre-calculated routes keyed by subscription_id, so renewal charges resolve
+    their route without a database read.
+
+    Two tiers: an in-process LRU in front of Redis (when configured). Every
+    entry expires at the route's expires_at, and the local copy is also capped
+    at local_ttl_seconds, so a recalculation written by another process (the
+    renewal worker) is picked up within that window, from Redis or, without
+    it, from the database. Redis errors degrade to a miss.
+    """
+    KEY_PREFIX = "precalculated_route"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        maxsize: int = 100_000,
+        local_ttl_seconds: float = 60.0
+    ):
+        self.client = redis_client
+        self.local_ttl_seconds = local_ttl_seconds
+        self._local: TTLCache[PrecalculatedRoute] = TTLCache(maxsize=maxsize, ttl_seconds=local_ttl_seconds)
+        self._lock = threading.Lock()
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.errors = 0
+        self.writes = 0
+
+    @classmethod
+    def from_env(cls, redis_client: Optional[redis.Redis] = None) -> "PrecalculatedRouteCache":
+        return cls(
+            redis_client,
+            maxsize=int(os.getenv("PRECALC_ROUTE_CACHE_SIZE", "100000")),
+            local_ttl_seconds=float(os.getenv("PRECALC_ROUTE_CACHE_LOCAL_TTL_SECONDS", "60"))
+        )
+
+    @property
+    def shared(self) -> bool:
+        """
+        True when backed by Redis, i.e. visible to other processes.
+        """
+        return self.client is not None
+
+    def _key(self, subscription_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{subscription_id}"
+
+    def get_local(self, subscription_id: str) -> Optional[PrecalculatedRoute]:
+        return self._local.get(subscription_id)
+
+    def get(self, subscription_id: str) -> Optional[PrecalculatedRoute]:
+        route = self._local.get(subscription_id)
+        if route is not None or self.client is None:
+            return route
+        try:
+            value = self.client.get(self._key(subscription_id))
+        except redis.RedisError as e:
+            print(f"[PrecalculatedRouteCache] Redis read failed: {e}")
+            self._count("errors")
+            return None
+        if value is None:
+            self._count("redis_misses")
+            return None
+        self._count("redis_hits")
+        route = PrecalculatedRoute.model_validate_json(value)
+        self._set_local(route)
+        return route
+
+    def put_many(self, routes: Iterable[PrecalculatedRoute]) -> int:
+        """
+        Caches routes until their expires_at; already expired ones are skipped.
+        Redis writes go out in one pipelined round-trip. Returns the number cached.
+        """
+        now = now_utc()
+        # Stored UTC-aware whatever the driver returned, so readers can compare against now_utc()
+        live = [
+            r.model_copy(update={"expires_at": normalize_to_utc(r.expires_at), "created_at": normalize_to_utc(r.created_at)})
+            for r in routes if normalize_to_utc(r.expires_at) > now
+        ]
+        for route in live:
+            self._set_local(route, now)
+        if live and self.client is not None:
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for route in live:
+                    pipe.set(
+                        self._key(route.subscription_id),
+                        route.model_dump_json(),
+                        exat=int(route.expires_at.timestamp())
+                    )
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"[PrecalculatedRouteCache] Redis write failed: {e}")
+                self._count("errors")
+        with self._lock:
+            self.writes += len(live)
+        return len(live)
+
+    def invalidate(self, subscription_id: str):
+        self._local.invalidate(subscription_id)
+        if self.client is not None:
+            try:
+                self.client.delete(self._key(subscription_id))
+            except redis.RedisError as e:
+                print(f"[PrecalculatedRouteCache] Redis delete failed: {e}")
+                self._count("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._local.stats()
+        with self._lock:
+            stats.update({
+                "redis_hits": self.redis_hits,
+                "redis_misses": self.redis_misses,
+                "errors": self.errors,
+                "writes": self.writes
+            })
+        return stats
+
+    def _set_local(self, route: PrecalculatedRoute, now: Optional[datetime] = None):
+        remaining = (route.expires_at - (now or now_utc())).total_seconds()
+        if remaining <= 0:
+            return
+        self._local.set(route.subscription_id, route, ttl_seconds=min(remaining, self.local_ttl_seconds))
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
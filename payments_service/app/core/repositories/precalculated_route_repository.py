@@ -1,47 +1,201 @@
+import asyncio
+from sqlalchemy import delete, select, tuple_
 from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timedelta
 from payments_service.app.core.models.precalculated_route import PrecalculatedRoute, PrecalculatedRouteCreate
 from payments_service.app.core.repositories.models import PrecalculatedRouteORM
-from payments_service.app.core.utils.datetime_utils import normalize_to_utc
+from payments_service.app.core.repositories.database import SessionSource, session_scope
+from payments_service.app.core.repositories.precalculated_route_cache import PrecalculatedRouteCache
+from payments_service.app.core.repositories.migrations import is_partitioned
+from payments_service.app.core.utils.datetime_utils import normalize_to_utc, now_utc
 
 class PrecalculatedRouteRepository:
-    def __init__(self, db: Session):
+    # Keeps each statement well under the bind parameter limits of both backends
+    MAX_ROWS_PER_STATEMENT = 5000
+
+    def __init__(self, db: SessionSource, cache: Optional[PrecalculatedRouteCache] = None):
         self.db = db
+        # Read-through for lookups, written through on every save
+        self.cache = cache
+        # Looked up on first write; see migrations.partition_precalculated_routes
+        self._partitioned: Optional[bool] = None
 
     def save(self, route_in: PrecalculatedRouteCreate) -> PrecalculatedRoute:
         # Normalize expires_at
         data = route_in.model_dump()
         if 'expires_at' in data:
             data['expires_at'] = normalize_to_utc(data['expires_at'])
+        # As in save_many: created_at records when the route was last calculated
+        data['created_at'] = now_utc()
             
-        # Upsert logic for subscription_id
-        db_obj = self.db.query(PrecalculatedRouteORM).filter(
-            PrecalculatedRouteORM.subscription_id == data['subscription_id']
-        ).first()
-        
-        if db_obj:
-            for key, value in data.items():
-                setattr(db_obj, key, value)
-        else:
-            db_obj = PrecalculatedRouteORM(**data)
-            self.db.add(db_obj)
+        with session_scope(self.db) as db:
+            # Upsert logic for subscription_id
+            db_obj = db.query(PrecalculatedRouteORM).filter(
+                PrecalculatedRouteORM.subscription_id == data['subscription_id']
+            ).first()
             
-        self.db.commit()
-        self.db.refresh(db_obj)
-        return PrecalculatedRoute.model_validate(db_obj, from_attributes=True)
+            if db_obj:
+                for key, value in data.items():
+                    setattr(db_obj, key, value)
+            else:
+                db_obj = PrecalculatedRouteORM(**data)
+                db.add(db_obj)
+                
+            db.commit()
+            db.refresh(db_obj)
+            route = PrecalculatedRoute.model_validate(db_obj, from_attributes=True)
+        if self.cache:
+            self.cache.put_many([route])
+        return route
+
+    def save_many(self, routes: Iterable[PrecalculatedRouteCreate]) -> int:
+        """
+        Upserts a batch of routes with INSERT ... ON CONFLICT DO UPDATE (one
+        statement per MAX_ROWS_PER_STATEMENT rows) and a single commit.
+        Returns the number of rows written. created_at is reset on every write,
+        so it records when the route was last calculated.
+
+        When the table is partitioned by expires_at, (subscription_id) is no
+        longer unique on its own, so existing rows are deleted and reinserted.
+        """
+        now = now_utc()
+        rows = {}
+        for route_in in routes:
+            data = route_in.model_dump()
+            data['expires_at'] = normalize_to_utc(data['expires_at'])
+            data['provider'] = data['provider'].value
+            data['created_at'] = now
+            # Last write wins for duplicate subscriptions within the batch
+            rows[data['subscription_id']] = data
+        if not rows:
+            return 0
+
+        with session_scope(self.db) as db:
+            dialect = db.get_bind().dialect.name
+            if self._partitioned is None:
+                self._partitioned = is_partitioned(db.connection(), PrecalculatedRouteORM.__tablename__)
+            if self._partitioned:
+                values = list(rows.values())
+                for i in range(0, len(values), self.MAX_ROWS_PER_STATEMENT):
+                    chunk = values[i:i + self.MAX_ROWS_PER_STATEMENT]
+                    db.execute(delete(PrecalculatedRouteORM).where(
+                        PrecalculatedRouteORM.subscription_id.in_([data['subscription_id'] for data in chunk])
+                    ))
+                    db.execute(postgresql.insert(PrecalculatedRouteORM).values(chunk))
+            elif dialect in ("postgresql", "sqlite"):
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                values = list(rows.values())
+                for i in range(0, len(values), self.MAX_ROWS_PER_STATEMENT):
+                    stmt = insert(PrecalculatedRouteORM).values(values[i:i + self.MAX_ROWS_PER_STATEMENT])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[PrecalculatedRouteORM.subscription_id],
+                        set_={
+                            "provider": stmt.excluded.provider,
+                            "routing_decision": stmt.excluded.routing_decision,
+                            "expires_at": stmt.excluded.expires_at,
+                            "created_at": stmt.excluded.created_at
+                        }
+                    )
+                    db.execute(stmt)
+            else:
+                for data in rows.values():
+                    db.merge(PrecalculatedRouteORM(**data))
+            db.commit()
+        if self.cache:
+            self.cache.put_many([PrecalculatedRoute(**data) for data in rows.values()])
+        return len(rows)
 
     def find_by_subscription_id(self, subscription_id: str) -> Optional[PrecalculatedRoute]:
-        db_obj = self.db.query(PrecalculatedRouteORM).filter(
-            PrecalculatedRouteORM.subscription_id == subscription_id
-        ).first()
-        if db_obj:
-            return PrecalculatedRoute.model_validate(db_obj, from_attributes=True)
-        return None
-
-    def delete_expired(self, current_time: datetime):
+        if self.cache:
+            route = self.cache.get(subscription_id)
+            if route is not None:
+                return route
+        with session_scope(self.db) as db:
+            db_obj = db.query(PrecalculatedRouteORM).filter(
+                PrecalculatedRouteORM.subscription_id == subscription_id
+            ).first()
+            if not db_obj:
+                return None
+            route = PrecalculatedRoute.model_validate(db_obj, from_attributes=True)
+        if self.cache:
+            self.cache.put_many([route])
+        return route
+
+    async def find_by_subscription_id_async(self, subscription_id: str) -> Optional[PrecalculatedRoute]:
+        # A local cache hit needs no I/O, so skip the worker thread
+        if self.cache:
+            route = self.cache.get_local(subscription_id)
+            if route is not None:
+                return route
+        return await asyncio.to_thread(self.find_by_subscription_id, subscription_id)
+
+    def warm_cache(self, horizon_hours: float = 48.0, batch_size: int = 1000) -> int:
+        """
+        Loads the routes still valid and expiring within horizon_hours (the
+        renewals coming up) into the cache in keyset pages, ahead of the
+        charges that will need them. Returns the number of routes cached.
+        """
+        if not self.cache:
+            return 0
+        now = now_utc()
+        horizon = now + timedelta(hours=horizon_hours)
+        warmed = 0
+        after = None
+        while True:
+            with session_scope(self.db) as db:
+                query = db.query(PrecalculatedRouteORM).filter(
+                    PrecalculatedRouteORM.expires_at > now,
+                    PrecalculatedRouteORM.expires_at <= horizon
+                )
+                if after is not None:
+                    query = query.filter(
+                        tuple_(PrecalculatedRouteORM.expires_at, PrecalculatedRouteORM.subscription_id) > after
+                    )
+                # Keyset on the ix_precalculated_routes_expiry order
+                db_objs = query.order_by(PrecalculatedRouteORM.expires_at, PrecalculatedRouteORM.subscription_id).limit(batch_size).all()
+                page = [PrecalculatedRoute.model_validate(obj, from_attributes=True) for obj in db_objs]
+            if not page:
+                break
+            warmed += self.cache.put_many(page)
+            if len(page) < batch_size:
+                break
+            after = (normalize_to_utc(page[-1].expires_at), page[-1].subscription_id)
+        print(f"[PrecalculatedRouteCache] Warmed {warmed} routes expiring within {horizon_hours:g}h")
+        return warmed
+
+    def delete_expired_chunk(self, current_time: datetime, limit: int = 1000) -> int:
+        """
+        Deletes up to limit routes that expired before current_time, oldest
+        first, by primary key, and commits. Short transactions keep row locks
+        and WAL bursts small; on PostgreSQL rows locked by a concurrent save or
+        sweeper are skipped. Returns the number deleted.
+        """
         current_time = normalize_to_utc(current_time)
-        self.db.query(PrecalculatedRouteORM).filter(
-            PrecalculatedRouteORM.expires_at < current_time
-        ).delete()
-        self.db.commit()
+        with session_scope(self.db) as db:
+            expired = select(PrecalculatedRouteORM.subscription_id).where(
+                PrecalculatedRouteORM.expires_at < current_time
+            ).order_by(PrecalculatedRouteORM.expires_at, PrecalculatedRouteORM.subscription_id).limit(limit)
+            if db.get_bind().dialect.name == "postgresql":
+                expired = expired.with_for_update(skip_locked=True)
+            result = db.execute(delete(PrecalculatedRouteORM).where(
+                PrecalculatedRouteORM.subscription_id.in_(expired.scalar_subquery()),
+                # Re-checked in case the route was recalculated in between
+                PrecalculatedRouteORM.expires_at < current_time
+            ))
+            db.commit()
+            return result.rowcount
+
+    def delete_expired(self, current_time: datetime, chunk_size: int = 1000) -> int:
+        """
+        Deletes every route that expired before current_time, one chunk at a
+        time, until a chunk deletes nothing: with SKIP LOCKED a short chunk
+        doesn't mean the rest are gone. Returns the number deleted.
+        """
+        deleted = 0
+        while True:
+            count = self.delete_expired_chunk(current_time, limit=chunk_size)
+            if count == 0:
+                return deleted
+            deleted += count
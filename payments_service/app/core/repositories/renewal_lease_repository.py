@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from payments_service.app.core.repositories.models import RenewalShardLeaseORM, SHARD_KEYSPACE
+from payments_service.app.core.repositories.database import SessionSource, session_scope
+from payments_service.app.core.utils.datetime_utils import now_utc, normalize_to_utc
+
+def shard_key_range(shard: int, shard_count: int) -> Tuple[int, int]:
+    """
+    The [lower, upper) range of SubscriptionORM.shard_key owned by a shard.
+    shard_key is a hash of the id, so shards stay even whatever the id format.
+    """
+    return shard * SHARD_KEYSPACE // shard_count, (shard + 1) * SHARD_KEYSPACE // shard_count
+
+class RenewalLeaseRepository:
+    """
+    Time-bounded leases on renewal shards, one row per shard.
+
+    A shard is claimed with a conditional UPDATE that only succeeds while the
+    lease is free or expired, so two workers can never hold the same shard; on
+    PostgreSQL the candidate rows are also read with FOR UPDATE SKIP LOCKED so
+    concurrent claimers skip each other instead of queueing. A crashed worker's
+    shards become claimable again once its lease runs out.
+    """
+    def __init__(self, db: SessionSource):
+        self.db = db
+
+    def ensure_shards(self, shard_count: int):
+        with session_scope(self.db) as db:
+            existing = {row.shard for row in db.query(RenewalShardLeaseORM.shard).all()}
+            missing = [s for s in range(shard_count) if s not in existing]
+            if not missing:
+                return
+            db.add_all([RenewalShardLeaseORM(shard=s) for s in missing])
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker created them first
+                db.rollback()
+
+    def claim(self, owner: str, shard_count: int, lease_seconds: float, completed_before: datetime) -> Optional[int]:
+        """
+        Leases the free shard that was completed least recently, skipping
+        shards already completed at or after completed_before.
+        Returns the shard number, or None when there is nothing to claim.
+        """
+        now = now_utc()
+        completed_before = normalize_to_utc(completed_before)
+        with session_scope(self.db) as db:
+            candidates = db.query(RenewalShardLeaseORM.shard).filter(
+                RenewalShardLeaseORM.shard < shard_count,
+                or_(RenewalShardLeaseORM.lease_expires_at.is_(None), RenewalShardLeaseORM.lease_expires_at < now),
+                or_(RenewalShardLeaseORM.last_completed_at.is_(None), RenewalShardLeaseORM.last_completed_at < completed_before)
+            ).order_by(
+                RenewalShardLeaseORM.last_completed_at.asc().nullsfirst(),
+                RenewalShardLeaseORM.shard
+            ).limit(8).with_for_update(skip_locked=True).all()
+
+            for (shard,) in candidates:
+                claimed = db.query(RenewalShardLeaseORM).filter(
+                    RenewalShardLeaseORM.shard == shard,
+                    or_(RenewalShardLeaseORM.lease_expires_at.is_(None), RenewalShardLeaseORM.lease_expires_at < now)
+                ).update({
+                    RenewalShardLeaseORM.owner: owner,
+                    RenewalShardLeaseORM.lease_expires_at: now + timedelta(seconds=lease_seconds)
+                }, synchronize_session=False)
+                if claimed:
+                    db.commit()
+                    return shard
+            db.rollback()
+            return None
+
+    def renew(self, shard: int, owner: str, lease_seconds: float) -> bool:
+        """
+        Extends a held lease. False means the lease was lost to another worker.
+        """
+        with session_scope(self.db) as db:
+            renewed = db.query(RenewalShardLeaseORM).filter(
+                RenewalShardLeaseORM.shard == shard,
+                RenewalShardLeaseORM.owner == owner
+            ).update({
+                RenewalShardLeaseORM.lease_expires_at: now_utc() + timedelta(seconds=lease_seconds)
+            }, synchronize_session=False)
+            db.commit()
+            return renewed == 1
+
+    def release(self, shard: int, owner: str, completed: bool = True):
+        values = {RenewalShardLeaseORM.owner: None, RenewalShardLeaseORM.lease_expires_at: None}
+        if completed:
+            values[RenewalShardLeaseORM.last_completed_at] = now_utc()
+        with session_scope(self.db) as db:
+            db.query(RenewalShardLeaseORM).filter(
+                RenewalShardLeaseORM.shard == shard,
+                RenewalShardLeaseORM.owner == owner
+            ).update(values, synchronize_session=False)
+            db.commit()
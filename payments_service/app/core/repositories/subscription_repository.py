@@ -1,12 +1,14 @@
+from sqlalchemy import or_, tuple_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
 from payments_service.app.core.models.subscription import Subscription, SubscriptionCreate
-from payments_service.app.core.repositories.models import SubscriptionORM
+from payments_service.app.core.repositories.models import SubscriptionORM, PrecalculatedRouteORM
+from payments_service.app.core.repositories.database import SessionSource, session_scope
 from payments_service.app.core.utils.datetime_utils import normalize_to_utc
 
 class SubscriptionRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: SessionSource):
         self.db = db
 
     def save(self, subscription_in: SubscriptionCreate) -> Subscription:
@@ -14,25 +16,101 @@ class SubscriptionRepository:
         if 'next_renewal_at' in data:
             data['next_renewal_at'] = normalize_to_utc(data['next_renewal_at'])
             
-        db_obj = SubscriptionORM(**data)
-        self.db.add(db_obj)
-        self.db.commit()
-        self.db.refresh(db_obj)
-        return Subscription.model_validate(db_obj, from_attributes=True)
+        with session_scope(self.db) as db:
+            db_obj = SubscriptionORM(**data)
+            db.add(db_obj)
+            db.commit()
+            db.refresh(db_obj)
+            return Subscription.model_validate(db_obj, from_attributes=True)
 
     def find_by_id(self, subscription_id: str) -> Optional[Subscription]:
-        db_obj = self.db.query(SubscriptionORM).filter(SubscriptionORM.id == subscription_id).first()
-        if db_obj:
-            return Subscription.model_validate(db_obj, from_attributes=True)
-        return None
+        with session_scope(self.db) as db:
+            db_obj = db.query(SubscriptionORM).filter(SubscriptionORM.id == subscription_id).first()
+            if db_obj:
+                return Subscription.model_validate(db_obj, from_attributes=True)
+            return None
 
     def find_upcoming_renewals(self, start_date: datetime, end_date: datetime) -> List[Subscription]:
         start_date = normalize_to_utc(start_date)
         end_date = normalize_to_utc(end_date)
         
-        db_objs = self.db.query(SubscriptionORM).filter(
-            SubscriptionORM.next_renewal_at >= start_date,
-            SubscriptionORM.next_renewal_at <= end_date,
-            SubscriptionORM.status == "active"
-        ).all()
-        return [Subscription.model_validate(obj, from_attributes=True) for obj in db_objs]
+        with session_scope(self.db) as db:
+            db_objs = db.query(SubscriptionORM).filter(
+                SubscriptionORM.next_renewal_at >= start_date,
+                SubscriptionORM.next_renewal_at <= end_date,
+                SubscriptionORM.status == "active"
+            ).all()
+            return [Subscription.model_validate(obj, from_attributes=True) for obj in db_objs]
+
+    def find_upcoming_renewals_page(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 1000,
+        shard_key_range: Optional[Tuple[int, int]] = None,
+        route_stale_before: Optional[datetime] = None
+    ) -> List[Subscription]:
+        """
+        One page of upcoming renewals ordered by (next_renewal_at, id), starting
+        after the (next_renewal_at, id) key in after. Keyset pagination on the
+        ix_subscriptions_active_renewal order keeps every page an index range
+        scan, unlike OFFSET or ordering by id alone.
+
+        shard_key_range restricts the page to subscriptions whose shard_key (a
+        hash of the id) is in [lower, upper).
+        With route_stale_before, only subscriptions that need a route are
+        returned: no pre-calculated route, a route that expires before the
+        renewal, or one calculated before that time.
+        """
+        start_date = normalize_to_utc(start_date)
+        end_date = normalize_to_utc(end_date)
+
+        with session_scope(self.db) as db:
+            query = db.query(SubscriptionORM).filter(
+                SubscriptionORM.next_renewal_at >= start_date,
+                SubscriptionORM.next_renewal_at <= end_date,
+                SubscriptionORM.status == "active"
+            )
+            if after is not None:
+                query = query.filter(
+                    tuple_(SubscriptionORM.next_renewal_at, SubscriptionORM.id) > (normalize_to_utc(after[0]), after[1])
+                )
+            if shard_key_range is not None:
+                lower, upper = shard_key_range
+                query = query.filter(SubscriptionORM.shard_key >= lower, SubscriptionORM.shard_key < upper)
+            if route_stale_before is not None:
+                query = query.outerjoin(
+                    PrecalculatedRouteORM, PrecalculatedRouteORM.subscription_id == SubscriptionORM.id
+                ).filter(or_(
+                    PrecalculatedRouteORM.subscription_id.is_(None),
+                    PrecalculatedRouteORM.expires_at < SubscriptionORM.next_renewal_at,
+                    PrecalculatedRouteORM.created_at < normalize_to_utc(route_stale_before)
+                ))
+            db_objs = query.order_by(SubscriptionORM.next_renewal_at, SubscriptionORM.id).limit(limit).all()
+            return [Subscription.model_validate(obj, from_attributes=True) for obj in db_objs]
+
+    def iter_upcoming_renewals(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: int = 1000,
+        shard_key_range: Optional[Tuple[int, int]] = None,
+        route_stale_before: Optional[datetime] = None
+    ) -> Iterator[List[Subscription]]:
+        """
+        Yields upcoming renewals in pages of at most batch_size.
+        Filters as find_upcoming_renewals_page.
+        """
+        after = None
+        while True:
+            page = self.find_upcoming_renewals_page(
+                start_date, end_date, after=after, limit=batch_size,
+                shard_key_range=shard_key_range, route_stale_before=route_stale_before
+            )
+            if not page:
+                return
+            yield page
+            if len(page) < batch_size:
+                return
+            after = (page[-1].next_renewal_at, page[-1].id)
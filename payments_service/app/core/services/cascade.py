@@ -0,0 +1,153 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.core.services.hedging import Attempt, HedgedExecutor, attempt_request, processor_error
+from payments_service.app.processors.errors import is_unknown_outcome
+from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
+
+# Declines about the card or cardholder itself: another provider would decline too,
+# and retrying them elsewhere looks like card testing to the networks.
+HARD_DECLINE_CODES = frozenset({
+    "stolen_card",
+    "lost_card",
+    "pickup_card",
+    "fraudulent",
+    "restricted_card",
+    "invalid_account",
+    "incorrect_number",
+    "invalid_number",
+    "expired_card",
+    "amount_too_large",
+})
+
+def is_retryable(response: InternalChargeResponse) -> bool:
+    """
+    True for soft declines and for technical errors known not to have charged
+    (refused connections, rate limits, open circuits), which another provider
+    may approve.
+    """
+    if response.status != ProcessorStatus.FAILURE or is_unknown_outcome(response):
+        return False
+    error = response.raw_response.get("error")
+    decline_code = error.get("decline_code") if isinstance(error, dict) else None
+    return response.error_code not in HARD_DECLINE_CODES and decline_code not in HARD_DECLINE_CODES
+
+class CascadeResult:
+    __slots__ = ("provider", "response", "attempts", "hedged_providers", "steps")
+
+    def __init__(
+        self,
+        provider: PaymentProvider,
+        response: InternalChargeResponse,
+        attempts: List[Tuple[PaymentProvider, InternalChargeResponse]],
+        hedged_providers: List[PaymentProvider],
+        steps: int = 1
+    ):
+        self.provider = provider
+        self.response = response
+        self.attempts = attempts
+        # The pair raced in the first step, if it was hedged
+        self.hedged_providers = hedged_providers
+        self.steps = steps
+
+    @property
+    def hedged(self) -> bool:
+        return bool(self.hedged_providers)
+
+class CascadingExecutor:
+    """
+    Walks ranked candidates in order until one approves, the decline is hard, or
+    max_attempts providers have been tried. Processor exceptions count as
+    technical errors. An attempt whose outcome is unknown stops the cascade:
+    charging another provider could capture the payment twice.
+
+    With a hedged executor and a hedge deadline, the first step races the top two
+    candidates; the cascade then continues with the ones not yet tried. Every
+    hedged attempt that answered is recorded, and the hedge returns any unknown
+    outcome among them, so that also stops the cascade.
+    """
+    def __init__(self, max_attempts: Optional[int] = None, hedged_executor: Optional[HedgedExecutor] = None):
+        self.max_attempts = max_attempts or int(os.getenv("CASCADE_MAX_ATTEMPTS", "3"))
+        self.hedged_executor = hedged_executor
+        self._lock = threading.Lock()
+        self.charges = 0
+        self.cascaded = 0
+        self.recovered = 0
+        self.unknown_outcomes = 0
+
+    def execute(self, candidates: List[Attempt], request: InternalChargeRequest, hedge_delay_ms: Optional[float] = None) -> CascadeResult:
+        remaining = list(candidates[:self.max_attempts])
+        attempts, hedged, steps = [], [], 0
+        while remaining:
+            steps += 1
+            if not attempts and self._hedges(remaining, hedge_delay_ms):
+                result = self.hedged_executor.execute(remaining[0], remaining[1], request, hedge_delay_ms)
+                provider, response = result.provider, result.response
+                hedged = result.providers if result.hedged else []
+                remaining = remaining[len(result.providers):]
+                attempts.extend(result.attempts[:-1])
+            else:
+                provider, processor = remaining.pop(0)
+                try:
+                    response = processor.process_charge(attempt_request(request, provider))
+                except Exception as e:
+                    response = processor_error(e)
+            attempts.append((provider, response))
+            if not self._continue(provider, response, remaining):
+                break
+        return self._finish(CascadeResult(provider, response, attempts, hedged, steps))
+
+    async def execute_async(self, candidates: List[Attempt], request: InternalChargeRequest, hedge_delay_ms: Optional[float] = None) -> CascadeResult:
+        remaining = list(candidates[:self.max_attempts])
+        attempts, hedged, steps = [], [], 0
+        while remaining:
+            steps += 1
+            if not attempts and self._hedges(remaining, hedge_delay_ms):
+                result = await self.hedged_executor.execute_async(remaining[0], remaining[1], request, hedge_delay_ms)
+                provider, response = result.provider, result.response
+                hedged = result.providers if result.hedged else []
+                remaining = remaining[len(result.providers):]
+                attempts.extend(result.attempts[:-1])
+            else:
+                provider, processor = remaining.pop(0)
+                try:
+                    response = await processor.process_charge_async(attempt_request(request, provider))
+                except Exception as e:
+                    response = processor_error(e)
+            attempts.append((provider, response))
+            if not self._continue(provider, response, remaining):
+                break
+        return self._finish(CascadeResult(provider, response, attempts, hedged, steps))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "charges": self.charges,
+                "cascaded": self.cascaded,
+                "recovered": self.recovered,
+                "unknown_outcomes": self.unknown_outcomes
+            }
+
+    def _hedges(self, remaining: List[Attempt], hedge_delay_ms: Optional[float]) -> bool:
+        return self.hedged_executor is not None and hedge_delay_ms is not None and len(remaining) > 1
+
+    def _continue(self, provider: PaymentProvider, response: InternalChargeResponse, remaining: List[Attempt]) -> bool:
+        if is_unknown_outcome(response):
+            print(f"[Cascade] {provider.value} outcome unknown ({response.error_code or response.status.value}); not cascading, needs reconciliation")
+            return False
+        if not remaining or not is_retryable(response):
+            return False
+        print(f"[Cascade] {provider.value} failed ({response.error_code or response.error_message}); trying {remaining[0][0].value}")
+        return True
+
+    def _finish(self, result: CascadeResult) -> CascadeResult:
+        with self._lock:
+            self.charges += 1
+            if is_unknown_outcome(result.response):
+                self.unknown_outcomes += 1
+            if result.steps > 1:
+                self.cascaded += 1
+                if result.response.status == ProcessorStatus.SUCCESS:
+                    self.recovered += 1
+        return result
@@ -0,0 +1,281 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.processors.errors import exception_error_code, is_unknown_outcome
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
+
+# (provider, processor adapter) pair for one attempt
+Attempt = Tuple[PaymentProvider, PaymentProcessor]
+
+class HedgingPolicy:
+    """
+    Opt-in configuration for hedged authorizations.
+
+    The hedge deadline approximates a tail percentile of the primary's latency
+    as avg_latency_ms * latency_multiplier, clamped to [min_delay_ms, max_delay_ms].
+    """
+    def __init__(
+        self,
+        merchant_ids: Optional[Iterable[str]] = None,
+        latency_multiplier: float = 2.0,
+        min_delay_ms: float = 50,
+        max_delay_ms: float = 2000
+    ):
+        self.merchant_ids = set(merchant_ids or [])
+        self.latency_multiplier = latency_multiplier
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgingPolicy"]:
+        """
+        None when no merchant opts in, so no hedging executor is created.
+        """
+        merchant_ids = [m.strip() for m in os.getenv("HEDGED_MERCHANT_IDS", "").split(",") if m.strip()]
+        if not merchant_ids:
+            return None
+        return cls(
+            merchant_ids=merchant_ids,
+            latency_multiplier=float(os.getenv("HEDGE_LATENCY_MULTIPLIER", "2.0")),
+            min_delay_ms=float(os.getenv("HEDGE_MIN_DELAY_MS", "50")),
+            max_delay_ms=float(os.getenv("HEDGE_MAX_DELAY_MS", "2000"))
+        )
+
+    def applies_to(self, merchant_id: str) -> bool:
+        return "*" in self.merchant_ids or merchant_id in self.merchant_ids
+
+    def hedge_delay_ms(self, avg_latency_ms: float) -> float:
+        return min(max(avg_latency_ms * self.latency_multiplier, self.min_delay_ms), self.max_delay_ms)
+
+def attempt_request(request: InternalChargeRequest, provider: PaymentProvider) -> InternalChargeRequest:
+    """
+    Scopes the charge's idempotency key to one provider attempt.
+    """
+    if not request.idempotency_key:
+        return request
+    return request.model_copy(update={"idempotency_key": f"{request.idempotency_key}:{provider.value}"})
+
+def processor_error(e: Exception) -> InternalChargeResponse:
+    return InternalChargeResponse(
+        status=ProcessorStatus.FAILURE,
+        error_code=exception_error_code(e),
+        error_message=str(e)
+    )
+
+class HedgeResult:
+    """
+    The response to act on, plus every attempt that had answered by then
+    (in race order, the returned one last) and the providers raced.
+    """
+    __slots__ = ("provider", "response", "hedged", "attempts", "providers")
+
+    def __init__(
+        self,
+        provider: PaymentProvider,
+        response: InternalChargeResponse,
+        hedged: bool,
+        attempts: Optional[List[Tuple[PaymentProvider, InternalChargeResponse]]] = None,
+        providers: Optional[List[PaymentProvider]] = None
+    ):
+        self.provider = provider
+        self.response = response
+        self.hedged = hedged
+        self.attempts = attempts if attempts is not None else [(provider, response)]
+        self.providers = providers if providers is not None else [provider]
+
+class HedgedExecutor:
+    """
+    Runs a charge on the primary provider and, if it hasn't answered by the
+    hedge deadline, races a guarded attempt on a backup provider.
+
+    - Every attempt carries its own idempotency key ("<charge key>:<provider>"),
+      so a retried attempt can never double-charge on the same processor.
+    - The first successful response wins. A losing attempt that also succeeded,
+      whenever it finishes, is voided/refunded on its processor.
+    - A losing attempt whose outcome is unknown (timeout, server error,
+      pending) may still have captured; it can't be voided without a
+      transaction id, so it is logged with its idempotency key and counted
+      as needs_reconciliation.
+    - If both fail, an attempt with an unknown outcome is returned ahead of
+      the primary's decline, so the caller never charges elsewhere while a
+      hedged attempt may have captured.
+    """
+    def __init__(self, max_workers: int = 32):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._background: Set[asyncio.Task] = set()
+        self.charges = 0
+        self.hedges_issued = 0
+        self.backup_wins = 0
+        self.losers_voided = 0
+        self.void_failures = 0
+        self.needs_reconciliation = 0
+
+    def execute(self, primary: Attempt, backup: Attempt, request: InternalChargeRequest, delay_ms: float) -> HedgeResult:
+        self._count("charges")
+        primary_future = self._submit(primary, request)
+        done, _ = wait([primary_future], timeout=delay_ms / 1000)
+        if done:
+            return HedgeResult(primary[0], self._result(primary_future), hedged=False)
+
+        self._count("hedges_issued")
+        print(f"[Hedging] {primary[0].value} exceeded {delay_ms:.0f}ms; hedging on {backup[0].value}")
+        pending: Dict[Future, Attempt] = {primary_future: primary, self._submit(backup, request): backup}
+        return self._race(pending, [primary[0], backup[0]], request)
+
+    async def execute_async(self, primary: Attempt, backup: Attempt, request: InternalChargeRequest, delay_ms: float) -> HedgeResult:
+        self._count("charges")
+        primary_task = asyncio.ensure_future(primary[1].process_charge_async(attempt_request(request, primary[0])))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay_ms / 1000)
+        if done:
+            return HedgeResult(primary[0], self._result(primary_task), hedged=False)
+
+        self._count("hedges_issued")
+        print(f"[Hedging] {primary[0].value} exceeded {delay_ms:.0f}ms; hedging on {backup[0].value}")
+        backup_task = asyncio.ensure_future(backup[1].process_charge_async(attempt_request(request, backup[0])))
+        pending: Dict[asyncio.Task, Attempt] = {primary_task: primary, backup_task: backup}
+
+        winner, failures, losers = None, {}, []
+        while pending and winner is None:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = self._settle(done, pending, failures, losers, winner)
+
+        # Losers still in flight are voided once they finish, after we've answered
+        for task, attempt in list(pending.items()) + losers:
+            void = asyncio.ensure_future(self._void_when_done_async(task, attempt, request))
+            self._background.add(void)
+            void.add_done_callback(self._background.discard)
+        return self._outcome(winner, failures, [primary[0], backup[0]], request)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "charges": self.charges,
+                "hedges_issued": self.hedges_issued,
+                "backup_wins": self.backup_wins,
+                "losers_voided": self.losers_voided,
+                "void_failures": self.void_failures,
+                "needs_reconciliation": self.needs_reconciliation
+            }
+
+    def close(self, wait: bool = False):
+        """
+        wait=True also lets in-flight losing attempts finish and be voided.
+        """
+        self._pool.shutdown(wait=wait)
+
+    async def aclose(self, timeout: float = 10.0):
+        """
+        Waits up to timeout seconds for async losing attempts to finish and be
+        voided before shutting down; call it before closing the processors.
+        """
+        pending = set(self._background)
+        if pending:
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+        if pending:
+            # Needs manual reconciliation: these may have captured and won't be voided
+            print(f"!!! [Hedging] {len(pending)} losing attempt(s) still in flight at shutdown; needs reconciliation")
+        self.close()
+
+    def _race(self, pending: Dict[Future, Attempt], providers: List[PaymentProvider], request: InternalChargeRequest) -> HedgeResult:
+        winner, failures, losers = None, {}, []
+        while pending and winner is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            winner = self._settle(done, pending, failures, losers, winner)
+
+        # Losers still in flight are voided on their worker thread once they finish
+        for future, attempt in pending.items():
+            future.add_done_callback(lambda f, attempt=attempt: self._void_if_captured(attempt, self._result(f), request))
+        for future, attempt in losers:
+            self._pool.submit(self._void_if_captured, attempt, self._result(future), request)
+        return self._outcome(winner, failures, providers, request)
+
+    def _settle(self, done, pending: Dict, failures: Dict, losers: List, winner: Optional[HedgeResult]) -> Optional[HedgeResult]:
+        for finished in done:
+            attempt = pending.pop(finished)
+            response = self._result(finished)
+            if response.status != ProcessorStatus.SUCCESS:
+                failures[attempt[0]] = response
+            elif winner is None:
+                winner = HedgeResult(attempt[0], response, hedged=True)
+            else:
+                # Both captured in the same wakeup: keep the first
+                losers.append((finished, attempt))
+        return winner
+
+    def _outcome(self, winner: Optional[HedgeResult], failures: Dict[PaymentProvider, InternalChargeResponse], providers: List[PaymentProvider], request: InternalChargeRequest) -> HedgeResult:
+        failed = [(p, failures[p]) for p in providers if p in failures]
+        if winner is not None:
+            if winner.provider != providers[0]:
+                self._count("backup_wins")
+            result = HedgeResult(winner.provider, winner.response, True, failed + [(winner.provider, winner.response)], providers)
+        else:
+            # Both answered: an attempt that may have captured outranks a decline
+            provider, response = next((a for a in failed if is_unknown_outcome(a[1])), failed[0])
+            attempts = [a for a in failed if a[0] != provider] + [(provider, response)]
+            result = HedgeResult(provider, response, True, attempts, providers)
+        # The returned response is the caller's to reconcile; any other unknown outcome is ours
+        for provider, response in failures.items():
+            if provider != result.provider and is_unknown_outcome(response):
+                self._record_unknown(provider, response, request)
+        return result
+
+    def _submit(self, attempt: Attempt, request: InternalChargeRequest) -> Future:
+        provider, processor = attempt
+        return self._pool.submit(processor.process_charge, attempt_request(request, provider))
+
+    def _result(self, future) -> InternalChargeResponse:
+        try:
+            return future.result()
+        except Exception as e:
+            return processor_error(e)
+
+    def _void_if_captured(self, attempt: Attempt, response: InternalChargeResponse, request: InternalChargeRequest):
+        provider, processor = attempt
+        if response.status != ProcessorStatus.SUCCESS:
+            if is_unknown_outcome(response):
+                self._record_unknown(provider, response, request)
+            return
+        try:
+            refund = processor.refund(response.processor_transaction_id, None)
+        except Exception as e:
+            refund = InternalChargeResponse(status=ProcessorStatus.FAILURE, error_message=str(e))
+        self._record_void(provider, response, refund)
+
+    async def _void_when_done_async(self, task: asyncio.Task, attempt: Attempt, request: InternalChargeRequest):
+        await asyncio.wait([task])
+        response = self._result(task)
+        provider, processor = attempt
+        if response.status != ProcessorStatus.SUCCESS:
+            if is_unknown_outcome(response):
+                self._record_unknown(provider, response, request)
+            return
+        try:
+            refund = await processor.refund_async(response.processor_transaction_id, None)
+        except Exception as e:
+            refund = InternalChargeResponse(status=ProcessorStatus.FAILURE, error_message=str(e))
+        self._record_void(provider, response, refund)
+
+    def _record_void(self, provider: PaymentProvider, response: InternalChargeResponse, refund: InternalChargeResponse):
+        if refund.status == ProcessorStatus.SUCCESS:
+            self._count("losers_voided")
+            print(f"[Hedging] Voided losing {provider.value} charge {response.processor_transaction_id}")
+        else:
+            # Needs manual reconciliation: the customer was charged twice
+            self._count("void_failures")
+            print(f"!!! [Hedging] Failed to void losing {provider.value} charge {response.processor_transaction_id}: {refund.error_message}")
+
+    def _record_unknown(self, provider: PaymentProvider, response: InternalChargeResponse, request: InternalChargeRequest):
+        # Needs manual reconciliation: the processor may have captured this attempt
+        self._count("needs_reconciliation")
+        key = attempt_request(request, provider).idempotency_key
+        print(f"!!! [Hedging] Losing {provider.value} attempt {key} has an unknown outcome "
+              f"({response.error_code or response.status.value}); needs reconciliation")
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
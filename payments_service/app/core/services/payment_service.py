@@ -1,14 +1,23 @@
-from typing import Optional, List
+import asyncio
+from typing import Dict, Optional, List, Tuple
 import uuid
 from datetime import datetime, timezone # Keep this for now, as it's not explicitly removed and might be used elsewhere, though now_utc is preferred.
 from payments_service.app.core.models.payment import Payment, PaymentCreate, PaymentStatus, PaymentProvider
 from payments_service.app.core.models.merchant import Merchant, MerchantCreate
+from payments_service.app.core.models.customer import Customer
+from payments_service.app.core.models.precalculated_route import PrecalculatedRoute
 from payments_service.app.core.repositories.payment_repository import PaymentRepository
 from payments_service.app.core.repositories.merchant_repository import MerchantRepository
 from payments_service.app.core.repositories.customer_repository import CustomerRepository
 from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
 from payments_service.app.routing.preprocessing import RoutingService
 from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
+from payments_service.app.core.services.hedging import HedgingPolicy, HedgedExecutor
+from payments_service.app.core.services.cascade import CascadingExecutor, CascadeResult
+from payments_service.app.processors.errors import is_unknown_outcome
+from payments_service.app.routing.decisioning.models import RankedRoute
 from payments_service.app.core.utils.datetime_utils import now_utc, normalize_to_utc
 
 class PaymentService:
@@ -20,7 +29,10 @@ class PaymentService:
         routing_service: RoutingService,
         processor_registry: ProcessorRegistry,
         precalculated_route_repository: Optional[PrecalculatedRouteRepository] = None,
-        feedback_collector: Optional['FeedbackCollector'] = None
+        feedback_collector: Optional['FeedbackCollector'] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+        hedged_executor: Optional[HedgedExecutor] = None,
+        cascading_executor: Optional[CascadingExecutor] = None
     ):
         self.payment_repo = payment_repo
         self.merchant_repo = merchant_repo
@@ -29,6 +41,9 @@ class PaymentService:
         self.processor_registry = processor_registry
         self.precalculated_route_repository = precalculated_route_repository
         self.feedback_collector = feedback_collector
+        self.hedging_policy = hedging_policy
+        self.hedged_executor = hedged_executor or (HedgedExecutor() if hedging_policy else None)
+        self.cascading_executor = cascading_executor or CascadingExecutor(hedged_executor=self.hedged_executor)
 
     def create_charge(self, charge_in: PaymentCreate) -> Payment:
         # 1. Validate Entities
@@ -40,62 +55,175 @@ class PaymentService:
         if not customer:
             raise KeyError(f"Customer {charge_in.customer_id} not found")
 
-        # 2. Routing Decision
-        provider_type = None
-        reason = None
+        # 2. Routing Decision: ranked candidates, computed once
+        routes, reason = None, None
 
         # Check for pre-calculated route if it's a subscription renewal
         if charge_in.subscription_id and self.precalculated_route_repository:
             precalc = self.precalculated_route_repository.find_by_subscription_id(charge_in.subscription_id)
-            if precalc and precalc.expires_at > now_utc():
-                provider_type = precalc.provider
-                reason = f"Pre-calculated: {precalc.routing_decision}"
-                print(f"Using pre-calculated route for subscription {charge_in.subscription_id}: {provider_type.value}")
+            routes, reason = self._use_precalculated(charge_in, precalc)
 
-        if not provider_type:
+        if not routes:
             try:
-                provider_type = self.routing_service.find_best_route(charge_in)
+                routes = self.routing_service.find_ranked_routes(charge_in)
                 reason = "AI Routing Decision (Live)"
             except Exception:
-                from payments_service.app.core.models.payment import PaymentProvider
-                provider_type = PaymentProvider.STRIPE
+                routes = [RankedRoute(PaymentProvider.STRIPE, None, None, None)]
                 reason = "Fallback: Routing Engine Unavailable"
 
-        # 3. Get Processor Adapter
-        processor = self.processor_registry.get_processor(provider_type)
-        if not processor:
-            raise ValueError(f"No processor registered for {provider_type}")
+        # 3. Get Processor Adapters
+        candidates = self._candidates(routes, self.routing_service.health_cache.snapshot())
+
+        # 4. Standardized Execution Contract: cascades down the ranked routes
+        # on soft declines and errors (hedged for opted-in merchants)
+        payment_id = str(uuid.uuid4())
+        request = self._build_internal_request(charge_in, customer, idempotency_key=payment_id)
+        hedge_delay_ms = self._hedge_delay_ms(charge_in, routes, candidates)
+        result = self.cascading_executor.execute(candidates, request, hedge_delay_ms)
+        provider_type, reason, processor_resp = self._apply_result(result, reason, hedge_delay_ms)
+
+        # 5. Map Result to Payment Record
+        saved_payment = self.payment_repo.save(self._build_payment(charge_in, provider_type, reason, processor_resp, payment_id))
+
+        # 6. Feedback Loop
+        if self.feedback_collector:
+            self.feedback_collector.collect(saved_payment)
+
+        return saved_payment
+
+    async def create_charge_async(self, charge_in: PaymentCreate) -> Payment:
+        """
+        Non-blocking variant of create_charge. Independent lookups run concurrently
+        and every I/O step awaits instead of holding a worker thread.
+        """
+        # 1. Validate Entities (and fetch any pre-calculated route) concurrently
+        lookups = [
+            self.merchant_repo.find_by_id_async(charge_in.merchant_id),
+            self.customer_repo.find_by_id_async(charge_in.customer_id)
+        ]
+        if charge_in.subscription_id and self.precalculated_route_repository:
+            lookups.append(self.precalculated_route_repository.find_by_subscription_id_async(charge_in.subscription_id))
+        merchant, customer, *precalc = await asyncio.gather(*lookups)
+
+        if not merchant:
+            raise KeyError(f"Merchant {charge_in.merchant_id} not found")
+        if not customer:
+            raise KeyError(f"Customer {charge_in.customer_id} not found")
+
+        # 2. Routing Decision: ranked candidates, computed once
+        routes, reason = self._use_precalculated(charge_in, precalc[0] if precalc else None)
+
+        if not routes:
+            try:
+                routes = await self.routing_service.find_ranked_routes_async(charge_in)
+                reason = "AI Routing Decision (Live)"
+            except Exception:
+                routes = [RankedRoute(PaymentProvider.STRIPE, None, None, None)]
+                reason = "Fallback: Routing Engine Unavailable"
+
+        # 3. Get Processor Adapters
+        candidates = self._candidates(routes, await self.routing_service.health_cache.snapshot_async())
+
+        # 4. Standardized Execution Contract: cascades down the ranked routes
+        # on soft declines and errors (hedged for opted-in merchants)
+        payment_id = str(uuid.uuid4())
+        request = self._build_internal_request(charge_in, customer, idempotency_key=payment_id)
+        hedge_delay_ms = self._hedge_delay_ms(charge_in, routes, candidates)
+        result = await self.cascading_executor.execute_async(candidates, request, hedge_delay_ms)
+        provider_type, reason, processor_resp = self._apply_result(result, reason, hedge_delay_ms)
+
+        # 5. Map Result to Payment Record
+        saved_payment = await self.payment_repo.save_async(self._build_payment(charge_in, provider_type, reason, processor_resp, payment_id))
+
+        # 6. Feedback Loop (writes to the intelligence store, so off the event loop)
+        if self.feedback_collector:
+            await asyncio.to_thread(self.feedback_collector.collect, saved_payment)
+
+        return saved_payment
+
+    def _use_precalculated(self, charge_in: PaymentCreate, precalc: Optional[PrecalculatedRoute]) -> Tuple[Optional[List[RankedRoute]], Optional[str]]:
+        if precalc and precalc.expires_at > now_utc():
+            print(f"Using pre-calculated route for subscription {charge_in.subscription_id}: {precalc.provider.value}")
+            return [RankedRoute(precalc.provider, None, None, None)], f"Pre-calculated: {precalc.routing_decision}"
+        return None, None
+
+    def _candidates(self, routes: List[RankedRoute], health: Dict[str, str]) -> List[Tuple[PaymentProvider, PaymentProcessor]]:
+        """
+        Registered processors for the ranked routes. Fallbacks reported down by
+        the health cache, or with an open circuit, are skipped.
+        """
+        candidates = []
+        for i, route in enumerate(routes):
+            processor = self.processor_registry.get_processor(route.provider)
+            if not processor:
+                continue
+            if i == 0 or (health.get(route.provider.value, "up") != "down" and self.processor_registry.is_available(route.provider)):
+                candidates.append((route.provider, processor))
+        if not candidates:
+            raise ValueError(f"No processor registered for {routes[0].provider}")
+        return candidates
 
-        # 4. Standardized Execution Contract
-        from payments_service.app.processors.models import InternalChargeRequest
-        internal_req = InternalChargeRequest(
+    def _hedge_delay_ms(self, charge_in: PaymentCreate, routes: List[RankedRoute], candidates: List[Tuple[PaymentProvider, PaymentProcessor]]) -> Optional[float]:
+        """
+        Hedge deadline from the primary's average latency, or None when this charge
+        shouldn't be hedged. An explicitly requested provider is never swapped.
+        """
+        if not self.hedging_policy or charge_in.provider or not self.hedging_policy.applies_to(charge_in.merchant_id):
+            return None
+        primary = next((r for r in routes if r.provider == candidates[0][0]), None)
+        if primary is None or primary.avg_latency_ms is None:
+            return None
+        return self.hedging_policy.hedge_delay_ms(primary.avg_latency_ms)
+
+    def _apply_result(self, result: CascadeResult, reason: str, hedge_delay_ms: Optional[float]) -> Tuple[PaymentProvider, str, InternalChargeResponse]:
+        if result.hedged:
+            raced = ", ".join(provider.value for provider in result.hedged_providers)
+            reason = f"{reason} | Hedged after {hedge_delay_ms:.0f}ms across {raced}"
+            if result.response.status == ProcessorStatus.SUCCESS and result.provider in result.hedged_providers:
+                reason = f"{reason}: {result.provider.value} won"
+        if len(result.attempts) > 1:
+            failed = ", ".join(provider.value for provider, _ in result.attempts[:-1])
+            reason = f"{reason} | Cascaded to {result.provider.value} after {failed} failed"
+        if is_unknown_outcome(result.response):
+            reason = f"{reason} | Outcome unknown on {result.provider.value}; needs reconciliation"
+        return result.provider, reason, result.response
+
+    def _build_internal_request(self, charge_in: PaymentCreate, customer: Customer, idempotency_key: Optional[str] = None) -> InternalChargeRequest:
+        return InternalChargeRequest(
             amount=charge_in.amount,
             currency=charge_in.currency,
             payment_method_token=customer.payment_method_token,
             merchant_id=charge_in.merchant_id,
             customer_id=charge_in.customer_id,
-            description=charge_in.description
+            description=charge_in.description,
+            idempotency_key=idempotency_key
         )
-        
-        processor_resp = processor.process_charge(internal_req)
 
-        # 5. Map Result to Payment Record
-        payment = Payment(
+    def _build_payment(
+        self, 
+        charge_in: PaymentCreate, 
+        provider_type: PaymentProvider, 
+        reason: str, 
+        processor_resp: InternalChargeResponse,
+        payment_id: Optional[str] = None
+    ) -> Payment:
+        return Payment(
             **charge_in.model_dump(exclude={'provider'}),
+            **({"id": payment_id} if payment_id else {}),
             provider=provider_type,
             routing_decision=reason,
-            status=PaymentStatus.COMPLETED if processor_resp.status == "success" else PaymentStatus.FAILED,
+            status=self._payment_status(processor_resp),
             provider_payment_id=processor_resp.processor_transaction_id,
             updated_at=now_utc()
         )
 
-        saved_payment = self.payment_repo.save(payment)
-
-        # 6. Feedback Loop
-        if self.feedback_collector:
-            self.feedback_collector.collect(saved_payment)
-
-        return saved_payment
+    def _payment_status(self, processor_resp: InternalChargeResponse) -> PaymentStatus:
+        if processor_resp.status == "success":
+            return PaymentStatus.COMPLETED
+        # The processor may still have captured it; a failed status would invite a retry
+        if is_unknown_outcome(processor_resp):
+            return PaymentStatus.PENDING
+        return PaymentStatus.FAILED
 
     def refund_payment(self, payment_id: str, amount: Optional[float] = None) -> Payment:
         # 1. Fetch Payment
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy.engine import Engine
+from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.repositories.migrations import (
+    is_partitioned, ensure_route_partitions, drop_expired_route_partitions
+)
+from payments_service.app.core.utils.datetime_utils import now_utc
+
+class PrecalculatedRouteSweeper:
+    """
+    Removes expired pre-calculated routes in the background.
+
+    retention="delete" deletes expired rows in chunks of chunk_size by primary
+    key, each in its own short transaction, pausing pause_seconds between
+    chunks and never exceeding max_rows_per_second (0: no cap), so a renewal
+    cycle's worth of expiries doesn't lock or bloat the table in one go.
+
+    retention="partition" (PostgreSQL, after migrate.py --partition-routes)
+    drops whole daily partitions once every route in them has expired and
+    keeps upcoming days' partitions created; the live partitions charges read
+    from are never touched. Rows that fell into the default partition are
+    still deleted in chunks.
+    """
+    RETENTION_MODES = ("delete", "partition")
+
+    def __init__(
+        self,
+        repository: PrecalculatedRouteRepository,
+        engine: Optional[Engine] = None,
+        retention: str = "delete",
+        chunk_size: int = 1000,
+        pause_seconds: float = 0.1,
+        max_rows_per_second: float = 0,
+        interval_seconds: float = 300.0,
+        partition_days_ahead: int = 14
+    ):
+        if retention not in self.RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode {retention!r}; expected one of {self.RETENTION_MODES}")
+        if retention == "partition" and engine is None:
+            raise ValueError("Partition retention needs the database engine")
+        self.repository = repository
+        self.engine = engine
+        self.retention = retention
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self.max_rows_per_second = max_rows_per_second
+        self.interval_seconds = interval_seconds
+        self.partition_days_ahead = partition_days_ahead
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.chunks = 0
+        self.rows_deleted = 0
+        self.partitions_dropped = 0
+        self.errors = 0
+        self.throttled_seconds = 0.0
+        self.last_run: Dict[str, Any] = {}
+
+    @classmethod
+    def from_env(cls, repository: PrecalculatedRouteRepository, engine: Optional[Engine] = None) -> "PrecalculatedRouteSweeper":
+        return cls(
+            repository,
+            engine,
+            retention=os.getenv("PRECALC_ROUTE_RETENTION", "delete"),
+            chunk_size=int(os.getenv("PRECALC_ROUTE_SWEEP_CHUNK_SIZE", "1000")),
+            pause_seconds=float(os.getenv("PRECALC_ROUTE_SWEEP_PAUSE_SECONDS", "0.1")),
+            max_rows_per_second=float(os.getenv("PRECALC_ROUTE_SWEEP_MAX_ROWS_PER_SECOND", "0")),
+            interval_seconds=float(os.getenv("PRECALC_ROUTE_SWEEP_INTERVAL_SECONDS", "300")),
+            partition_days_ahead=int(os.getenv("PRECALC_ROUTE_PARTITION_DAYS_AHEAD", "14"))
+        )
+
+    def run_once(self) -> int:
+        """
+        One sweep. Returns the number of routes deleted row by row.
+        """
+        started = time.perf_counter()
+        now = now_utc()
+        cutoff = now
+        dropped = []
+        if self.retention == "partition":
+            with self.engine.connect() as conn:
+                partitioned = is_partitioned(conn, "precalculated_routes")
+            if partitioned:
+                ensure_route_partitions(self.engine, self.partition_days_ahead)
+                dropped = drop_expired_route_partitions(self.engine, now)
+                # Only the default partition can still hold rows older than today
+                cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            else:
+                print("[RouteSweeper] precalculated_routes isn't partitioned; deleting in chunks")
+
+        deleted = 0
+        chunks = 0
+        while not self._stopped.is_set():
+            chunk_started = time.perf_counter()
+            count = self.repository.delete_expired_chunk(cutoff, limit=self.chunk_size)
+            # Skipped (locked) rows can make a chunk short; only an empty one means done
+            if count == 0:
+                break
+            deleted += count
+            chunks += 1
+            self._throttle(count, time.perf_counter() - chunk_started)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.runs += 1
+            self.chunks += chunks
+            self.rows_deleted += deleted
+            self.partitions_dropped += len(dropped)
+            self.last_run = {
+                "at": now.isoformat(),
+                "rows_deleted": deleted,
+                "chunks": chunks,
+                "partitions_dropped": dropped,
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(deleted / elapsed) if elapsed > 0 else 0
+            }
+        if deleted or dropped:
+            print(f"[RouteSweeper] Deleted {deleted} expired routes in {chunks} chunk(s), dropped {len(dropped)} partition(s) in {elapsed:.1f}s")
+        return deleted
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="precalculated-route-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "retention": self.retention,
+                "runs": self.runs,
+                "chunks": self.chunks,
+                "rows_deleted": self.rows_deleted,
+                "partitions_dropped": self.partitions_dropped,
+                "errors": self.errors,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "last_run": dict(self.last_run)
+            }
+
+    def _throttle(self, rows: int, chunk_seconds: float):
+        delay = self.pause_seconds
+        if self.max_rows_per_second > 0:
+            delay = max(delay, rows / self.max_rows_per_second - chunk_seconds)
+        if delay > 0:
+            with self._lock:
+                self.throttled_seconds += delay
+            self._stopped.wait(delay)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[RouteSweeper] Sweep failed: {e}")
+                with self._lock:
+                    self.errors += 1
+            self._stopped.wait(self.interval_seconds)
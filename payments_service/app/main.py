@@ -1,9 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from payments_service.app.core.api import payments, merchants, customers
+from payments_service.app.core.api.dependencies import processor_registry, performance_repo, payment_service, provider_health_cache, async_redis_client, routing_strategy, routing_stats, warm_precalculated_routes
 from dotenv import load_dotenv
 
-app = FastAPI(title="Payments Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: load upcoming renewals' routes in the background; charges fall back to the DB meanwhile
+    warm_up = asyncio.create_task(asyncio.to_thread(warm_precalculated_routes))
+    yield
+    await warm_up
+    # Shutdown: void losing hedged charges while the processors can still be reached,
+    # then release pooled processor connections and background listeners
+    if payment_service.hedged_executor:
+        await payment_service.hedged_executor.aclose()
+    await processor_registry.aclose_all()
+    processor_registry.stop_circuit_listener()
+    performance_repo.stop_invalidation_listener()
+    provider_health_cache.stop_refresher()
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
+    print(f"[Routing] Stats: {routing_stats()}")
+    if hasattr(routing_strategy, "close"):
+        routing_strategy.close()
+
+app = FastAPI(title="Payments Service", lifespan=lifespan)
 
 # CORS setup
 app.add_middleware(
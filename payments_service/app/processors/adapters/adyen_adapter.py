@@ -18,6 +18,13 @@ class AdyenProcessor(PaymentProcessor):
     def refund(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
         return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
 
+    async def process_charge_async(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        # Simulated locally, no I/O to offload
+        return self.process_charge(request)
+
+    async def refund_async(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
+        return self.refund(processor_transaction_id, amount)
+
     @property
     def provider_name(self) -> str:
         return "adyen"
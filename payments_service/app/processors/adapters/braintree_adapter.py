@@ -1,6 +1,7 @@
 import braintree
 import os
 from typing import Optional, Dict, Any
+from payments_service.app.processors.errors import PROCESSOR_ERROR, PROCESSOR_TIMEOUT, PROCESSOR_UNAVAILABLE, RATE_LIMITED
 from payments_service.app.processors.interfaces import PaymentProcessor
 from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse
 
@@ -8,6 +9,8 @@ class BraintreeProcessor(PaymentProcessor):
     """
     Braintree implementation of the PaymentProcessor interface.
     Uses the official Braintree Python SDK.
+    The SDK is synchronous, so the async contract relies on the base class
+    offloading calls to a worker thread.
     """
 
     def __init__(self, merchant_id: str, public_key: str, private_key: str, environment: str = "sandbox"):
@@ -57,10 +60,34 @@ class BraintreeProcessor(PaymentProcessor):
         except Exception as e:
             return InternalChargeResponse(
                 status="failure",
+                error_code=self._error_code(e),
                 error_message=f"Braintree SDK Error: {str(e)}",
                 raw_response={"error_type": type(e).__name__}
             )
 
+    def _error_code(self, e: Exception) -> str:
+        """
+        Shared technical code for an SDK exception, so the circuit breaker
+        counts outages. Only refused or unauthenticated requests are known not
+        to have been processed.
+        """
+        if isinstance(e, braintree.exceptions.TooManyRequestsError):
+            return RATE_LIMITED
+        if isinstance(e, (
+            braintree.exceptions.ServiceUnavailableError,
+            braintree.exceptions.http.timeout_error.ConnectTimeoutError,
+            braintree.exceptions.AuthenticationError,
+            braintree.exceptions.AuthorizationError
+        )):
+            return PROCESSOR_UNAVAILABLE
+        if isinstance(e, (
+            braintree.exceptions.http.TimeoutError,
+            braintree.exceptions.RequestTimeoutError,
+            braintree.exceptions.GatewayTimeoutError
+        )):
+            return PROCESSOR_TIMEOUT
+        return PROCESSOR_ERROR
+
     def refund(self, processor_transaction_id: str, amount: Optional[float] = None) -> InternalChargeResponse:
         """
         Refund a previously executed Braintree transaction.
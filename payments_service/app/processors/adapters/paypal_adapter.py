@@ -1,51 +1,126 @@
 import httpx
+import asyncio
 import base64
-import time
+import threading
 import os
-from typing import Optional, Dict, Any, Union
+import redis
+from typing import Optional, Dict, Any, Set, Tuple, Union
+from payments_service.app.processors.errors import PROCESSOR_UNAVAILABLE, exception_error_code, http_status_error_code
 from payments_service.app.processors.interfaces import PaymentProcessor
 from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse
+from payments_service.app.processors.http_client import create_http_client, create_async_http_client
+from payments_service.app.processors.token_manager import OAuthTokenManager
 
 class PayPalProcessor(PaymentProcessor):
     """
     PayPal implementation of the PaymentProcessor interface.
     Uses the PayPal V2 REST API with internal abstraction to minimize boilerplate.
+    Requests go through long-lived pooled clients, so the token call, order
+    creation and capture reuse one kept-alive connection. The OAuth token is
+    refreshed single-flight (and shared across workers when Redis is given).
     """
 
-    def __init__(self, client_id: str, secret: str, environment: str = "sandbox"):
+    def __init__(self, client_id: str, secret: str, environment: str = "sandbox", redis_client: Optional[redis.Redis] = None):
         self.client_id = client_id
         self.secret = secret
         self.base_url = "https://api-m.sandbox.paypal.com" if environment == "sandbox" else "https://api-m.paypal.com"
-        self._access_token: Optional[str] = None
-        self._token_expiry: float = 0
+        self._tokens = OAuthTokenManager(
+            self._fetch_token,
+            redis_client=redis_client,
+            cache_key=f"oauth_token:paypal:{environment}:{client_id}"
+        )
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client_lock = threading.Lock()
+        self._closing: Set[asyncio.Task] = set()
 
-    def _get_access_token(self) -> str:
-        if self._access_token and time.time() < self._token_expiry:
-            return self._access_token
+    def _http(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = create_http_client()
+        return self._client
 
-        auth = base64.b64encode(f"{self.client_id}:{self.secret}".encode()).decode()
-        headers = {
-            "Authorization": f"Basic {auth}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
-        with httpx.Client() as client:
-            resp = client.post(
-                f"{self.base_url}/v1/oauth2/token",
-                headers=headers,
-                data={"grant_type": "client_credentials"}
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            self._access_token = data["access_token"]
-            self._token_expiry = time.time() + data["expires_in"] - 60
-            return self._access_token
+    def _async_http(self) -> httpx.AsyncClient:
+        # Async connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            if self._async_client is not None:
+                self._close_async_client(self._async_client, self._async_client_loop)
+            self._async_client = create_async_http_client()
+            self._async_client_loop = loop
+        return self._async_client
 
-    def _request(self, method: str, path: str, json_data: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    def close(self):
+        self._tokens.close()
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        if self._async_client is not None:
+            self._close_async_client(self._async_client, self._async_client_loop)
+            self._async_client = None
+            self._async_client_loop = None
+
+    async def aclose(self):
+        if self._async_client is not None and self._async_client_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+        self.close()
+
+    def _close_async_client(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
         """
-        Internal helper to perform authenticated requests with common headers.
+        Closes a replaced async client's pool: on its own loop if that is still
+        running, otherwise on the current loop (or a throwaway one).
         """
-        token = self._get_access_token()
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._aclose_quietly(client), loop)
+            return
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is not None:
+            task = current.create_task(self._aclose_quietly(client))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        elif not loop.is_closed():
+            loop.run_until_complete(self._aclose_quietly(client))
+        else:
+            asyncio.run(self._aclose_quietly(client))
+
+    async def _aclose_quietly(self, client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Sockets opened on a loop that has since closed may fail to shut down cleanly
+            print(f"[PayPal] Closing a replaced async client failed: {e}")
+
+    def _token_request_kwargs(self) -> Dict[str, Any]:
+        auth = base64.b64encode(f"{self.client_id}:{self.secret}".encode()).decode()
+        return {
+            "headers": {
+                "Authorization": f"Basic {auth}",
+                "Content-Type": "application/x-www-form-urlencoded"
+            },
+            "data": {"grant_type": "client_credentials"}
+        }
+
+    def _fetch_token(self) -> Tuple[str, float]:
+        resp = self._http().post(f"{self.base_url}/v1/oauth2/token", **self._token_request_kwargs())
+        resp.raise_for_status()
+        data = resp.json()
+        return data["access_token"], data["expires_in"]
+
+    def _get_access_token(self) -> str:
+        return self._tokens.get_token()
+
+    async def _get_access_token_async(self) -> str:
+        return await self._tokens.get_token_async()
+
+    def _request_headers(self, token: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         default_headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -53,17 +128,30 @@ class PayPalProcessor(PaymentProcessor):
         }
         if headers:
             default_headers.update(headers)
-        
-        with httpx.Client() as client:
-            resp = client.request(method, f"{self.base_url}{path}", headers=default_headers, json=json_data)
-            return resp
+        return default_headers
 
-    def process_charge(self, request: InternalChargeRequest) -> InternalChargeResponse:
+    def _request(self, method: str, path: str, json_data: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
         """
-        Execute a payment charge: 1. Create Order -> 2. Capture Order.
+        Internal helper to perform authenticated requests with common headers.
         """
-        # 1. Create Order
-        order_data = {
+        token = self._get_access_token()
+        return self._http().request(method, f"{self.base_url}{path}", headers=self._request_headers(token, headers), json=json_data)
+
+    async def _request_async(self, method: str, path: str, json_data: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Async counterpart of _request.
+        """
+        token = await self._get_access_token_async()
+        return await self._async_http().request(method, f"{self.base_url}{path}", headers=self._request_headers(token, headers), json=json_data)
+
+    def _idempotency_headers(self, request: InternalChargeRequest, step: str) -> Optional[Dict[str, str]]:
+        # PayPal replays the original response for a repeated PayPal-Request-Id
+        if not request.idempotency_key:
+            return None
+        return {"PayPal-Request-Id": f"{request.idempotency_key}:{step}"}
+
+    def _order_payload(self, request: InternalChargeRequest) -> Dict[str, Any]:
+        return {
             "intent": "CAPTURE",
             "purchase_units": [{
                 "amount": {
@@ -80,69 +168,150 @@ class PayPalProcessor(PaymentProcessor):
                 }
             }
         }
-        
-        resp = self._request("POST", "/v2/checkout/orders", json_data=order_data)
+
+    def _completed_order_response(self, order_data_resp: Dict[str, Any]) -> Optional[InternalChargeResponse]:
+        """
+        Returns a success response if the order was already captured on creation
+        (happens sometimes with direct card processing in sandbox).
+        """
+        if order_data_resp.get("status") != "COMPLETED":
+            return None
+        # Extract Capture ID from purchase units if available
+        try:
+            capture_id = order_data_resp["purchase_units"][0]["payments"]["captures"][0]["id"]
+            return InternalChargeResponse(
+                status="success",
+                processor_transaction_id=capture_id,
+                raw_response=order_data_resp
+            )
+        except (KeyError, IndexError):
+            return None # Fallback to explicit capture if we can't find it
+
+    def _is_already_captured(self, resp: httpx.Response) -> bool:
+        try:
+            err_data = resp.json()
+            return err_data.get("name") == "UNPROCESSABLE_ENTITY" and any(d.get("issue") == "ORDER_ALREADY_CAPTURED" for d in err_data.get("details", []))
+        except:
+            return False
+
+    def _capture_response(self, capture_data: Dict[str, Any]) -> InternalChargeResponse:
+        capture_id = capture_data["purchase_units"][0]["payments"]["captures"][0]["id"]
+        return InternalChargeResponse(
+            status="success",
+            processor_transaction_id=capture_id,
+            raw_response=capture_data
+        )
+
+    def _refund_payload(self, amount: Optional[float]) -> Dict[str, Any]:
+        refund_data = {}
+        if amount:
+            refund_data["amount"] = {
+                "value": f"{amount:.2f}",
+                "currency_code": "USD" # Should be dynamic in full implementation
+            }
+        return refund_data
+
+    def process_charge(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        """
+        Execute a payment charge: 1. Create Order -> 2. Capture Order.
+        """
+        try:
+            # Fetched up front (and cached past the charge) so an auth outage is never mistaken for a sent charge
+            self._get_access_token()
+        except Exception as e:
+            return self._token_error(e)
+        try:
+            return self._charge(request)
+        except httpx.HTTPError as e:
+            return self._transport_error(e)
+
+    async def process_charge_async(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        """
+        Async counterpart of process_charge using a pooled httpx.AsyncClient.
+        """
+        try:
+            await self._get_access_token_async()
+        except Exception as e:
+            return self._token_error(e)
+        try:
+            return await self._charge_async(request)
+        except httpx.HTTPError as e:
+            return self._transport_error(e)
+
+    def _charge(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        # 1. Create Order
+        resp = self._request("POST", "/v2/checkout/orders", json_data=self._order_payload(request), headers=self._idempotency_headers(request, "order"))
         if resp.status_code != 201:
             return self._error_response("Order Creation Failed", resp)
         
         order_data_resp = resp.json()
         order_id = order_data_resp["id"]
         
-        # If order is already 'COMPLETED' (happens sometimes with direct card processing in sandbox)
-        if order_data_resp.get("status") == "COMPLETED":
-            # Extract Capture ID from purchase units if available
-            try:
-                capture_id = order_data_resp["purchase_units"][0]["payments"]["captures"][0]["id"]
-                return InternalChargeResponse(
-                    status="success",
-                    processor_transaction_id=capture_id,
-                    raw_response=order_data_resp
-                )
-            except (KeyError, IndexError):
-                pass # Fallback to explicit capture if we can't find it
+        completed = self._completed_order_response(order_data_resp)
+        if completed:
+            return completed
 
         # 2. Capture Order
-        resp = self._request("POST", f"/v2/checkout/orders/{order_id}/capture")
+        resp = self._request("POST", f"/v2/checkout/orders/{order_id}/capture", headers=self._idempotency_headers(request, "capture"))
         if resp.status_code not in (200, 201):
             # If it's already captured, handle gracefully
-            try:
-                err_data = resp.json()
-                if err_data.get("name") == "UNPROCESSABLE_ENTITY" and any(d.get("issue") == "ORDER_ALREADY_CAPTURED" for d in err_data.get("details", [])):
-                    # Fetch the order again to get the capture ID if we missed it
-                    status_resp = self._request("GET", f"/v2/checkout/orders/{order_id}")
-                    if status_resp.status_code == 200:
-                        order_data_resp = status_resp.json()
-                        capture_id = order_data_resp["purchase_units"][0]["payments"]["captures"][0]["id"]
-                        return InternalChargeResponse(
-                            status="success",
-                            processor_transaction_id=capture_id,
-                            raw_response=order_data_resp
-                        )
-            except:
-                pass
+            if self._is_already_captured(resp):
+                # Fetch the order again to get the capture ID if we missed it
+                status_resp = self._request("GET", f"/v2/checkout/orders/{order_id}")
+                if status_resp.status_code == 200:
+                    try:
+                        return self._capture_response(status_resp.json())
+                    except:
+                        pass
             return self._error_response("Capture Failed", resp)
 
-        capture_data = resp.json()
-        capture_id = capture_data["purchase_units"][0]["payments"]["captures"][0]["id"]
+        return self._capture_response(resp.json())
 
-        return InternalChargeResponse(
-            status="success",
-            processor_transaction_id=capture_id,
-            raw_response=capture_data
-        )
+    async def _charge_async(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        resp = await self._request_async("POST", "/v2/checkout/orders", json_data=self._order_payload(request), headers=self._idempotency_headers(request, "order"))
+        if resp.status_code != 201:
+            return self._error_response("Order Creation Failed", resp)
+
+        order_data_resp = resp.json()
+        order_id = order_data_resp["id"]
+
+        completed = self._completed_order_response(order_data_resp)
+        if completed:
+            return completed
+
+        resp = await self._request_async("POST", f"/v2/checkout/orders/{order_id}/capture", headers=self._idempotency_headers(request, "capture"))
+        if resp.status_code not in (200, 201):
+            if self._is_already_captured(resp):
+                status_resp = await self._request_async("GET", f"/v2/checkout/orders/{order_id}")
+                if status_resp.status_code == 200:
+                    try:
+                        return self._capture_response(status_resp.json())
+                    except:
+                        pass
+            return self._error_response("Capture Failed", resp)
+
+        return self._capture_response(resp.json())
 
     def refund(self, processor_transaction_id: str, amount: Optional[float] = None) -> InternalChargeResponse:
         """
         Refund a previously executed PayPal capture.
         """
-        refund_data = {}
-        if amount:
-            refund_data["amount"] = {
-                "value": f"{amount:.2f}",
-                "currency_code": "USD" # Should be dynamic in full implementation
-            }
+        resp = self._request("POST", f"/v2/payments/captures/{processor_transaction_id}/refund", json_data=self._refund_payload(amount))
+        if resp.status_code not in (200, 201):
+            return self._error_response("Refund Failed", resp)
+
+        result = resp.json()
+        return InternalChargeResponse(
+            status="success",
+            processor_transaction_id=result["id"],
+            raw_response=result
+        )
 
-        resp = self._request("POST", f"/v2/payments/captures/{processor_transaction_id}/refund", json_data=refund_data)
+    async def refund_async(self, processor_transaction_id: str, amount: Optional[float] = None) -> InternalChargeResponse:
+        """
+        Async counterpart of refund.
+        """
+        resp = await self._request_async("POST", f"/v2/payments/captures/{processor_transaction_id}/refund", json_data=self._refund_payload(amount))
         if resp.status_code not in (200, 201):
             return self._error_response("Refund Failed", resp)
 
@@ -166,10 +335,29 @@ class PayPalProcessor(PaymentProcessor):
 
         return InternalChargeResponse(
             status="failure",
+            # Outages (429/5xx) get the shared technical codes so the circuit breaker counts them
+            error_code=http_status_error_code(resp.status_code),
             error_message=f"PayPal {context}: {message}",
             raw_response=data
         )
 
+    def _transport_error(self, e: httpx.HTTPError) -> InternalChargeResponse:
+        return InternalChargeResponse(
+            status="failure",
+            error_code=exception_error_code(e),
+            error_message=f"PayPal request failed: {type(e).__name__}: {e}",
+            raw_response={"error_type": type(e).__name__}
+        )
+
+    def _token_error(self, e: Exception) -> InternalChargeResponse:
+        # No charge request was sent, so another provider can safely be tried
+        return InternalChargeResponse(
+            status="failure",
+            error_code=PROCESSOR_UNAVAILABLE,
+            error_message=f"PayPal authentication failed: {type(e).__name__}: {e}",
+            raw_response={"error_type": type(e).__name__}
+        )
+
     @property
     def provider_name(self) -> str:
         return "paypal"
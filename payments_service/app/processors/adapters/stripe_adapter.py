@@ -1,5 +1,9 @@
 import stripe
 import os
+from typing import Any, Dict
+from payments_service.app.processors.errors import (
+    PROCESSOR_ERROR, PROCESSOR_TIMEOUT, RATE_LIMITED, http_status_error_code
+)
 from payments_service.app.processors.interfaces import PaymentProcessor
 from payments_service.app.processors.models.gateway import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
 
@@ -14,41 +18,87 @@ class StripeProcessor(PaymentProcessor):
         if self.api_key:
             stripe.api_key = self.api_key
 
+    def _is_simulated(self) -> bool:
+        return not self.api_key or self.api_key == "sk_test_mock"
+
+    def _intent_params(self, request: InternalChargeRequest) -> Dict[str, Any]:
+        params = {
+            "amount": int(request.amount * 100), # Stripe expects amounts in cents
+            "currency": request.currency.lower(),
+            "payment_method": request.payment_method_token,
+            "confirm": True,
+            "description": request.description,
+            "metadata": request.metadata,
+            "automatic_payment_methods": {"enabled": True, "allow_redirects": "never"}
+        }
+        if request.idempotency_key:
+            params["idempotency_key"] = request.idempotency_key
+        return params
+
+    def _refund_params(self, processor_transaction_id: str, amount: float) -> Dict[str, Any]:
+        refund_params = {
+            "payment_intent": processor_transaction_id,
+        }
+        if amount is not None:
+            refund_params["amount"] = int(amount * 100)
+        return refund_params
+
+    def _error_code(self, e: stripe.error.StripeError) -> str:
+        # Outages get the shared technical codes so the circuit breaker counts them
+        if isinstance(e, stripe.error.RateLimitError):
+            return RATE_LIMITED
+        if isinstance(e, stripe.error.APIConnectionError):
+            # Covers read timeouts too, so the charge may have gone through
+            return PROCESSOR_TIMEOUT
+        if isinstance(e, stripe.error.APIError):
+            return http_status_error_code(e.http_status or 500) or PROCESSOR_ERROR
+        return e.code or "stripe_error"
+
+    def _charge_error(self, e: Exception) -> InternalChargeResponse:
+        if isinstance(e, stripe.error.StripeError):
+            return InternalChargeResponse(
+                status=ProcessorStatus.FAILURE,
+                error_code=self._error_code(e),
+                error_message=str(e),
+                raw_response=getattr(e, "json_body", None) or {}
+            )
+        return InternalChargeResponse(
+            status=ProcessorStatus.FAILURE,
+            error_code="internal_error",
+            error_message=f"Unexpected error: {str(e)}"
+        )
+
     def process_charge(self, request: InternalChargeRequest) -> InternalChargeResponse:
-        if not self.api_key or self.api_key == "sk_test_mock":
+        if self._is_simulated():
             # Fallback to simulation if no real key is provided
             return self._simulate_charge(request)
 
         try:
             # Create a PaymentIntent in Stripe
-            intent = stripe.PaymentIntent.create(
-                amount=int(request.amount * 100), # Stripe expects amounts in cents
-                currency=request.currency.lower(),
-                payment_method=request.payment_method_token,
-                confirm=True,
-                description=request.description,
-                metadata=request.metadata,
-                automatic_payment_methods={"enabled": True, "allow_redirects": "never"}
-            )
+            intent = stripe.PaymentIntent.create(**self._intent_params(request))
 
             return InternalChargeResponse(
                 status=ProcessorStatus.SUCCESS,
                 processor_transaction_id=intent.id,
                 raw_response=intent.to_dict()
             )
-        except stripe.error.StripeError as e:
-            return InternalChargeResponse(
-                status=ProcessorStatus.FAILURE,
-                error_code=e.code or "stripe_error",
-                error_message=str(e),
-                raw_response=e.json_body if hasattr(e, "json_body") else {}
-            )
         except Exception as e:
+            return self._charge_error(e)
+
+    async def process_charge_async(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        if self._is_simulated():
+            return self._simulate_charge(request)
+
+        try:
+            intent = await stripe.PaymentIntent.create_async(**self._intent_params(request))
+
             return InternalChargeResponse(
-                status=ProcessorStatus.FAILURE,
-                error_code="internal_error",
-                error_message=f"Unexpected error: {str(e)}"
+                status=ProcessorStatus.SUCCESS,
+                processor_transaction_id=intent.id,
+                raw_response=intent.to_dict()
             )
+        except Exception as e:
+            return self._charge_error(e)
 
     def _simulate_charge(self, request: InternalChargeRequest) -> InternalChargeResponse:
         """Fallback mock logic for testing without keys."""
@@ -67,16 +117,28 @@ class StripeProcessor(PaymentProcessor):
 
     def refund(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
         try:
-            if not self.api_key or self.api_key == "sk_test_mock":
+            if self._is_simulated():
                 return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
                 
-            refund_params = {
-                "payment_intent": processor_transaction_id,
-            }
-            if amount is not None:
-                refund_params["amount"] = int(amount * 100)
-                
-            refund = stripe.Refund.create(**refund_params)
+            refund = stripe.Refund.create(**self._refund_params(processor_transaction_id, amount))
+            return InternalChargeResponse(
+                status=ProcessorStatus.SUCCESS,
+                processor_transaction_id=refund.id,
+                raw_response=refund.to_dict()
+            )
+        except Exception as e:
+            return InternalChargeResponse(
+                status=ProcessorStatus.FAILURE,
+                error_code="refund_failed",
+                error_message=str(e)
+            )
+
+    async def refund_async(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
+        try:
+            if self._is_simulated():
+                return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
+
+            refund = await stripe.Refund.create_async(**self._refund_params(processor_transaction_id, amount))
             return InternalChargeResponse(
                 status=ProcessorStatus.SUCCESS,
                 processor_transaction_id=refund.id,
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Dict, Optional
+from payments_service.app.processors.errors import TECHNICAL_ERROR_CODES
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+def is_technical_failure(response: InternalChargeResponse) -> bool:
+    return response.status != ProcessorStatus.SUCCESS and response.error_code in TECHNICAL_ERROR_CODES
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one provider.
+
+    - CLOSED: calls flow; the last window_size outcomes are tracked. Once at least
+      min_calls are recorded and the share of failed or slow (>= slow_call_ms) calls
+      reaches failure_rate_threshold, the circuit opens.
+    - OPEN: calls are rejected until open_seconds have passed.
+    - HALF_OPEN: up to half_open_probes trial calls go through; a healthy probe
+      closes the circuit, a failed one re-opens it.
+    """
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_ms: Optional[float] = None,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        on_state_change: Optional[Callable[[str, CircuitState], None]] = None
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.on_state_change = on_state_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (failed, latency_ms) per call
+        self._window = deque(maxlen=window_size)
+        self._failures = 0
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @classmethod
+    def from_env(cls, name: str, **kwargs) -> "CircuitBreaker":
+        slow_call_ms = os.getenv("CIRCUIT_SLOW_CALL_MS", "5000")
+        return cls(
+            name,
+            failure_rate_threshold=float(os.getenv("CIRCUIT_FAILURE_RATE_THRESHOLD", "0.5")),
+            slow_call_ms=float(slow_call_ms) if slow_call_ms else None,
+            window_size=int(os.getenv("CIRCUIT_WINDOW_SIZE", "20")),
+            min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "10")),
+            open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+            **kwargs
+        )
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            changed = self._maybe_half_open()
+        self._notify(changed)
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            changed = self._maybe_half_open()
+            if self._state == CircuitState.CLOSED:
+                allowed = True
+            elif self._state == CircuitState.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                allowed = True
+            else:
+                allowed = False
+        self._notify(changed)
+        return allowed
+
+    def record(self, failed: bool, latency_ms: float):
+        failed = failed or (self.slow_call_ms is not None and latency_ms >= self.slow_call_ms)
+        changed = None
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                changed = self._transition(CircuitState.OPEN if failed else CircuitState.CLOSED)
+            elif self._state == CircuitState.CLOSED:
+                if len(self._window) == self._window.maxlen and self._window[0][0]:
+                    self._failures -= 1
+                self._window.append((failed, latency_ms))
+                self._failures += failed
+                if len(self._window) >= self.min_calls and self._failures / len(self._window) >= self.failure_rate_threshold:
+                    changed = self._transition(CircuitState.OPEN)
+            # Calls that started before the circuit opened are ignored
+        self._notify(changed)
+
+    def apply_remote_state(self, state: CircuitState):
+        """
+        Adopts a state published by another node, without re-publishing it.
+        """
+        with self._lock:
+            if state != self._state:
+                self._transition(state)
+
+    def snapshot(self) -> Dict:
+        state = self.state
+        with self._lock:
+            calls = len(self._window)
+            return {
+                "state": state.value,
+                "calls": calls,
+                "error_rate": self._failures / calls if calls else 0.0,
+                "avg_latency_ms": sum(latency for _, latency in self._window) / calls if calls else None
+            }
+
+    def _maybe_half_open(self) -> Optional[CircuitState]:
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            return self._transition(CircuitState.HALF_OPEN)
+        return None
+
+    def _transition(self, state: CircuitState) -> CircuitState:
+        # Must be called with self._lock held
+        self._state = state
+        self._probes = 0
+        if state == CircuitState.OPEN:
+            self._opened_at = self._clock()
+        elif state == CircuitState.CLOSED:
+            self._window.clear()
+            self._failures = 0
+        return state
+
+    def _notify(self, changed: Optional[CircuitState]):
+        if changed is not None and self.on_state_change is not None:
+            self.on_state_change(self.name, changed)
+
+class CircuitBreakingProcessor(PaymentProcessor):
+    """
+    Wraps an adapter so every charge feeds its provider's circuit breaker.
+    Charges are rejected locally while the circuit is open; refunds and voids
+    always go through.
+    """
+    def __init__(self, processor: PaymentProcessor, breaker: CircuitBreaker):
+        self.processor = processor
+        self.breaker = breaker
+
+    def process_charge(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        if not self.breaker.allow_request():
+            return self._rejected()
+        started = time.perf_counter()
+        try:
+            response = self.processor.process_charge(request)
+        except Exception:
+            self.breaker.record(True, (time.perf_counter() - started) * 1000)
+            raise
+        self.breaker.record(is_technical_failure(response), (time.perf_counter() - started) * 1000)
+        return response
+
+    async def process_charge_async(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        if not self.breaker.allow_request():
+            return self._rejected()
+        started = time.perf_counter()
+        try:
+            response = await self.processor.process_charge_async(request)
+        except Exception:
+            self.breaker.record(True, (time.perf_counter() - started) * 1000)
+            raise
+        self.breaker.record(is_technical_failure(response), (time.perf_counter() - started) * 1000)
+        return response
+
+    def refund(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
+        return self.processor.refund(processor_transaction_id, amount)
+
+    async def refund_async(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
+        return await self.processor.refund_async(processor_transaction_id, amount)
+
+    def close(self) -> None:
+        self.processor.close()
+
+    async def aclose(self) -> None:
+        await self.processor.aclose()
+
+    @property
+    def provider_name(self) -> str:
+        return self.processor.provider_name
+
+    def __getattr__(self, name):
+        # Adapter-specific attributes (e.g. base_url) stay reachable through the wrapper
+        if name == "processor":
+            raise AttributeError(name)
+        return getattr(self.processor, name)
+
+    def _rejected(self) -> InternalChargeResponse:
+        return InternalChargeResponse(
+            status=ProcessorStatus.FAILURE,
+            error_code="circuit_open",
+            error_message=f"Circuit open for {self.breaker.name}; charge not attempted"
+        )
@@ -0,0 +1,66 @@
+from typing import Optional
+import httpx
+from payments_service.app.processors.models import InternalChargeResponse, ProcessorStatus
+
+# Error codes adapters report for failures that say something about the provider
+# rather than the card. Declines keep the processor's own codes.
+PROCESSOR_UNAVAILABLE = "processor_unavailable" # never reached the processor, or refused before processing
+RATE_LIMITED = "rate_limited"                   # throttled by the processor before processing
+PROCESSOR_TIMEOUT = "processor_timeout"         # sent, but no answer came back
+PROCESSOR_ERROR = "processor_error"             # server error or unexpected exception
+
+TECHNICAL_ERROR_CODES = frozenset({
+    PROCESSOR_UNAVAILABLE,
+    RATE_LIMITED,
+    PROCESSOR_TIMEOUT,
+    PROCESSOR_ERROR,
+    "internal_error",
+    "api_error",
+    "api_connection_error",
+    "rate_limit",
+    "timeout",
+})
+
+# The processor may have captured the charge: it must be reconciled, not retried elsewhere
+UNKNOWN_OUTCOME_CODES = frozenset({
+    PROCESSOR_TIMEOUT,
+    PROCESSOR_ERROR,
+    "internal_error",
+    "api_error",
+    "timeout",
+})
+
+def is_unknown_outcome(response: InternalChargeResponse) -> bool:
+    """
+    True when the processor may have captured the charge (timeouts, server
+    errors, pending answers), so it must be reconciled before charging elsewhere.
+    """
+    if response.status == ProcessorStatus.PENDING:
+        return True
+    return response.status == ProcessorStatus.FAILURE and response.error_code in UNKNOWN_OUTCOME_CODES
+
+def http_status_error_code(status_code: int) -> Optional[str]:
+    """
+    Technical error code for a processor's HTTP status, or None for statuses
+    that describe the request itself (declines, validation errors).
+    """
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code == 503:
+        return PROCESSOR_UNAVAILABLE
+    if status_code >= 500:
+        return PROCESSOR_ERROR
+    return None
+
+def exception_error_code(e: Exception) -> str:
+    """
+    Technical error code for an exception raised while calling a processor.
+    Only failures to open a connection are known not to have reached it.
+    """
+    if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, ConnectionRefusedError)):
+        return PROCESSOR_UNAVAILABLE
+    if isinstance(e, httpx.TimeoutException):
+        return PROCESSOR_TIMEOUT
+    if isinstance(e, httpx.HTTPStatusError):
+        return http_status_error_code(e.response.status_code) or PROCESSOR_ERROR
+    return PROCESSOR_ERROR
@@ -0,0 +1,40 @@
+import os
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    )
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("HTTP_TIMEOUT_SECONDS", "10")),
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5")),
+        pool=float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "5"))
+    )
+
+def _http2() -> bool:
+    # HTTP/2 needs the optional h2 package (httpx[http2])
+    return HTTP2_AVAILABLE and os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+def create_http_client(**kwargs) -> httpx.Client:
+    """
+    Long-lived, connection-pooled client for a processor adapter.
+    Connections are kept alive between calls so only the first request pays
+    for the TCP and TLS handshakes.
+    """
+    return httpx.Client(limits=_limits(), timeout=_timeout(), http2=_http2(), **kwargs)
+
+def create_async_http_client(**kwargs) -> httpx.AsyncClient:
+    """
+    Async counterpart of create_http_client. Must be used from a single event loop.
+    """
+    return httpx.AsyncClient(limits=_limits(), timeout=_timeout(), http2=_http2(), **kwargs)
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse
 
@@ -21,6 +22,32 @@ class PaymentProcessor(ABC):
         """
         pass
 
+    async def process_charge_async(self, request: InternalChargeRequest) -> InternalChargeResponse:
+        """
+        Execute a payment charge without blocking the event loop.
+        Adapters with a native async client should override this; the default
+        runs the blocking implementation in a worker thread.
+        """
+        return await asyncio.to_thread(self.process_charge, request)
+
+    async def refund_async(self, processor_transaction_id: str, amount: float) -> InternalChargeResponse:
+        """
+        Refund a previously executed charge without blocking the event loop.
+        """
+        return await asyncio.to_thread(self.refund, processor_transaction_id, amount)
+
+    def close(self) -> None:
+        """
+        Releases pooled connections. Called once on application shutdown.
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """
+        Releases pooled connections held by async clients, then the sync ones.
+        """
+        self.close()
+
     @property
     @abstractmethod
     def provider_name(self) -> str:
@@ -19,6 +19,8 @@ class InternalChargeRequest(BaseModel):
     customer_id: str
     description: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    # Adapters forward it so a retried attempt is never charged twice
+    idempotency_key: Optional[str] = None
 
 class InternalChargeResponse(BaseModel):
     """
@@ -1,20 +1,42 @@
-from typing import Dict, Optional
+import json
+import uuid
+from typing import Callable, Dict, Optional
+import redis
 from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.circuit_breaker import CircuitBreaker, CircuitBreakingProcessor, CircuitState
 from payments_service.app.core.models.payment import PaymentProvider
 
 class ProcessorRegistry:
     """
     Central registry for payment processor implementations.
     Provides a simple way to register and retrieve processors.
+
+    Every registered processor is wrapped with a per-provider circuit breaker fed
+    by its real charge outcomes. With a Redis client, state changes are published
+    so other nodes converge on the same view.
     """
-    def __init__(self):
+    CIRCUIT_CHANNEL = "circuit_breaker:state"
+    CIRCUIT_KEY_PREFIX = "circuit_breaker:"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        breaker_factory: Optional[Callable[..., CircuitBreaker]] = None
+    ):
         self._processors: Dict[str, PaymentProcessor] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._redis = redis_client
+        self._breaker_factory = breaker_factory or CircuitBreaker.from_env
+        self._listener = None
+        self._node_id = uuid.uuid4().hex
 
     def register(self, provider: PaymentProvider, processor: PaymentProcessor):
         """
         Registers a processor for a given provider.
         """
-        self._processors[provider.value] = processor
+        breaker = self._breaker_factory(provider.value, on_state_change=self._on_state_change)
+        self._breakers[provider.value] = breaker
+        self._processors[provider.value] = CircuitBreakingProcessor(processor, breaker)
 
     def get_processor(self, provider: PaymentProvider) -> Optional[PaymentProcessor]:
         """
@@ -27,3 +49,77 @@ class ProcessorRegistry:
         Lists all registered providers.
         """
         return list(self._processors.keys())
+
+    def get_breaker(self, provider: PaymentProvider) -> Optional[CircuitBreaker]:
+        return self._breakers.get(provider.value)
+
+    def is_available(self, provider: PaymentProvider) -> bool:
+        """
+        False while the provider's circuit is open. In-memory only, safe for the hot path.
+        """
+        breaker = self._breakers.get(provider.value)
+        return breaker is None or breaker.state != CircuitState.OPEN
+
+    def circuit_states(self) -> Dict[str, Dict]:
+        return {name: breaker.snapshot() for name, breaker in self._breakers.items()}
+
+    def close_all(self):
+        """
+        Releases the connection pools of every registered processor.
+        """
+        for processor in self._processors.values():
+            processor.close()
+
+    async def aclose_all(self):
+        for processor in self._processors.values():
+            await processor.aclose()
+
+    def _on_state_change(self, provider: str, state: CircuitState):
+        print(f"[CircuitBreaker] {provider} -> {state.value}")
+        if self._redis is None:
+            return
+        try:
+            key = f"{self.CIRCUIT_KEY_PREFIX}{provider}"
+            if state == CircuitState.OPEN:
+                # Expires with the open period so a crashed node can't pin a circuit open
+                breaker = self._breakers[provider]
+                self._redis.set(key, state.value, ex=max(int(breaker.open_seconds), 1))
+            else:
+                self._redis.delete(key)
+            self._redis.publish(self.CIRCUIT_CHANNEL, json.dumps({"node": self._node_id, "provider": provider, "state": state.value}))
+        except redis.RedisError as e:
+            # Local state still applies; other nodes learn from their own outcomes
+            print(f"[CircuitBreaker] Failed to publish {provider} state: {e}")
+
+    def _on_remote_state(self, message: dict):
+        data = message.get("data")
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        if not isinstance(data, str):
+            return
+        event = json.loads(data)
+        breaker = self._breakers.get(event["provider"])
+        if event["node"] == self._node_id or breaker is None:
+            return
+        breaker.apply_remote_state(CircuitState(event["state"]))
+
+    def start_circuit_listener(self):
+        """
+        Loads circuits currently open on other nodes, then follows their state
+        changes on a background thread.
+        """
+        if self._redis is None or self._listener is not None:
+            return
+        names = list(self._breakers)
+        if names:
+            for name, state in zip(names, self._redis.mget([f"{self.CIRCUIT_KEY_PREFIX}{n}" for n in names])):
+                if state:
+                    self._breakers[name].apply_remote_state(CircuitState(state.decode("utf-8")))
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.CIRCUIT_CHANNEL: self._on_remote_state})
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop_circuit_listener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
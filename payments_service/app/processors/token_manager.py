@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Optional, Tuple
+import redis
+
+# Returns (access_token, expires_in_seconds)
+TokenFetcher = Callable[[], Tuple[str, float]]
+
+class OAuthTokenManager:
+    """
+    Single-flight cache for an OAuth client-credentials token.
+
+    - Only one caller refreshes at a time; concurrent callers wait for its result
+      instead of stampeding the token endpoint.
+    - A background timer refreshes the token refresh_ahead_seconds before it expires,
+      so requests normally never block on a refresh.
+    - With a Redis client the token is shared across worker processes, and a short
+      Redis lock keeps processes from refreshing simultaneously.
+    """
+    LOCK_TTL_SECONDS = 10
+    LOCK_WAIT_SECONDS = 5.0
+    LOCK_POLL_SECONDS = 0.05
+
+    def __init__(
+        self,
+        fetch_token: TokenFetcher,
+        redis_client: Optional[redis.Redis] = None,
+        cache_key: Optional[str] = None,
+        expiry_margin_seconds: float = 60,
+        refresh_ahead_seconds: float = 300,
+        clock: Callable[[], float] = time.time
+    ):
+        self._fetch_token = fetch_token
+        self._redis = redis_client
+        self._cache_key = cache_key
+        self.expiry_margin_seconds = expiry_margin_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self._clock = clock
+        self._token: Optional[str] = None
+        self._expires_at: float = 0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    def _valid(self) -> bool:
+        return self._token is not None and self._clock() < self._expires_at
+
+    def get_token(self) -> str:
+        if self._valid():
+            return self._token
+        with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._valid():
+                return self._token
+            self._refresh()
+            return self._token
+
+    async def get_token_async(self) -> str:
+        if self._valid():
+            return self._token
+        return await asyncio.to_thread(self.get_token)
+
+    def close(self):
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _refresh(self, min_remaining: float = 0):
+        """
+        Must be called with self._lock held. A shared token is adopted only if it has
+        more than min_remaining seconds left.
+        """
+        if self._load_shared(min_remaining):
+            return
+
+        lock_key = f"{self._cache_key}:lock"
+        acquired = self._acquire_shared_lock(lock_key)
+        if acquired is False:
+            # Another process is refreshing; wait for it to publish the token
+            deadline = time.monotonic() + self.LOCK_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(self.LOCK_POLL_SECONDS)
+                if self._load_shared(min_remaining):
+                    return
+            print(f"[TokenManager] Timed out waiting for shared token {self._cache_key}; refreshing locally")
+
+        try:
+            token, expires_in = self._fetch_token()
+            self._set(token, self._clock() + expires_in - self.expiry_margin_seconds)
+            self._publish_shared()
+        finally:
+            if acquired:
+                try:
+                    self._redis.delete(lock_key)
+                except redis.RedisError:
+                    pass # Expires after LOCK_TTL_SECONDS anyway
+
+    def _acquire_shared_lock(self, lock_key: str) -> Optional[bool]:
+        """
+        True if we hold the cross-process lock, False if someone else does,
+        None when there is no shared cache (or Redis is unavailable).
+        """
+        if not self._shared:
+            return None
+        try:
+            return bool(self._redis.set(lock_key, "1", nx=True, ex=self.LOCK_TTL_SECONDS))
+        except redis.RedisError as e:
+            print(f"[TokenManager] Shared token lock failed, refreshing locally: {e}")
+            return None
+
+    def _publish_shared(self):
+        if not self._shared:
+            return
+        try:
+            self._redis.set(
+                self._cache_key,
+                json.dumps({"access_token": self._token, "expires_at": self._expires_at}),
+                ex=max(int(self._expires_at - self._clock()), 1)
+            )
+        except redis.RedisError as e:
+            print(f"[TokenManager] Failed to share token: {e}")
+
+    @property
+    def _shared(self) -> bool:
+        return self._redis is not None and self._cache_key is not None
+
+    def _load_shared(self, min_remaining: float) -> bool:
+        if not self._shared:
+            return False
+        try:
+            raw = self._redis.get(self._cache_key)
+        except redis.RedisError as e:
+            print(f"[TokenManager] Shared token lookup failed: {e}")
+            return False
+        if not raw:
+            return False
+        data = json.loads(raw)
+        if data["expires_at"] - self._clock() <= min_remaining:
+            return False
+        self._set(data["access_token"], data["expires_at"])
+        return True
+
+    def _set(self, token: str, expires_at: float):
+        self._token = token
+        self._expires_at = expires_at
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._closed:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = self._expires_at - self._clock() - self.refresh_ahead_seconds
+        if delay <= 0:
+            return
+        self._timer = threading.Timer(delay, self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_in_background(self):
+        try:
+            with self._lock:
+                # Skip the current token if it's the one we are refreshing ahead of
+                self._refresh(min_remaining=self.refresh_ahead_seconds)
+        except Exception as e:
+            # The token is still valid until expiry; the next caller retries
+            print(f"[TokenManager] Background token refresh failed: {e}")
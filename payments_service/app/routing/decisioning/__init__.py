@@ -1,4 +1,5 @@
 from .models import RoutingDimension, ProviderPerformance, PerformanceMetrics, CostStructure, RoutingStrategy
 from .repository import RoutingPerformanceRepository
 from .strategies import StaticAggregationStrategy
+from .aggregation import PerformanceAggregator, RunningStats
 from .interfaces import IntelligenceStrategy
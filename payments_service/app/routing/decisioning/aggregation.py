@@ -0,0 +1,125 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..ingestion.models import RawTransactionRecord
+from .models import RoutingDimension
+from payments_service.app.core.models.payment import PaymentProvider
+
+# (provider, payment_form, network, card_type, region, currency, dynamic dimension items)
+AggregateKey = Tuple[PaymentProvider, str, str, str, str, str, Tuple[Tuple[str, object], ...]]
+
+class RunningStats:
+    """
+    Mergeable running counters for one (provider, dimension) group.
+    """
+    __slots__ = ("count", "successes", "latency_sum", "latency_sq_sum")
+
+    def __init__(self, count: int = 0, successes: int = 0, latency_sum: float = 0.0, latency_sq_sum: float = 0.0):
+        self.count = count
+        self.successes = successes
+        self.latency_sum = latency_sum
+        self.latency_sq_sum = latency_sq_sum
+
+    def add(self, succeeded: bool, latency_ms: float):
+        self.count += 1
+        if succeeded:
+            self.successes += 1
+        self.latency_sum += latency_ms
+        self.latency_sq_sum += latency_ms * latency_ms
+
+    def merge(self, other: "RunningStats"):
+        self.count += other.count
+        self.successes += other.successes
+        self.latency_sum += other.latency_sum
+        self.latency_sq_sum += other.latency_sq_sum
+
+    @property
+    def auth_rate(self) -> float:
+        return self.successes / self.count if self.count > 0 else 0.0
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self.latency_sum / self.count if self.count > 0 else 0.0
+
+    @property
+    def latency_stddev_ms(self) -> float:
+        if self.count == 0:
+            return 0.0
+        mean = self.avg_latency_ms
+        return math.sqrt(max(self.latency_sq_sum / self.count - mean * mean, 0.0))
+
+    def __repr__(self) -> str:
+        return f"RunningStats(count={self.count}, successes={self.successes}, latency_sum={self.latency_sum})"
+
+class PerformanceAggregator:
+    """
+    Incremental aggregator over a stream of transaction records.
+
+    Only running counters are kept per (provider, dimension) group, so memory is
+    bounded by the number of distinct groups rather than the number of records.
+    Aggregators built by separate workers can be merged (and pickled) before the
+    final metrics are computed.
+    """
+    def __init__(self, dynamic_dimensions: Optional[List[str]] = None):
+        self.dynamic_dimensions = dynamic_dimensions or []
+        self.groups: Dict[AggregateKey, RunningStats] = {}
+        self.record_count = 0
+
+    def key_for(self, record: RawTransactionRecord) -> AggregateKey:
+        extra = record.extra_fields
+        extra_dim_data = tuple(
+            (field, extra[field]) for field in self.dynamic_dimensions if field in extra
+        )
+        return (
+            record.provider,
+            record.payment_form,
+            record.network,
+            record.card_type,
+            record.region,
+            record.currency,
+            extra_dim_data
+        )
+
+    def add(self, record: RawTransactionRecord):
+        self.add_outcome(self.key_for(record), record.status == "succeeded", record.latency_ms)
+
+    def add_outcome(self, key: AggregateKey, succeeded: bool, latency_ms: float):
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = RunningStats()
+        stats.add(succeeded, latency_ms)
+        self.record_count += 1
+
+    def add_all(self, records: Iterable[RawTransactionRecord]) -> "PerformanceAggregator":
+        """
+        Consumes any iterable (list, generator, file-backed stream) one record at a time.
+        """
+        for record in records:
+            self.add(record)
+        return self
+
+    def merge(self, other: "PerformanceAggregator") -> "PerformanceAggregator":
+        for key, stats in other.groups.items():
+            existing = self.groups.get(key)
+            if existing is None:
+                self.groups[key] = RunningStats(stats.count, stats.successes, stats.latency_sum, stats.latency_sq_sum)
+            else:
+                existing.merge(stats)
+        self.record_count += other.record_count
+        return self
+
+    def items(self) -> Iterable[Tuple[PaymentProvider, RoutingDimension, RunningStats]]:
+        for key, stats in self.groups.items():
+            provider, payment_form, network, card_type, region, currency, extra_dim_data = key
+            dim = RoutingDimension(
+                payment_method_type="credit_card", # Simplification
+                payment_form=payment_form,
+                network=network,
+                card_type=card_type,
+                region=region,
+                currency=currency,
+                **dict(extra_dim_data) # Inject dynamic dimensions for grouping
+            )
+            yield provider, dim, stats
+
+    def __len__(self) -> int:
+        return len(self.groups)
@@ -0,0 +1,132 @@
+import json
+import math
+import struct
+from typing import Dict, Union
+from .models import ProviderPerformance, RoutingDimension
+from ...core.repositories.codecs import RecordCodec
+
+class BinaryPerformanceCodec(RecordCodec[ProviderPerformance]):
+    """
+    Compact binary encoding for ProviderPerformance records.
+
+    Layout (v2, little-endian):
+        b"PP" magic, u8 version
+        f64 auth_rate, f64 fraud_rate, i32 avg_latency_ms,
+        f64 variable_fee_percent, f64 fixed_fee, f64 interchange_plus_basis_points (NaN = None)
+        u8 len + provider, u8 len + data_window, u16 len + dimension
+    The dimension is a JSON object keyed by field name, so adding or reordering
+    RoutingDimension fields never misreads stored records. v1 stored it as a
+    positional array; it is still read, against the fields it was written with.
+    Every provider in a dimension carries the same bytes, so decoded dimensions
+    are memoized and shared (RoutingDimension is frozen).
+
+    Routing re-reads the same unchanged values constantly, so decoded records are
+    memoized by their (small) encoded bytes too. Each caller gets its own copy
+    (sharing only the frozen dimension), so changing one never leaks into later
+    decodes.
+
+    Values that don't start with the magic are decoded as legacy pydantic JSON.
+    """
+    MAGIC = b"PP"
+    VERSION = 2
+    # Field order of the positional v1 dimension; never change it
+    _V1_DIMENSION_FIELDS = (
+        "payment_method_type", "payment_form", "network", "card_type", "region", "currency", "is_network_tokenized"
+    )
+    _HEADER = struct.Struct("<2sB")
+    _METRICS = struct.Struct("<ddidddB")
+
+    def __init__(self, max_cached: int = 4096):
+        self.max_cached = max_cached
+        self._dimensions: Dict[bytes, RoutingDimension] = {}
+        self._records: Dict[bytes, ProviderPerformance] = {}
+
+    def encode(self, item: ProviderPerformance) -> bytes:
+        metrics = item.metrics
+        cost = metrics.cost_structure
+        interchange = cost.interchange_plus_basis_points
+        provider = item.provider.value.encode()
+        data_window = item.data_window.encode()
+        dimension = self._encode_dimension(item.dimension)
+        return b"".join((
+            self._HEADER.pack(self.MAGIC, self.VERSION),
+            self._METRICS.pack(
+                metrics.auth_rate, metrics.fraud_rate, metrics.avg_latency_ms,
+                cost.variable_fee_percent, cost.fixed_fee,
+                math.nan if interchange is None else interchange,
+                len(provider)
+            ),
+            provider,
+            bytes((len(data_window),)), data_window,
+            struct.pack("<H", len(dimension)), dimension
+        ))
+
+    def decode(self, data: Union[bytes, str]) -> ProviderPerformance:
+        if isinstance(data, str) or not data.startswith(self.MAGIC):
+            return ProviderPerformance.model_validate_json(data)
+
+        record = self._records.get(data)
+        if record is None:
+            record = self._remember(self._records, data, self._decode_binary(data))
+        return self._copy(record)
+
+    def _copy(self, record: ProviderPerformance) -> ProviderPerformance:
+        # Shallow copies of each mutable level are much cheaper than re-validating
+        metrics = record.metrics.model_copy(update={"cost_structure": record.metrics.cost_structure.model_copy()})
+        return record.model_copy(update={"metrics": metrics})
+
+    def _decode_binary(self, data: bytes) -> ProviderPerformance:
+        _, version = self._HEADER.unpack_from(data)
+        if version not in (1, self.VERSION):
+            raise ValueError(f"Unsupported performance record version: {version}")
+
+        offset = self._HEADER.size
+        auth_rate, fraud_rate, latency, variable_fee, fixed_fee, interchange, provider_len = \
+            self._METRICS.unpack_from(data, offset)
+        offset += self._METRICS.size
+        provider = data[offset:offset + provider_len].decode()
+        offset += provider_len
+        window_len = data[offset]
+        data_window = data[offset + 1:offset + 1 + window_len].decode()
+        offset += 1 + window_len
+        (dimension_len,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        dimension = self._decode_dimension(data[offset:offset + dimension_len], version)
+
+        # A single validation call over plain values is cheaper than building each nested model
+        return ProviderPerformance.model_validate({
+            "provider": provider,
+            "dimension": dimension,
+            "metrics": {
+                "auth_rate": auth_rate,
+                "fraud_rate": fraud_rate,
+                "avg_latency_ms": latency,
+                "cost_structure": {
+                    "variable_fee_percent": variable_fee,
+                    "fixed_fee": fixed_fee,
+                    "interchange_plus_basis_points": None if math.isnan(interchange) else interchange
+                }
+            },
+            "data_window": data_window
+        })
+
+    def _encode_dimension(self, dimension: RoutingDimension) -> bytes:
+        return json.dumps(dimension.model_dump(), separators=(",", ":"), sort_keys=True).encode()
+
+    def _decode_dimension(self, raw: bytes, version: int) -> RoutingDimension:
+        memo_key = bytes((version,)) + raw
+        dimension = self._dimensions.get(memo_key)
+        if dimension is None:
+            if version == 1:
+                *values, extra = json.loads(raw)
+                fields = {**dict(zip(self._V1_DIMENSION_FIELDS, values)), **extra}
+            else:
+                fields = json.loads(raw)
+            dimension = self._remember(self._dimensions, memo_key, RoutingDimension(**fields))
+        return dimension
+
+    def _remember(self, memo: Dict, key: bytes, value):
+        if len(memo) >= self.max_cached:
+            memo.clear()
+        memo[key] = value
+        return value
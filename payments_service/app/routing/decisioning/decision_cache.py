@@ -0,0 +1,77 @@
+import os
+from bisect import bisect_right
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+from payments_service.app.core.models.payment import PaymentProvider, PaymentCreate
+from payments_service.app.core.utils.cache import TTLCache
+from .models import ResolvedProvider
+
+class DecisionCache:
+    """
+    Reuses model routing decisions across transactions in the same equivalence
+    class: card context (currency, BIN brand/type/country), amount bucket, health
+    snapshot and the candidate providers with their reconciled fees and metrics.
+
+    Fees and metrics are part of the key, so new performance data, a fee change
+    or a health change simply stops matching older entries; they age out with
+    the TTL.
+    """
+    # Upper bounds of the amount buckets; fee crossovers between providers fall at
+    # different amounts, so buckets get wider as amounts grow
+    AMOUNT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl_seconds: float = 300.0,
+        amount_buckets: Sequence[float] = AMOUNT_BUCKETS,
+        auth_rate_precision: int = 3
+    ):
+        self.amount_buckets = tuple(amount_buckets)
+        self.auth_rate_precision = auth_rate_precision
+        self._cache: TTLCache[PaymentProvider] = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "DecisionCache":
+        return cls(
+            maxsize=int(os.getenv("DECISION_CACHE_SIZE", "4096")),
+            ttl_seconds=float(os.getenv("DECISION_CACHE_TTL_SECONDS", "300"))
+        )
+
+    def key(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> Hashable:
+        bin_metadata = payment_in.bin_metadata
+        card = (
+            getattr(bin_metadata, "brand", None),
+            getattr(bin_metadata, "type", None),
+            getattr(bin_metadata, "country", None)
+        )
+        health = tuple(sorted((payment_in.provider_health or {}).items()))
+        candidates = tuple(sorted(
+            (
+                p.provider.value,
+                p.fixed_fee,
+                p.variable_fee_percent,
+                round(p.auth_rate, self.auth_rate_precision),
+                p.avg_latency_ms
+            )
+            for p in providers
+        ))
+        return (payment_in.currency, card, self.amount_bucket(payment_in.amount), health, candidates)
+
+    def amount_bucket(self, amount: float) -> int:
+        return bisect_right(self.amount_buckets, amount)
+
+    def get(self, key: Hashable) -> Optional[PaymentProvider]:
+        return self._cache.get(key)
+
+    def set(self, key: Hashable, provider: PaymentProvider):
+        self._cache.set(key, provider)
+
+    def invalidate(self):
+        self._cache.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
@@ -1,5 +1,6 @@
 import json
-from typing import List, Any, Optional, Dict
+from abc import abstractmethod
+from typing import List, Any, Optional, Dict, Sequence
 from collections import defaultdict
 try:
     import aisuite
@@ -7,26 +8,37 @@ try:
 except ImportError:
     AISUITE_AVAILABLE = False
 from payments_service.app.core.models.payment import PaymentProvider, PaymentCreate
-from .interfaces import RoutingDecisionStrategy
-from .models import ProviderPerformance, ResolvedProvider
+from .interfaces import RoutingDecisionStrategy, rank_by_cost
+from .models import ProviderPerformance, ResolvedProvider, RouteEntry, RankedRoute
 from .planner import RoutingPlanner
+from .decision_cache import DecisionCache
 
 class FixedProviderStrategy(RoutingDecisionStrategy):
     """
     A simple strategy that always returns a fixed provider.
     Useful for testing and explicit overrides.
     """
+    supports_compiled_routes = True
+
     def __init__(self, provider: PaymentProvider):
         self.provider = provider
 
     def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
         return self.provider
 
+    async def decide_async(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        return self.decide(payment_in, providers)
+
+    def decide_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> PaymentProvider:
+        return self.provider
+
 class DeterministicLeastCostStrategy(RoutingDecisionStrategy):
     """
     A rule-based strategy that calculates the cost for each provider
     based on the fee structure and selects the absolute cheapest.
     """
+    supports_compiled_routes = True
+
     def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
         if not providers:
             return PaymentProvider.STRIPE
@@ -40,132 +52,204 @@ class DeterministicLeastCostStrategy(RoutingDecisionStrategy):
         best_provider = min(costs, key=costs.get)
         return PaymentProvider(best_provider)
 
-class LLMDecisionStrategy(RoutingDecisionStrategy):
+    async def decide_async(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        # Pure arithmetic, cheaper inline than a thread hop
+        return self.decide(payment_in, providers)
+
+    def decide_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> PaymentProvider:
+        if not routes:
+            return PaymentProvider.STRIPE
+
+        # Same arithmetic and first-wins tie-break as decide(), without the dict
+        amount = payment_in.amount
+        best_provider = None
+        best_cost = float("inf")
+        for route in routes:
+            cost = route.fixed_fee + (amount * (route.variable_fee_percent / 100))
+            if cost < best_cost:
+                best_cost = cost
+                best_provider = route.provider
+        return best_provider
+
+    def rank(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> List[RankedRoute]:
+        return rank_by_cost(payment_in, providers) or [RankedRoute(PaymentProvider.STRIPE, None, None, None)]
+
+    async def rank_async(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> List[RankedRoute]:
+        return self.rank(payment_in, providers)
+
+    def rank_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> List[RankedRoute]:
+        return rank_by_cost(payment_in, routes) or [RankedRoute(PaymentProvider.STRIPE, None, None, None)]
+
+class ModelDecisionStrategy(RoutingDecisionStrategy):
+    """
+    Base for strategies that ask a model for the decision. With a DecisionCache,
+    transactions in an already decided equivalence class skip the model entirely.
+    Fallback decisions made after a model failure are never cached.
+
+    With fallback_on_error=False, model failures are raised instead of answered
+    with least cost, so a wrapper (BudgetedDecisionStrategy) can count them.
+    """
+    def __init__(self, decision_cache: Optional[DecisionCache] = None, fallback_on_error: bool = True):
+        self.decision_cache = decision_cache
+        self.fallback_on_error = fallback_on_error
+
+    def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        key = None
+        if self.decision_cache is not None:
+            key = self.decision_cache.key(payment_in, providers)
+            cached = self.decision_cache.get(key)
+            if cached is not None:
+                return cached
+        try:
+            provider = self._model_decide(payment_in, providers)
+        except Exception as e:
+            if not self.fallback_on_error:
+                raise
+            print(f"!!! CIRCUIT BREAKER: {self.__class__.__name__} failed: {e}. Falling back to DeterministicLeastCostStrategy.")
+            fallback = DeterministicLeastCostStrategy()
+            return fallback.decide(payment_in, providers)
+        if key is not None:
+            self.decision_cache.set(key, provider)
+        return provider
+
+    @abstractmethod
+    def _model_decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        """
+        Asks the model; exceptions fall back to least cost.
+        """
+        pass
+
+class LLMDecisionStrategy(ModelDecisionStrategy):
     """
     Uses an LLM via aisuite to make a decision based on cost, 
     performance, and a specific objective.
     """
-    def __init__(self, objective: str = "balanced", model: str = "openai:gpt-4o"):
+    def __init__(
+        self,
+        objective: str = "balanced",
+        model: str = "openai:gpt-4o",
+        decision_cache: Optional[DecisionCache] = None,
+        fallback_on_error: bool = True
+    ):
         if not AISUITE_AVAILABLE:
             raise ImportError("aisuite is not installed. Please install it to use LLMDecisionStrategy.")
+        super().__init__(decision_cache, fallback_on_error)
         self.objective = objective
         self.model = model
         self.client = aisuite.Client()
 
-    def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
-        try:
-            provider_json = json.dumps([p.model_dump() for p in providers], default=str)
-            payment_json = payment_in.model_dump_json()
-
-            prompt = f"""
-            You are an intelligent payment routing engine.
-            Objective: {self.objective}
-
-            --- RESOLVED PROVIDER DATA ---
-            PROVIDERS: {provider_json}
-            TRANSACTION: {payment_json}
-
-            --- INSTRUCTION ---
-            Select the best provider according to the objective. 
-            Each provider record contains the final reconciled cost and performance metrics.
-            
-            Return ONLY a JSON object: {{"best_provider": "...", "reasoning": "..."}}
-            """
-
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a precise routing engine."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-
-            response_data = json.loads(completion.choices[0].message.content or "{}")
-            provider_name = response_data.get("best_provider", PaymentProvider.STRIPE.value)
-            return PaymentProvider(provider_name)
-        except Exception as e:
-            print(f"!!! CIRCUIT BREAKER: LLMDecisionStrategy failed: {e}. Falling back to DeterministicLeastCostStrategy.")
-            fallback = DeterministicLeastCostStrategy()
-            return fallback.decide(payment_in, providers)
-
-class PlannerRoutingStrategy(RoutingDecisionStrategy):
+    def _model_decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        provider_json = json.dumps([p.model_dump() for p in providers], default=str)
+        payment_json = payment_in.model_dump_json()
+
+        prompt = f"""
+        You are an intelligent payment routing engine.
+        Objective: {self.objective}
+
+        --- RESOLVED PROVIDER DATA ---
+        PROVIDERS: {provider_json}
+        TRANSACTION: {payment_json}
+
+        --- INSTRUCTION ---
+        Select the best provider according to the objective. 
+        Each provider record contains the final reconciled cost and performance metrics.
+        
+        Return ONLY a JSON object: {{"best_provider": "...", "reasoning": "..."}}
+        """
+
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a precise routing engine."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"}
+        )
+
+        response_data = json.loads(completion.choices[0].message.content or "{}")
+        provider_name = response_data.get("best_provider", PaymentProvider.STRIPE.value)
+        return PaymentProvider(provider_name)
+
+class PlannerRoutingStrategy(ModelDecisionStrategy):
     """
     A sophisticated strategy that uses a Planner to generate and execute 
     a multi-agent routing plan.
     """
-    def __init__(self, objective: str = "balanced", model: str = "openai:gpt-4o"):
+    def __init__(
+        self,
+        objective: str = "balanced",
+        model: str = "openai:gpt-4o",
+        decision_cache: Optional[DecisionCache] = None,
+        fallback_on_error: bool = True
+    ):
         if not AISUITE_AVAILABLE:
             raise ImportError("aisuite is not installed. Please install it to use PlannerRoutingStrategy.")
+        super().__init__(decision_cache, fallback_on_error)
         self.objective = objective
         self.model = model
         self.planner = RoutingPlanner(model=model)
-        self.client = aisuite.Client()
-
-    def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
-        try:
-            # 1. Prepare enriched context
-            bin_metadata = getattr(payment_in, "bin_metadata", None)
-            interchange_fees = getattr(payment_in, "interchange_fees", []) or []
-            provider_health = getattr(payment_in, "provider_health", {}) or {}
-
-            context = {
-                "payment": payment_in.model_dump(),
-                "providers": [p.model_dump() for p in providers],
-                "bin_metadata": bin_metadata.model_dump() if hasattr(bin_metadata, "model_dump") else bin_metadata,
-                "interchange_fees": [f.model_dump() if hasattr(f, "model_dump") else f for f in interchange_fees],
-                "provider_health": provider_health
-            }
-
-            # 2. Generate Plan
-            plan = self.planner.generate_plan(self.objective, context)
-            print(f"Generated Plan: {json.dumps(plan, indent=2)}")
-
-            # 3. Execute Core Plan (Specialists)
-            results = self.planner.execute_plan(plan, context)
-
-            # 4. Preliminary Decision Synthesis
-            synthesis_prompt = """
-            You are the Routing Supervisor. 
-            Objective: {objective}
-            Transaction: {payment_json}
-            
-            --- AGENT EVIDENCE ---
-            {results_json}
-            
-            --- INSTRUCTION ---
-            Based on the technical evidence, propose the best provider.
-            Return ONLY a JSON object: {{"best_provider": "...", "reasoning": "..."}}
-            """.format(
-                objective=self.objective,
-                payment_json=json.dumps(context['payment'], default=str),
-                results_json=json.dumps(results, default=str)
-            )
-
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": synthesis_prompt}],
-                response_format={"type": "json_object"}
-            )
-
-            proposal = json.loads(completion.choices[0].message.content or "{}")
-            
-            # 5. SELF-CORRECTION: Critic Review
-            context["proposed_decision"] = proposal
-            context["agent_evidence"] = results
-            
-            critic_results = self.planner.execute_plan([{"agent": "Critic", "reason": "Self-Correction Safety Review"}], context)
-            critic_feedback = critic_results.get("Critic", {})
-            
-            final_provider_name = proposal.get("best_provider")
-            if not critic_feedback.get("is_valid", True) and critic_feedback.get("recommended_override"):
-                print(f"CRITIC OVERRIDE: {final_provider_name} -> {critic_feedback.get('recommended_override')}")
-                print(f"Reason: {critic_feedback.get('feedback')}")
-                final_provider_name = critic_feedback.get("recommended_override")
-
-            print(f"Final Decision via Planner: {final_provider_name}")
-            return PaymentProvider(final_provider_name)
-        except Exception as e:
-            print(f"!!! CIRCUIT BREAKER: PlannerRoutingStrategy failed: {e}. Falling back to DeterministicLeastCostStrategy.")
-            fallback = DeterministicLeastCostStrategy()
-            return fallback.decide(payment_in, providers)
+        self.client = self.planner.client
+
+    def _model_decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        # 1. Prepare enriched context
+        bin_metadata = getattr(payment_in, "bin_metadata", None)
+        interchange_fees = getattr(payment_in, "interchange_fees", []) or []
+        provider_health = getattr(payment_in, "provider_health", {}) or {}
+
+        context = {
+            "payment": payment_in.model_dump(),
+            "providers": [p.model_dump() for p in providers],
+            "bin_metadata": bin_metadata.model_dump() if hasattr(bin_metadata, "model_dump") else bin_metadata,
+            "interchange_fees": [f.model_dump() if hasattr(f, "model_dump") else f for f in interchange_fees],
+            "provider_health": provider_health
+        }
+
+        # 2. Generate Plan
+        plan = self.planner.generate_plan(self.objective, context)
+        print(f"Generated Plan: {json.dumps(plan, indent=2)}")
+
+        # 3. Execute Core Plan (Specialists)
+        results = self.planner.execute_plan(plan, context)
+
+        # 4. Preliminary Decision Synthesis
+        synthesis_prompt = """
+        You are the Routing Supervisor. 
+        Objective: {objective}
+        Transaction: {payment_json}
+        
+        --- AGENT EVIDENCE ---
+        {results_json}
+        
+        --- INSTRUCTION ---
+        Based on the technical evidence, propose the best provider.
+        Agents with a "status" of timed_out or failed returned no evidence; decide from the others.
+        Return ONLY a JSON object: {{"best_provider": "...", "reasoning": "..."}}
+        """.format(
+            objective=self.objective,
+            payment_json=json.dumps(context['payment'], default=str),
+            results_json=json.dumps(results, default=str)
+        )
+
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": synthesis_prompt}],
+            response_format={"type": "json_object"}
+        )
+
+        proposal = json.loads(completion.choices[0].message.content or "{}")
+        
+        # 5. SELF-CORRECTION: Critic Review
+        context["proposed_decision"] = proposal
+        context["agent_evidence"] = results
+        
+        critic_results = self.planner.execute_plan([{"agent": "Critic", "reason": "Self-Correction Safety Review"}], context)
+        critic_feedback = critic_results.get("Critic", {})
+        
+        final_provider_name = proposal.get("best_provider")
+        if not critic_feedback.get("is_valid", True) and critic_feedback.get("recommended_override"):
+            print(f"CRITIC OVERRIDE: {final_provider_name} -> {critic_feedback.get('recommended_override')}")
+            print(f"Reason: {critic_feedback.get('feedback')}")
+            final_provider_name = critic_feedback.get("recommended_override")
+
+        print(f"Final Decision via Planner: {final_provider_name}")
+        return PaymentProvider(final_provider_name)
@@ -1,7 +1,8 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any
+from typing import Iterable, List, Optional, Any, Sequence, Union
 from ..ingestion.models import RawTransactionRecord
-from .models import ProviderPerformance, RoutingDimension, ResolvedProvider
+from .models import ProviderPerformance, RoutingDimension, ResolvedProvider, RouteEntry, RankedRoute
 from payments_service.app.core.models.payment import PaymentProvider, PaymentCreate
 
 class IntelligenceStrategy(ABC):
@@ -9,19 +10,79 @@ class IntelligenceStrategy(ABC):
     Strategy pattern for processing raw data into actionable performance metrics.
     """
     @abstractmethod
-    def analyze(self, records: List[RawTransactionRecord]) -> List[ProviderPerformance]:
+    def analyze(self, records: Iterable[RawTransactionRecord]) -> List[ProviderPerformance]:
         """
         Processes canonical transaction records and produces provider performance data.
+        Records may be a list or a lazily produced stream.
         """
         pass
 
+def rank_by_cost(
+    payment_in: PaymentCreate,
+    candidates: Sequence[Union[ResolvedProvider, RouteEntry]],
+    preferred: Optional[PaymentProvider] = None
+) -> List[RankedRoute]:
+    """
+    Ranks candidates by expected cost (first wins on ties), moving the preferred
+    provider to the front.
+    """
+    amount = payment_in.amount
+    ranked = sorted(
+        (
+            RankedRoute(c.provider, c.fixed_fee + (amount * (c.variable_fee_percent / 100)), c.auth_rate, c.avg_latency_ms)
+            for c in candidates
+        ),
+        key=lambda r: r.score
+    )
+    if preferred is not None:
+        first = next((r for r in ranked if r.provider == preferred), RankedRoute(preferred, None, None, None))
+        ranked = [first] + [r for r in ranked if r.provider != preferred]
+    return ranked
+
 class RoutingDecisionStrategy(ABC):
     """
     Interface for making the final routing decision.
     """
+    # Strategies that only need fees and metrics can decide straight from a
+    # compiled routing table, skipping context enrichment and model construction.
+    supports_compiled_routes = False
+
     @abstractmethod
     def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
         """
         Determines the best provider based on available context and performance.
         """
         pass
+
+    async def decide_async(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        """
+        Non-blocking variant of decide. Strategies that call out to models or
+        services run in a worker thread by default; pure strategies override this.
+        """
+        return await asyncio.to_thread(self.decide, payment_in, providers)
+
+    def decide_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> PaymentProvider:
+        """
+        Fast-path decision over compiled route entries.
+        Only called when supports_compiled_routes is True. By default the entries
+        are converted back to ResolvedProviders for decide(); strategies that
+        set supports_compiled_routes should override this with a direct lookup.
+        """
+        return self.decide(payment_in, [ResolvedProvider(**entry._asdict()) for entry in routes])
+
+    def rank(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> List[RankedRoute]:
+        """
+        Ordered fallback candidates, best first, from a single decision.
+        By default the decided provider leads and the rest follow by expected cost.
+        """
+        return rank_by_cost(payment_in, providers, preferred=self.decide(payment_in, providers))
+
+    async def rank_async(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> List[RankedRoute]:
+        return rank_by_cost(payment_in, providers, preferred=await self.decide_async(payment_in, providers))
+
+    def rank_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> List[RankedRoute]:
+        """
+        Fast-path ranking over compiled route entries.
+        Only called when supports_compiled_routes is True.
+        """
+        return rank_by_cost(payment_in, routes, preferred=self.decide_compiled(payment_in, routes))
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Sequence
+from payments_service.app.core.models.payment import PaymentProvider, PaymentCreate
+from .interfaces import RoutingDecisionStrategy
+from .models import ResolvedProvider, RouteEntry, RankedRoute
+from .decision_strategies import DeterministicLeastCostStrategy
+
+class RoutingLatencyBudget:
+    """
+    How long a routing decision may take, in milliseconds: a default with
+    per-merchant overrides. A budget of 0 or less means no limit.
+    """
+    def __init__(self, default_ms: Optional[float] = 1000, merchant_budgets_ms: Optional[Dict[str, float]] = None):
+        self.default_ms = default_ms
+        self.merchant_budgets_ms = dict(merchant_budgets_ms or {})
+
+    @classmethod
+    def from_env(cls) -> "RoutingLatencyBudget":
+        # ROUTING_LATENCY_BUDGET_MERCHANTS="merchant_a=250,merchant_b=3000"
+        merchant_budgets = {}
+        for entry in os.getenv("ROUTING_LATENCY_BUDGET_MERCHANTS", "").split(","):
+            merchant_id, _, budget = entry.partition("=")
+            if merchant_id.strip() and budget.strip():
+                merchant_budgets[merchant_id.strip()] = float(budget)
+        default = os.getenv("ROUTING_LATENCY_BUDGET_MS", "1000")
+        return cls(default_ms=float(default) if default else None, merchant_budgets_ms=merchant_budgets)
+
+    def budget_ms(self, merchant_id: str) -> Optional[float]:
+        budget = self.merchant_budgets_ms.get(merchant_id, self.default_ms)
+        return budget if budget and budget > 0 else None
+
+class BudgetedDecisionStrategy(RoutingDecisionStrategy):
+    """
+    Runs an expensive strategy under the merchant's latency budget.
+
+    The primary decision starts in a worker while the deterministic fallback is
+    computed alongside it; if the primary hasn't answered when the budget runs
+    out, or it raises, the fallback wins. A primary that overran keeps running to
+    completion, so a decision cache behind it still learns the answer; one that
+    never left the worker queue is cancelled instead, so queued calls nobody
+    waits for don't pile up under load.
+
+    Model strategies should be built with fallback_on_error=False so their
+    failures reach this wrapper and are counted as errors.
+    """
+    def __init__(
+        self,
+        primary: RoutingDecisionStrategy,
+        budget: RoutingLatencyBudget,
+        fallback: Optional[RoutingDecisionStrategy] = None,
+        max_workers: int = 16
+    ):
+        self.primary = primary
+        self.budget = budget
+        self.fallback = fallback or DeterministicLeastCostStrategy()
+        self.supports_compiled_routes = primary.supports_compiled_routes
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="routing-budget")
+        self._lock = threading.Lock()
+        self.decisions = 0
+        self.fallbacks = 0
+        self.errors = 0
+        self.overruns = 0
+        self.cancelled = 0
+        self.max_overrun_ms = 0.0
+
+    def decide(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        budget_ms = self.budget.budget_ms(payment_in.merchant_id)
+        if budget_ms is None:
+            try:
+                return self._count(self.primary.decide(payment_in, providers))
+            except Exception as e:
+                return self._fell_back(payment_in, self.fallback.decide(payment_in, providers), f"failed: {e}", error=True)
+        started = time.perf_counter()
+        future = self._pool.submit(self.primary.decide, payment_in, providers)
+        fallback = self.fallback.decide(payment_in, providers)
+        try:
+            return self._count(future.result(timeout=self._remaining_s(started, budget_ms)))
+        except FutureTimeoutError:
+            if future.cancel():
+                # Still queued behind busy workers: drop it rather than run it for nobody
+                with self._lock:
+                    self.cancelled += 1
+            else:
+                future.add_done_callback(lambda _: self._overran(started, budget_ms))
+            return self._fell_back(payment_in, fallback, f"exceeded its {budget_ms:.0f}ms budget")
+        except Exception as e:
+            return self._fell_back(payment_in, fallback, f"failed: {e}", error=True)
+
+    async def decide_async(self, payment_in: PaymentCreate, providers: List[ResolvedProvider]) -> PaymentProvider:
+        # Model calls run on this wrapper's own pool, never the loop's default
+        # executor, which the async DB lookups and health reads depend on
+        budget_ms = self.budget.budget_ms(payment_in.merchant_id)
+        if budget_ms is None:
+            try:
+                return self._count(await asyncio.wrap_future(self._pool.submit(self.primary.decide, payment_in, providers)))
+            except Exception as e:
+                return self._fell_back(payment_in, self.fallback.decide(payment_in, providers), f"failed: {e}", error=True)
+        started = time.perf_counter()
+        future = self._pool.submit(self.primary.decide, payment_in, providers)
+        task = asyncio.wrap_future(future)
+        fallback = self.fallback.decide(payment_in, providers)
+        done, _ = await asyncio.wait({task}, timeout=self._remaining_s(started, budget_ms))
+        if not done:
+            task.add_done_callback(self._retrieve)
+            if future.cancel():
+                with self._lock:
+                    self.cancelled += 1
+            else:
+                future.add_done_callback(lambda _: self._overran(started, budget_ms))
+            return self._fell_back(payment_in, fallback, f"exceeded its {budget_ms:.0f}ms budget")
+        if task.exception() is not None:
+            return self._fell_back(payment_in, fallback, f"failed: {task.exception()}", error=True)
+        return self._count(task.result())
+
+    def decide_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> PaymentProvider:
+        # Compiled strategies are pure table lookups; no budget needed
+        return self.primary.decide_compiled(payment_in, routes)
+
+    def rank_compiled(self, payment_in: PaymentCreate, routes: Sequence[RouteEntry]) -> List[RankedRoute]:
+        return self.primary.rank_compiled(payment_in, routes)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "decisions": self.decisions,
+                "fallbacks": self.fallbacks,
+                "errors": self.errors,
+                "overruns": self.overruns,
+                "cancelled": self.cancelled,
+                "max_overrun_ms": round(self.max_overrun_ms, 1),
+                "fallback_rate": self.fallbacks / self.decisions if self.decisions else 0.0
+            }
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _remaining_s(self, started: float, budget_ms: float) -> float:
+        return max(budget_ms / 1000 - (time.perf_counter() - started), 0.0)
+
+    def _count(self, provider: PaymentProvider) -> PaymentProvider:
+        with self._lock:
+            self.decisions += 1
+        return provider
+
+    def _fell_back(self, payment_in: PaymentCreate, provider: PaymentProvider, reason: str, error: bool = False) -> PaymentProvider:
+        print(f"[RoutingBudget] {self.primary.__class__.__name__} {reason} for merchant {payment_in.merchant_id}; using {self.fallback.__class__.__name__} -> {provider.value}")
+        with self._lock:
+            self.decisions += 1
+            self.fallbacks += 1
+            self.errors += error
+        return provider
+
+    def _retrieve(self, task: asyncio.Future):
+        if not task.cancelled():
+            task.exception() # retrieved so a late failure isn't reported as unhandled
+
+    def _overran(self, started: float, budget_ms: float):
+        overrun_ms = (time.perf_counter() - started) * 1000 - budget_ms
+        with self._lock:
+            self.overruns += 1
+            self.max_overrun_ms = max(self.max_overrun_ms, overrun_ms)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from enum import Enum
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, NamedTuple
 from payments_service.app.core.models.payment import PaymentProvider
 
 class RoutingStrategy(str, Enum):
@@ -50,3 +50,26 @@ class ResolvedProvider(BaseModel):
     auth_rate: float
     avg_latency_ms: int
     extra_fields: Dict[str, Any] = Field(default_factory=dict)
+
+class RouteEntry(NamedTuple):
+    """
+    Flat, allocation-free row of a compiled routing table.
+    Carries the same reconciled values as ResolvedProvider.
+    """
+    provider: PaymentProvider
+    fixed_fee: float
+    variable_fee_percent: float
+    auth_rate: float
+    avg_latency_ms: int
+    extra_fields: Dict[str, Any]
+
+class RankedRoute(NamedTuple):
+    """
+    One candidate of a ranked routing decision, best first.
+    score is the candidate's expected cost for the transaction (lower is better);
+    metrics are None for a provider the strategy chose without route data.
+    """
+    provider: PaymentProvider
+    score: Optional[float]
+    auth_rate: Optional[float]
+    avg_latency_ms: Optional[int]
@@ -1,5 +1,9 @@
 import json
-from typing import List, Dict, Any, Type
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Type
 import aisuite
 from .specialists import (
     BaseAgent, 
@@ -7,7 +11,10 @@ from .specialists import (
     PerformanceAnalystAgent,
     NetworkIntelligenceAgent,
     HealthSentinelAgent,
-    CriticAgent
+    CriticAgent,
+    LocalCostAnalystAgent,
+    LocalPerformanceAnalystAgent,
+    LocalHealthSentinelAgent
 )
 
 class Capability:
@@ -17,22 +24,45 @@ class Capability:
         self.agent_class = agent_class
 
 class RoutingPlanner:
-    def __init__(self, model: str = "openai:gpt-4o"):
+    """
+    Plans and runs specialist agents. Plan steps are independent given the same
+    context, so they run concurrently and the plan takes about as long as its
+    slowest specialist. A step still running after step_timeout_seconds is
+    reported as timed out and synthesis proceeds with the evidence that arrived.
+
+    With local_specialists (the default), cost, performance and health analyses
+    are computed in-process and only judgment steps call the model.
+    """
+    def __init__(
+        self,
+        model: str = "openai:gpt-4o",
+        step_timeout_seconds: Optional[float] = None,
+        max_workers: int = 8,
+        local_specialists: Optional[bool] = None
+    ):
         self.client = aisuite.Client()
         self.model = model
+        self.step_timeout_seconds = step_timeout_seconds or float(os.getenv("PLANNER_STEP_TIMEOUT_SECONDS", "10"))
         self.capabilities: Dict[str, Capability] = {}
+        # One agent per capability, built on first use and sharing self.client
+        self._agents: Dict[str, BaseAgent] = {}
+        self._agents_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="routing-specialist")
+        if local_specialists is None:
+            local_specialists = os.getenv("PLANNER_LOCAL_SPECIALISTS", "true").lower() == "true"
+        self.local_specialists = local_specialists
         self._register_default_capabilities()
 
     def _register_default_capabilities(self):
         self.register_capability(Capability(
             name="CostAnalyst",
             description="Analyzes fee structures to find the cheapest provider.",
-            agent_class=CostAnalystAgent
+            agent_class=LocalCostAnalystAgent if self.local_specialists else CostAnalystAgent
         ))
         self.register_capability(Capability(
             name="PerformanceAnalyst",
             description="Analyzes auth rates and latency to find the most reliable provider.",
-            agent_class=PerformanceAnalystAgent
+            agent_class=LocalPerformanceAnalystAgent if self.local_specialists else PerformanceAnalystAgent
         ))
         self.register_capability(Capability(
             name="NetworkIntelligence",
@@ -42,7 +72,7 @@ class RoutingPlanner:
         self.register_capability(Capability(
             name="HealthSentinel",
             description="Assesses real-time provider health status from Redis.",
-            agent_class=HealthSentinelAgent
+            agent_class=LocalHealthSentinelAgent if self.local_specialists else HealthSentinelAgent
         ))
         self.register_capability(Capability(
             name="Critic",
@@ -52,6 +82,7 @@ class RoutingPlanner:
 
     def register_capability(self, capability: Capability):
         self.capabilities[capability.name] = capability
+        self._agents.pop(capability.name, None)
 
     def generate_plan(self, objective: str, transaction_context: Dict[str, Any]) -> List[Dict[str, Any]]:
         capabilities_desc = "\n".join([f"- {c.name}: {c.description}" for c in self.capabilities.values()])
@@ -91,11 +122,59 @@ class RoutingPlanner:
         return data.get("plan", [])
 
     def execute_plan(self, plan: List[Dict[str, Any]], context: Dict[str, Any]) -> Dict[str, Any]:
-        results = {}
+        """
+        Runs the plan's known agents concurrently. Agents that time out or fail
+        are reported with a "status" entry instead of their analysis.
+        """
+        steps = {}
         for step in plan:
             agent_name = step.get("agent")
             if agent_name in self.capabilities:
-                agent = self.capabilities[agent_name].agent_class(model=self.model)
-                print(f"Executing Agent: {agent_name} for {step.get('reason')}")
+                steps[agent_name] = step
+
+        started = time.perf_counter()
+        futures = {}
+        local_agents = []
+        for agent_name, step in steps.items():
+            print(f"Executing Agent: {agent_name} for {step.get('reason')}")
+            agent = self._get_agent(agent_name)
+            if getattr(agent, "is_local", False):
+                local_agents.append((agent_name, agent))
+            else:
+                futures[self._pool.submit(agent.run, context)] = agent_name
+        # Local specialists take microseconds; run them while the model calls are in flight
+        results = {}
+        for agent_name, agent in local_agents:
+            try:
                 results[agent_name] = agent.run(context)
+            except Exception as e:
+                print(f"[Planner] {agent_name} failed: {e}")
+                results[agent_name] = {"status": "failed", "error": str(e)}
+        done, pending = wait(futures, timeout=self.step_timeout_seconds)
+
+        for future, agent_name in futures.items():
+            if future in pending:
+                future.cancel()
+                print(f"[Planner] {agent_name} missed the {self.step_timeout_seconds}s deadline; continuing without it")
+                results[agent_name] = {"status": "timed_out"}
+            elif future.exception() is not None:
+                print(f"[Planner] {agent_name} failed: {future.exception()}")
+                results[agent_name] = {"status": "failed", "error": str(future.exception())}
+            else:
+                results[agent_name] = future.result()
+        if futures:
+            print(f"[Planner] {len(done)}/{len(futures)} model specialists answered in {(time.perf_counter() - started) * 1000:.0f}ms")
         return results
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_agent(self, agent_name: str) -> BaseAgent:
+        agent = self._agents.get(agent_name)
+        if agent is None:
+            with self._agents_lock:
+                agent = self._agents.get(agent_name)
+                if agent is None:
+                    agent = self.capabilities[agent_name].agent_class(model=self.model, client=self.client)
+                    self._agents[agent_name] = agent
+        return agent
@@ -1,14 +1,56 @@
-from typing import List, Optional
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
+import redis
 from .models import ProviderPerformance, RoutingDimension
-from ...core.repositories.datastore import KeyValueStore
+from .codec import BinaryPerformanceCodec
+from ...core.repositories.datastore import KeyValueStore, RedisKeyValueStore
+from ...core.utils.cache import TTLCache
+
+def provider_field(performance: ProviderPerformance) -> str:
+    """
+    Identity of a record within its dimension; also the hash field name in Redis.
+    """
+    return performance.provider.value
+
+def redis_performance_store(redis_client: redis.Redis) -> RedisKeyValueStore:
+    """
+    The Redis layout of the intelligence store: one hash per dimension
+    (provider -> binary record) under STORE_NAMESPACE.
+    """
+    return RedisKeyValueStore(
+        redis_client, list,
+        item_key=provider_field,
+        namespace=RoutingPerformanceRepository.STORE_NAMESPACE,
+        codec=BinaryPerformanceCodec()
+    )
 
 class RoutingPerformanceRepository:
     """
     Repository for storing and querying provider performance data.
     Designed for fast dimension-based lookups using a Key-Value approach.
+
+    An optional read-through cache serves hot dimensions from memory. With a
+    Redis client, writes are broadcast over pub/sub so other nodes drop their
+    cached copy instead of waiting for the TTL.
     """
-    def __init__(self, store: KeyValueStore[List[ProviderPerformance]]):
+    STORE_NAMESPACE = "routing_performance"
+    # Keys written before namespacing were the bare dimension JSON
+    LEGACY_KEY_PATTERN = "{*"
+    INVALIDATION_CHANNEL = "routing_performance:invalidate"
+
+    def __init__(
+        self,
+        store: KeyValueStore[List[ProviderPerformance]],
+        cache: Optional[TTLCache[List[ProviderPerformance]]] = None,
+        pubsub_client: Optional[redis.Redis] = None
+    ):
         self._store = store
+        self._cache = cache
+        self._pubsub_client = pubsub_client
+        self._listener = None
+        self._node_id = uuid.uuid4().hex
+        # Bumped on every local write so derived views (e.g. compiled routing tables) know to rebuild
+        self.version = 0
 
     def _get_key(self, dimension: RoutingDimension) -> str:
         # Use the model_dump_json for a stable hashable string key
@@ -18,34 +60,99 @@ class RoutingPerformanceRepository:
         """
         Upserts a performance record.
         """
-        key = self._get_key(performance.dimension)
-        existing_records = self._store.get(key) or []
-        
-        # Simple upsert logic: replace if provider already exists for this dimension
-        updated = False
-        for i, record in enumerate(existing_records):
-            if record.provider == performance.provider:
-                existing_records[i] = performance
-                updated = True
-                break
-        
-        if not updated:
-            existing_records.append(performance)
-        
-        self._store.set(key, existing_records)
+        self.save_many([performance])
+
+    def save_many(self, performances: Iterable[ProviderPerformance]):
+        """
+        Upserts a batch of performance records.
+        Records are grouped by dimension and merged in memory (later records for the
+        same provider win), then written to the store in one batched call.
+        """
+        grouped: Dict[RoutingDimension, Dict[str, ProviderPerformance]] = {}
+        for performance in performances:
+            grouped.setdefault(performance.dimension, {})[provider_field(performance)] = performance
+        if not grouped:
+            return
+
+        keys = {dim: self._get_key(dim) for dim in grouped}
+        merged = self._store.upsert_items(
+            {keys[dim]: list(by_provider.values()) for dim, by_provider in grouped.items()},
+            provider_field
+        )
+        self._written({dim: merged[key] for dim, key in keys.items()})
 
     def find_by_dimension(self, dimension: RoutingDimension) -> List[ProviderPerformance]:
         """
         Returns all provider performance records matching the specific dimension.
         """
-        key = self._get_key(dimension)
-        return self._store.get(key) or []
+        if self._cache is not None:
+            # Frozen dimensions hash on their field values, no JSON serialization needed
+            cached = self._cache.get(dimension)
+            if cached is not None:
+                return list(cached)
+
+        records = self._store.get(self._get_key(dimension)) or []
+        if self._cache is not None:
+            self._cache.set(dimension, list(records))
+        return records
 
     def get_all(self) -> List[ProviderPerformance]:
         """
         Returns all performance records across all dimensions.
         """
-        all_records = []
-        for records_list in self._store.get_all():
-            all_records.extend(records_list)
-        return all_records
+        return list(self.iter_all())
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[ProviderPerformance]:
+        """
+        Streams all performance records, fetching dimensions from the store in batches.
+        """
+        for records_list in self._store.iter_all(batch_size):
+            yield from records_list
+
+    def invalidate(self, dimension: Optional[RoutingDimension] = None):
+        """
+        Drops cached records for a dimension (or all of them).
+        """
+        if self._cache is not None:
+            if dimension is None:
+                self._cache.clear()
+            else:
+                self._cache.invalidate(dimension)
+        self.version += 1
+
+    def _written(self, written: Dict[RoutingDimension, List[ProviderPerformance]]):
+        if self._cache is not None:
+            for dimension, records in written.items():
+                self._cache.set(dimension, list(records))
+        self.version += 1
+        if self._pubsub_client is not None:
+            # One message per batch: node id, then one dimension key per line
+            keys = "\n".join(self._get_key(dimension) for dimension in written)
+            self._pubsub_client.publish(self.INVALIDATION_CHANNEL, f"{self._node_id}|{keys}")
+
+    def _on_invalidation(self, message: dict):
+        data = message.get("data")
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        if not isinstance(data, str):
+            return
+        node_id, _, keys = data.partition("|")
+        if node_id == self._node_id:
+            return
+        for key in keys.splitlines():
+            self.invalidate(RoutingDimension.model_validate_json(key))
+
+    def start_invalidation_listener(self):
+        """
+        Subscribes to cross-node invalidations on a background thread.
+        """
+        if self._pubsub_client is None or self._listener is not None:
+            return
+        pubsub = self._pubsub_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.INVALIDATION_CHANNEL: self._on_invalidation})
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop_invalidation_listener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
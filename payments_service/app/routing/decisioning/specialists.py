@@ -1,13 +1,14 @@
 import json
 from abc import ABC, abstractmethod
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional
 import aisuite
 from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider
 from .models import ProviderPerformance
 
 class BaseAgent(ABC):
-    def __init__(self, model: str = "openai:gpt-4o"):
-        self.client = aisuite.Client()
+    def __init__(self, model: str = "openai:gpt-4o", client: Optional[aisuite.Client] = None):
+        # Share the planner's client so its HTTP connections are reused
+        self.client = client or aisuite.Client()
         self.model = model
 
     @abstractmethod
@@ -186,3 +187,82 @@ class CriticAgent(BaseAgent):
         )
         
         return json.loads(completion.choices[0].message.content or "{}")
+
+# --- Local specialists ---
+# Deterministic versions of the analyses that are plain arithmetic or lookups.
+# They return the same schema as their model-backed counterparts in microseconds.
+
+def _provider_name(provider: Any) -> str:
+    return getattr(provider, "value", provider)
+
+def _margin_confidence(best: float, runner_up: Optional[float], scale: float) -> float:
+    # Certain when there is no alternative; otherwise grows with the lead over the runner-up
+    if runner_up is None:
+        return 1.0
+    return round(min(1.0, 0.5 + abs(runner_up - best) * scale), 2)
+
+class LocalAgent(BaseAgent):
+    """
+    Specialist computed in-process; needs no model client.
+    """
+    is_local = True
+
+    def __init__(self, model: Optional[str] = None, client: Optional[aisuite.Client] = None):
+        self.client = None
+        self.model = model
+
+class LocalCostAnalystAgent(LocalAgent):
+    """
+    Cheapest provider by expected fee for the payment amount.
+    """
+    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        amount = context.get("payment", {}).get("amount", 0.0)
+        costs = sorted(
+            (p["fixed_fee"] + amount * (p["variable_fee_percent"] / 100), _provider_name(p["provider"]))
+            for p in context.get("providers", [])
+        )
+        if not costs:
+            return {"analysis": "No providers to compare.", "recommended_provider": None, "confidence": 0.0}
+        best_cost, best = costs[0]
+        runner_up = costs[1][0] if len(costs) > 1 else None
+        breakdown = ", ".join(f"{name}: {cost:.4f}" for cost, name in costs)
+        return {
+            "analysis": f"Expected fees for {amount}: {breakdown}.",
+            "recommended_provider": best,
+            "confidence": _margin_confidence(best_cost, runner_up, 1.0 / max(best_cost, 0.01))
+        }
+
+class LocalPerformanceAnalystAgent(LocalAgent):
+    """
+    Most reliable provider: highest auth rate, lower latency on ties.
+    """
+    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        ranked = sorted(
+            ((p["auth_rate"], -p["avg_latency_ms"], _provider_name(p["provider"])) for p in context.get("providers", [])),
+            reverse=True
+        )
+        if not ranked:
+            return {"analysis": "No providers to compare.", "recommended_provider": None, "confidence": 0.0}
+        best_rate, _, best = ranked[0]
+        runner_up = ranked[1][0] if len(ranked) > 1 else None
+        breakdown = ", ".join(f"{name}: {rate:.2%} @ {-latency}ms" for rate, latency, name in ranked)
+        return {
+            "analysis": f"Auth rate and latency: {breakdown}.",
+            "recommended_provider": best,
+            # Each point of auth rate lead adds 0.1
+            "confidence": _margin_confidence(best_rate, runner_up, 10.0)
+        }
+
+class LocalHealthSentinelAgent(LocalAgent):
+    """
+    Providers not reported "up", with an alert for each one that is down.
+    """
+    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        health_data = context.get("provider_health", {}) or {}
+        unhealthy = sorted(p for p, status in health_data.items() if status != "up")
+        alerts = [f"{p} is DOWN; do not route to it." for p in unhealthy if health_data[p] == "down"]
+        if unhealthy:
+            analysis = "Unhealthy: " + ", ".join(f"{p} ({health_data[p]})" for p in unhealthy) + "."
+        else:
+            analysis = "All reported providers are up."
+        return {"analysis": analysis, "unhealthy_providers": unhealthy, "critical_alerts": alerts}
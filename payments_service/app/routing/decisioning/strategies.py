@@ -1,18 +1,19 @@
-from typing import List, Dict
-from collections import defaultdict
+from typing import Iterable, List
 from ..ingestion.models import RawTransactionRecord
 from .models import (
     ProviderPerformance, 
-    RoutingDimension, 
     PerformanceMetrics,
     CostStructure
 )
 from .interfaces import IntelligenceStrategy
+from .aggregation import PerformanceAggregator
 
 class StaticAggregationStrategy(IntelligenceStrategy):
     """
     A simple strategy that aggregates transaction records by dimension and provider
     to calculate basic performance metrics (averages).
+    Records are folded into running counters, so any iterable can be analyzed in
+    constant memory.
     """
     def __init__(self, 
                  default_fixed_fee: float = 0.30, 
@@ -22,46 +23,31 @@ class StaticAggregationStrategy(IntelligenceStrategy):
         self.default_variable_fee_percent = default_variable_fee_percent
         self.dynamic_dimensions = dynamic_dimensions or []
 
-    def analyze(self, records: List[RawTransactionRecord]) -> List[ProviderPerformance]:
-        # 1. Group by (Provider, RoutingDimension)
-        grouped_data = defaultdict(list)
-        
-        for record in records:
-            # Build base dimension metadata from record's extra_fields if requested
-            extra_dim_data = {
-                field: record.extra_fields.get(field) 
-                for field in self.dynamic_dimensions 
-                if field in record.extra_fields
-            }
+    def new_aggregator(self) -> PerformanceAggregator:
+        return PerformanceAggregator(self.dynamic_dimensions)
 
-            dim = RoutingDimension(
-                payment_method_type="credit_card", # Simplification
-                payment_form=record.payment_form,
-                network=record.network,
-                card_type=record.card_type,
-                region=record.region,
-                currency=record.currency,
-                **extra_dim_data # Inject dynamic dimensions for grouping
-            )
-            grouped_data[(record.provider, dim)].append(record)
+    def aggregate(self, records: Iterable[RawTransactionRecord]) -> PerformanceAggregator:
+        """
+        Folds records into running counters without holding them in memory.
+        """
+        return self.new_aggregator().add_all(records)
+
+    def analyze(self, records: Iterable[RawTransactionRecord]) -> List[ProviderPerformance]:
+        return self.summarize(self.aggregate(records))
 
+    def summarize(self, aggregator: PerformanceAggregator) -> List[ProviderPerformance]:
+        """
+        Turns (possibly merged) running counters into performance metrics.
+        """
         results = []
         
-        # 2. Calculate metrics for each group
-        for (provider, dim), provider_records in grouped_data.items():
-            total_count = len(provider_records)
-            success_count = sum(1 for r in provider_records if r.status == "succeeded")
-            total_latency = sum(r.latency_ms for r in provider_records)
-            
-            auth_rate = success_count / total_count if total_count > 0 else 0.0
-            avg_latency = int(total_latency / total_count) if total_count > 0 else 0
-            
+        for provider, dim, stats in aggregator.items():
             # Simple static cost mapping for demonstration
             # In a real system, this would come from the record's actual cost or a fee engine
             metrics = PerformanceMetrics(
-                auth_rate=auth_rate,
+                auth_rate=stats.auth_rate,
                 fraud_rate=0.01, # Placeholder
-                avg_latency_ms=avg_latency,
+                avg_latency_ms=int(stats.avg_latency_ms),
                 cost_structure=CostStructure(
                     variable_fee_percent=self.default_variable_fee_percent,
                     fixed_fee=self.default_fixed_fee
@@ -2,3 +2,5 @@ from .models import RawTransactionRecord
 from .interfaces import DataProvider
 from .service import DataIngestor
 from .parsers import BaseTransactionParser, StripeCsvParser, AdyenCsvParser
+from .csv_provider import CsvExportDataProvider
+from .parallel import ParallelIngestionRunner
@@ -0,0 +1,39 @@
+import csv
+from itertools import chain, islice
+from typing import Iterator, List
+from .interfaces import DataProvider
+from .models import RawTransactionRecord
+from .parsers import BaseTransactionParser
+
+class CsvExportDataProvider(DataProvider):
+    """
+    Streams a processor export (Stripe, Adyen, ...) from a CSV file in fixed-size chunks.
+    Each chunk is parsed column-wise by the parser and handed on before the next one
+    is read, so memory stays bounded by chunk_size regardless of file size.
+    Small chunks also keep the number of live objects (and GC passes over them) low.
+    """
+    def __init__(self, file_path: str, parser: BaseTransactionParser, chunk_size: int = 5_000):
+        self.file_path = file_path
+        self.parser = parser
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self) -> Iterator[List[RawTransactionRecord]]:
+        with open(self.file_path, mode='r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            while True:
+                rows = list(islice(reader, self.chunk_size))
+                if not rows:
+                    return
+                yield self.parser.parse_chunk(header, rows)
+
+    def iter_data(self) -> Iterator[RawTransactionRecord]:
+        return chain.from_iterable(self.iter_chunks())
+
+    def fetch_data(self) -> List[RawTransactionRecord]:
+        """
+        Loads the whole file. Prefer iter_data() for large exports.
+        """
+        return list(self.iter_data())
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Any
+from typing import Iterable, List, Any
 
 class DataProvider(ABC):
     """
@@ -11,3 +11,10 @@ class DataProvider(ABC):
         Retrieves raw data from the specific source.
         """
         pass
+
+    def iter_data(self) -> Iterable[Any]:
+        """
+        Yields raw data lazily. Sources too large to hold in memory (e.g. file
+        exports) override this; the default just walks fetch_data().
+        """
+        return iter(self.fetch_data() or [])
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import List, Optional, Sequence, Tuple, TYPE_CHECKING
+from .csv_provider import CsvExportDataProvider
+from .parsers import BaseTransactionParser
+from ..decisioning.aggregation import PerformanceAggregator
+from ..decisioning.models import ProviderPerformance
+from ..decisioning.repository import RoutingPerformanceRepository
+
+if TYPE_CHECKING:
+    # decisioning.strategies imports ingestion.models, so only import it for typing
+    from ..decisioning.strategies import StaticAggregationStrategy
+
+# (export file path, parser for that processor's format)
+IngestionJob = Tuple[str, BaseTransactionParser]
+
+def aggregate_export(
+    file_path: str,
+    parser: BaseTransactionParser,
+    strategy: "StaticAggregationStrategy",
+    chunk_size: int
+) -> PerformanceAggregator:
+    """
+    Worker entry point: streams one export into a partial aggregate.
+    Module-level so it can be pickled into a process pool.
+    """
+    return strategy.aggregate(CsvExportDataProvider(file_path, parser, chunk_size).iter_data())
+
+class ParallelIngestionRunner:
+    """
+    Fans processor export files out to a process pool. Each worker parses and
+    pre-aggregates its file; the parent merges the partial counters and writes
+    the resulting performance records once.
+    """
+    def __init__(
+        self,
+        performance_repository: RoutingPerformanceRepository,
+        strategy: "StaticAggregationStrategy",
+        max_workers: Optional[int] = None,
+        chunk_size: int = 5_000
+    ):
+        self.performance_repository = performance_repository
+        self.strategy = strategy
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def aggregate_files(self, jobs: Sequence[IngestionJob], executor: Optional[Executor] = None) -> PerformanceAggregator:
+        merged = self.strategy.new_aggregator()
+        if not jobs:
+            return merged
+
+        if executor is None and (self.max_workers == 1 or len(jobs) == 1):
+            # Nothing to parallelize; skip the pool start-up and pickling cost
+            for file_path, parser in jobs:
+                merged.merge(aggregate_export(file_path, parser, self.strategy, self.chunk_size))
+            return merged
+
+        owns_executor = executor is None
+        executor = executor or ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs)))
+        try:
+            futures = {
+                executor.submit(aggregate_export, file_path, parser, self.strategy, self.chunk_size): file_path
+                for file_path, parser in jobs
+            }
+            for future in as_completed(futures):
+                partial = future.result()
+                print(f"[Ingestion] {futures[future]}: {partial.record_count} records, {len(partial)} groups")
+                merged.merge(partial)
+        finally:
+            if owns_executor:
+                executor.shutdown()
+        return merged
+
+    def ingest_files(self, jobs: Sequence[IngestionJob], executor: Optional[Executor] = None) -> List[ProviderPerformance]:
+        """
+        Ingests all export files and updates the repository with the merged metrics.
+        """
+        merged = self.aggregate_files(jobs, executor)
+        results = self.strategy.summarize(merged)
+        self.performance_repository.save_many(results)
+        print(f"[Ingestion] Merged {merged.record_count} records from {len(jobs)} files into {len(results)} performance records")
+        return results
@@ -1,4 +1,4 @@
-from typing import List, Any
+from typing import Iterable
 from .models import RawTransactionRecord
 from .interfaces import DataProvider
 from ..decisioning.interfaces import IntelligenceStrategy
@@ -19,20 +19,21 @@ class DataIngestor:
 
     def ingest_from_provider(self, provider: DataProvider):
         """
-        Fetches raw data from a provider, transforms it, and analyzes it.
+        Streams raw data from a provider, transforms it, and analyzes it.
         """
-        raw_data = provider.fetch_data()
-        
         # In this simplified version, we assume raw_data is already parsed 
-        # into List[RawTransactionRecord] by the provider for convenience.
+        # into RawTransactionRecord by the provider for convenience.
         # In a real scenario, there might be a separate Parsing layer.
-        
-        if not raw_data:
-            return
+        # Duck-typed providers that predate iter_data() only offer fetch_data()
+        iter_data = getattr(provider, "iter_data", None)
+        self.ingest_records(iter_data() if iter_data else iter(provider.fetch_data() or []))
 
+    def ingest_records(self, records: Iterable[RawTransactionRecord]):
+        """
+        Analyzes a (possibly lazy) stream of records and updates the repository.
+        """
         # Perform analysis
-        performance_results = self.intelligence_strategy.analyze(raw_data)
+        performance_results = self.intelligence_strategy.analyze(records)
         
-        # Update repository
-        for result in performance_results:
-            self.performance_repository.save(result)
+        # Update repository in one batched write
+        self.performance_repository.save_many(performance_results)
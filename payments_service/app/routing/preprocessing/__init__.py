@@ -1,2 +1,5 @@
 from .models import PaymentContext, PaymentRoute, Customer, PaymentMethodDetails, Product, BillingType, FeeStructure
 from .service import FeeService, RoutingService, PreprocessingService
+from .routing_table import CompiledRoutingTable
+from .health import ProviderHealthCache
+from .renewal_shards import ShardedRenewalRunner
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+import asyncio
+import redis
+import redis.asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from payments_service.app.core.models.payment import PaymentProvider
+
+class ProviderHealthCache:
+    """
+    In-process view of the provider_health:* flags written by the status monitor.
+
+    All flags are fetched with a single MGET and served from memory for
+    ttl_seconds. With start_refresher, a background thread keeps the view current
+    so routing reads never wait on Redis. Providers without a flag count as "up".
+    """
+    KEY_PREFIX = "provider_health:"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        providers: Sequence[PaymentProvider] = tuple(PaymentProvider),
+        ttl_seconds: float = 5.0,
+        async_redis_client: Optional[redis.asyncio.Redis] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.providers = tuple(providers)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._keys = [f"{self.KEY_PREFIX}{p.value.lower()}" for p in self.providers]
+        self._snapshot: Optional[Dict[str, str]] = None
+        self._fetched_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.hits = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, redis_client: Optional[redis.Redis] = None, **kwargs) -> "ProviderHealthCache":
+        return cls(
+            redis_client,
+            ttl_seconds=float(os.getenv("PROVIDER_HEALTH_TTL_SECONDS", "5")),
+            **kwargs
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """
+        False without a Redis client, in which case every provider reads as "up".
+        """
+        return self.redis_client is not None or self.async_redis_client is not None
+
+    def get_fresh(self) -> Optional[Dict[str, str]]:
+        """
+        The cached statuses if still within the TTL, without any I/O.
+        """
+        if not self.enabled:
+            return self._all_up()
+        snapshot = self._snapshot
+        if snapshot is not None and self._clock() - self._fetched_at < self.ttl_seconds:
+            self.hits += 1
+            return snapshot
+        return None
+
+    def snapshot(self) -> Dict[str, str]:
+        """
+        Provider value -> status. Refreshes with one MGET once the TTL has passed.
+        """
+        fresh = self.get_fresh()
+        if fresh is not None:
+            return fresh
+        if self.redis_client is None:
+            # Only an async client is configured; serve what we have
+            return self._snapshot or self._all_up()
+        if not self._refresh_lock.acquire(blocking=self._snapshot is None):
+            # Another thread is already refreshing; the previous view is good enough
+            return self._snapshot
+        try:
+            fresh = self.get_fresh()
+            if fresh is not None:
+                return fresh
+            try:
+                values = self.redis_client.mget(self._keys)
+            except redis.RedisError as e:
+                return self._failed(e)
+            return self._store(values)
+        finally:
+            self._refresh_lock.release()
+
+    async def snapshot_async(self) -> Dict[str, str]:
+        """
+        Non-blocking variant of snapshot.
+        """
+        fresh = self.get_fresh()
+        if fresh is not None:
+            return fresh
+        if self.async_redis_client is None:
+            return await asyncio.to_thread(self.snapshot)
+        try:
+            values = await self.async_redis_client.mget(self._keys)
+        except redis.RedisError as e:
+            return self._failed(e)
+        return self._store(values)
+
+    def refresh(self) -> Dict[str, str]:
+        self._fetched_at = float("-inf")
+        return self.snapshot()
+
+    def is_up(self, provider: PaymentProvider) -> bool:
+        return self.snapshot().get(provider.value, "up") != "down"
+
+    def healthy(self, providers: Iterable[PaymentProvider]) -> List[PaymentProvider]:
+        health = self.snapshot()
+        return [p for p in providers if health.get(p.value, "up") != "down"]
+
+    def start_refresher(self):
+        """
+        Refreshes on a background thread at half the TTL, so hot-path reads are
+        always served from memory.
+        """
+        if self.redis_client is None or self._refresher is not None:
+            return
+        self._stopped.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="provider-health-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self):
+        if self._refresher is not None:
+            self._stopped.set()
+            self._refresher.join(timeout=1.0)
+            self._refresher = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "refreshes": self.refreshes, "errors": self.errors}
+
+    def _refresh_loop(self):
+        while not self._stopped.is_set():
+            self.refresh()
+            self._stopped.wait(self.ttl_seconds / 2)
+
+    def _all_up(self) -> Dict[str, str]:
+        return {p.value: "up" for p in self.providers}
+
+    def _store(self, values: List[Optional[bytes]]) -> Dict[str, str]:
+        snapshot = {}
+        for p, status in zip(self.providers, values):
+            if isinstance(status, bytes):
+                status = status.decode("utf-8")
+            snapshot[p.value] = status or "up"
+        self._snapshot = snapshot
+        self._fetched_at = self._clock()
+        self.refreshes += 1
+        return snapshot
+
+    def _failed(self, error: Exception) -> Dict[str, str]:
+        # Keep the last known view; retry after another TTL instead of on every read
+        print(f"[ProviderHealth] Refresh failed, serving last known status: {error}")
+        self.errors += 1
+        self._fetched_at = self._clock()
+        if self._snapshot is None:
+            self._snapshot = self._all_up()
+        return self._snapshot
@@ -0,0 +1,127 @@
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from ...core.repositories.renewal_lease_repository import RenewalLeaseRepository, shard_key_range
+from ...core.utils.datetime_utils import now_utc
+from .service import PreprocessingService
+
+class ShardedRenewalRunner:
+    """
+    Splits renewal pre-calculation across any number of workers.
+
+    Subscriptions are partitioned into shard_count shards by ranges of their
+    shard_key, a stable hash of the id. Each cycle
+    a worker keeps leasing shards that no worker has completed within the last
+    cycle_interval_seconds and, within a shard, only routes subscriptions that
+    are new or whose route is stale: missing, expiring before the renewal, or
+    older than max_route_age_seconds. The lease is renewed after every batch;
+    a worker that loses it stops and leaves the shard to its new owner.
+    """
+    def __init__(
+        self,
+        preprocessing_service: PreprocessingService,
+        lease_repository: RenewalLeaseRepository,
+        shard_count: int = 16,
+        owner: Optional[str] = None,
+        lease_seconds: float = 300.0,
+        lookahead_days: int = 7,
+        max_route_age_seconds: float = 21600.0,
+        cycle_interval_seconds: float = 60.0
+    ):
+        self.preprocessing_service = preprocessing_service
+        self.leases = lease_repository
+        self.shard_count = shard_count
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.lookahead_days = lookahead_days
+        self.max_route_age_seconds = max_route_age_seconds
+        self.cycle_interval_seconds = cycle_interval_seconds
+        self.running = True
+        self.cycles = 0
+        self.shards_completed = 0
+        self.shards_lost = 0
+        self.routes_written = 0
+
+    @classmethod
+    def from_env(cls, preprocessing_service: PreprocessingService, lease_repository: RenewalLeaseRepository) -> "ShardedRenewalRunner":
+        return cls(
+            preprocessing_service,
+            lease_repository,
+            shard_count=int(os.getenv("RENEWAL_SHARD_COUNT", "16")),
+            owner=os.getenv("RENEWAL_WORKER_ID") or None,
+            lease_seconds=float(os.getenv("RENEWAL_LEASE_SECONDS", "300")),
+            lookahead_days=int(os.getenv("RENEWAL_LOOKAHEAD_DAYS", "7")),
+            max_route_age_seconds=float(os.getenv("RENEWAL_ROUTE_MAX_AGE_SECONDS", "21600")),
+            cycle_interval_seconds=float(os.getenv("RENEWAL_CHECK_INTERVAL_SECONDS", "60"))
+        )
+
+    def run_cycle(self) -> int:
+        """
+        Processes shards until none are due. Returns the number of routes written.
+        """
+        self.leases.ensure_shards(self.shard_count)
+        started = now_utc()
+        completed_before = started - timedelta(seconds=self.cycle_interval_seconds)
+        route_stale_before = started - timedelta(seconds=self.max_route_age_seconds)
+        written = 0
+        shards = 0
+        while self.running:
+            shard = self.leases.claim(self.owner, self.shard_count, self.lease_seconds, completed_before)
+            if shard is None:
+                break
+            shards += 1
+            written += self._process_shard(shard, route_stale_before)
+
+        self.cycles += 1
+        self.routes_written += written
+        elapsed = (now_utc() - started).total_seconds()
+        print(f"[RenewalWorker] {self.owner} processed {shards} shard(s), {written} stale route(s) in {elapsed:.1f}s")
+        return written
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "shard_count": self.shard_count,
+            "cycles": self.cycles,
+            "shards_completed": self.shards_completed,
+            "shards_lost": self.shards_lost,
+            "routes_written": self.routes_written
+        }
+
+    def _process_shard(self, shard: int, route_stale_before: datetime) -> int:
+        held = True
+
+        def heartbeat() -> bool:
+            nonlocal held
+            held = self.running and self.leases.renew(shard, self.owner, self.lease_seconds)
+            return held
+
+        started = time.perf_counter()
+        try:
+            written = self.preprocessing_service.precalculate_upcoming_renewals(
+                lookahead_days=self.lookahead_days,
+                shard_key_range=shard_key_range(shard, self.shard_count),
+                route_stale_before=route_stale_before,
+                heartbeat=heartbeat
+            )
+        except Exception as e:
+            # The lease is kept until it expires, so the shard is retried after
+            # lease_seconds rather than straight away by this loop
+            print(f"[RenewalWorker] Shard {shard} failed: {e}")
+            return 0
+
+        if held:
+            self.leases.release(shard, self.owner, completed=True)
+            self.shards_completed += 1
+        elif self.running:
+            print(f"[RenewalWorker] Lost the lease on shard {shard}; leaving it to its new owner")
+            self.shards_lost += 1
+        else:
+            self.leases.release(shard, self.owner, completed=False)
+        print(f"[RenewalWorker] Shard {shard}/{self.shard_count}: {written} route(s) in {time.perf_counter() - started:.2f}s")
+        return written
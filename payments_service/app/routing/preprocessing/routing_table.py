@@ -0,0 +1,92 @@
+import time
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from ..decisioning.models import RoutingDimension, RouteEntry
+from ..decisioning.repository import RoutingPerformanceRepository
+
+if TYPE_CHECKING:
+    from .service import FeeService
+
+class CompiledRoutingTable:
+    """
+    In-process routing table: per RoutingDimension, a flat tuple of RouteEntry rows
+    reconciling performance data (priority) with the static fee schedule (fallback).
+
+    A dimension is recompiled only when the performance repository or fee service
+    version changes, or after max_age_seconds so writes made by other processes
+    against a shared store are eventually picked up.
+    """
+    DEFAULT_AUTH_RATE = 0.95 # Default auth rate for static fees
+    DEFAULT_LATENCY_MS = 300 # Default latency for static fees
+
+    def __init__(
+        self,
+        fee_service: "FeeService",
+        performance_repository: RoutingPerformanceRepository,
+        max_age_seconds: float = 30.0
+    ):
+        self.fee_service = fee_service
+        self.performance_repository = performance_repository
+        self.max_age_seconds = max_age_seconds
+        # dimension -> (perf_version, fee_version, compiled_at, routes)
+        self._tables: Dict[RoutingDimension, Tuple[int, int, float, Tuple[RouteEntry, ...]]] = {}
+
+    def get_fresh(self, dimension: RoutingDimension) -> Optional[Tuple[RouteEntry, ...]]:
+        """
+        Returns the compiled routes if they are still current, without any I/O.
+        """
+        cached = self._tables.get(dimension)
+        if not cached:
+            return None
+        cached_perf, cached_fee, compiled_at, routes = cached
+        if (
+            cached_perf == self.performance_repository.version
+            and cached_fee == self.fee_service.version
+            and time.monotonic() - compiled_at < self.max_age_seconds
+        ):
+            return routes
+        return None
+
+    def lookup(self, dimension: RoutingDimension) -> Tuple[RouteEntry, ...]:
+        routes = self.get_fresh(dimension)
+        if routes is not None:
+            return routes
+
+        # Read versions before compiling so a concurrent write forces another rebuild
+        perf_version = self.performance_repository.version
+        fee_version = self.fee_service.version
+        routes = self._compile(dimension)
+        self._tables[dimension] = (perf_version, fee_version, time.monotonic(), routes)
+        return routes
+
+    def invalidate(self):
+        self._tables.clear()
+
+    def _compile(self, dimension: RoutingDimension) -> Tuple[RouteEntry, ...]:
+        compiled: Dict = {}
+
+        # Priority 1: Performance Data (Dynamic)
+        for perf in self.performance_repository.find_by_dimension(dimension):
+            cost = perf.metrics.cost_structure
+            compiled[perf.provider] = RouteEntry(
+                provider=perf.provider,
+                fixed_fee=cost.fixed_fee,
+                variable_fee_percent=cost.variable_fee_percent,
+                auth_rate=perf.metrics.auth_rate,
+                avg_latency_ms=perf.metrics.avg_latency_ms,
+                # Reconstruct extra fields from RoutingDimension
+                extra_fields=perf.dimension.model_extra or {}
+            )
+
+        # Priority 2: Static Fees (Fallback if not in Performance Data)
+        for fee in self.fee_service.get_all_fees():
+            if fee.provider not in compiled:
+                compiled[fee.provider] = RouteEntry(
+                    provider=fee.provider,
+                    fixed_fee=fee.fixed_fee,
+                    variable_fee_percent=fee.variable_fee_percent,
+                    auth_rate=self.DEFAULT_AUTH_RATE,
+                    avg_latency_ms=self.DEFAULT_LATENCY_MS,
+                    extra_fields={}
+                )
+
+        return tuple(compiled.values())
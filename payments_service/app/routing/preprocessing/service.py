@@ -1,6 +1,10 @@
 import json
+import os
+import asyncio
 import redis
-from typing import List, Optional
+import redis.asyncio
+from datetime import datetime
+from typing import Callable, List, Optional, Dict, Sequence, Tuple
 try:
     import aisuite
 except ImportError:
@@ -20,9 +24,10 @@ from ...core.models.precalculated_route import PrecalculatedRouteCreate
 from ...core.repositories.subscription_repository import SubscriptionRepository
 from ...core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
 from ...core.repositories.metadata_repository import CardBINRepository, InterchangeFeeRepository
-from ..decisioning.models import RoutingDimension, ResolvedProvider
+from ..decisioning.models import RoutingDimension, ResolvedProvider, RankedRoute, RouteEntry
 from ..decisioning.repository import RoutingPerformanceRepository
 from ...core.utils.datetime_utils import now_utc, normalize_to_utc
+from ...processors.registry import ProcessorRegistry
 
 class FeeService:
     def __init__(self):
@@ -66,13 +71,24 @@ class FeeService:
             ),
         ]
 
+        # Bumped whenever the fee schedule is replaced so compiled routing tables rebuild
+        self.version = 0
+
     def get_all_fees(self) -> List[FeeStructure]:
         return self.fees
 
+    def update_fees(self, fees: List[FeeStructure]):
+        self.fees = list(fees)
+        self.version += 1
+
 from ..decisioning.interfaces import RoutingDecisionStrategy
 from ..decisioning.decision_strategies import LLMDecisionStrategy, DeterministicLeastCostStrategy
+from .routing_table import CompiledRoutingTable
+from .health import ProviderHealthCache
 
 class RoutingService:
+    HEALTH_CHECKED_PROVIDERS = [PaymentProvider.STRIPE, PaymentProvider.ADYEN, PaymentProvider.BRAINTREE]
+
     def __init__(
         self, 
         fee_service: FeeService, 
@@ -80,15 +96,27 @@ class RoutingService:
         bin_repository: Optional[CardBINRepository] = None,
         fee_repository: Optional[InterchangeFeeRepository] = None,
         redis_client: Optional[redis.Redis] = None,
-        strategy: Optional[RoutingDecisionStrategy] = None
+        strategy: Optional[RoutingDecisionStrategy] = None,
+        async_redis_client: Optional[redis.asyncio.Redis] = None,
+        routing_table: Optional[CompiledRoutingTable] = None,
+        processor_registry: Optional[ProcessorRegistry] = None,
+        health_cache: Optional[ProviderHealthCache] = None
     ):
         self.fee_service = fee_service
         self.performance_repository = performance_repository
         self.bin_repository = bin_repository
         self.fee_repository = fee_repository
         self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
         # Default to Least Cost strategy if none provided (more robust than LLM for base setup)
         self.strategy = strategy or DeterministicLeastCostStrategy()
+        self.routing_table = routing_table or CompiledRoutingTable(fee_service, performance_repository)
+        # Source of live circuit breaker state; providers with an open circuit are not routed to
+        self.processor_registry = processor_registry
+        # Provider health served from memory; shared with PreprocessingService and the API
+        self.health_cache = health_cache or ProviderHealthCache(
+            redis_client, self.HEALTH_CHECKED_PROVIDERS, async_redis_client=async_redis_client
+        )
 
     def find_best_route(self, payment_create: PaymentCreate) -> PaymentProvider:
         """
@@ -97,10 +125,99 @@ class RoutingService:
         if payment_create.provider:
             return payment_create.provider
 
-        # 1. Gather raw data
-        all_fees = self.fee_service.get_all_fees()
-        
+        if self.strategy.supports_compiled_routes:
+            return self._decide_compiled(payment_create)
+
+        self._attach_context(payment_create)
+        resolved_providers = self._resolve_providers(payment_create)
+
+        # 3. Delegate to strategy
+        provider = self.strategy.decide(
+            payment_in=payment_create,
+            providers=resolved_providers
+        )
+        return self._log_decision(provider)
+
+    async def find_best_route_async(self, payment_create: PaymentCreate) -> PaymentProvider:
+        """
+        Non-blocking variant of find_best_route.
+        """
+        if payment_create.provider:
+            return payment_create.provider
+
+        if self.strategy.supports_compiled_routes:
+            dimension = self._routing_dimension(payment_create)
+            routes = self.routing_table.get_fresh(dimension)
+            if routes is None:
+                # Table miss reads the performance store; keep it off the event loop
+                routes = await asyncio.to_thread(self.routing_table.lookup, dimension)
+            return self._log_decision(self.strategy.decide_compiled(payment_create, self._available(routes)))
+
+        await self._attach_context_async(payment_create)
+        resolved_providers = await asyncio.to_thread(self._resolve_providers, payment_create)
+
+        provider = await self.strategy.decide_async(
+            payment_in=payment_create,
+            providers=resolved_providers
+        )
+        return self._log_decision(provider)
+
+    def find_ranked_routes(self, payment_create: PaymentCreate) -> List[RankedRoute]:
+        """
+        Ordered candidates (best first) with scores from a single routing computation,
+        so callers can fall back down the list without routing again.
+        """
+        if payment_create.provider:
+            return [RankedRoute(payment_create.provider, None, None, None)]
+
+        if self.strategy.supports_compiled_routes:
+            routes = self._lookup_routes(payment_create)
+            return self._log_ranking(self.strategy.rank_compiled(payment_create, routes))
+
+        self._attach_context(payment_create)
+        return self._log_ranking(self.strategy.rank(payment_create, self._resolve_providers(payment_create)))
+
+    async def find_ranked_routes_async(self, payment_create: PaymentCreate) -> List[RankedRoute]:
+        """
+        Non-blocking variant of find_ranked_routes.
+        """
+        if payment_create.provider:
+            return [RankedRoute(payment_create.provider, None, None, None)]
+
+        if self.strategy.supports_compiled_routes:
+            dimension = self._routing_dimension(payment_create)
+            routes = self.routing_table.get_fresh(dimension)
+            if routes is None:
+                routes = await asyncio.to_thread(self.routing_table.lookup, dimension)
+            return self._log_ranking(self.strategy.rank_compiled(payment_create, self._available(routes)))
+
+        await self._attach_context_async(payment_create)
+        resolved_providers = await asyncio.to_thread(self._resolve_providers, payment_create)
+        return self._log_ranking(await self.strategy.rank_async(payment_create, resolved_providers))
+
+    def _attach_context(self, payment_create: PaymentCreate):
         # --- Context Enrichment for Agentic Strategies ---
+        self._enrich_context(payment_create)
+
+        # Attach Health status
+        if self.health_cache.enabled:
+            payment_create.provider_health = self._health_for(self.health_cache.snapshot())
+
+    async def _attach_context_async(self, payment_create: PaymentCreate):
+        """
+        Health normally comes from memory; when the cached view has expired it is
+        refreshed with a single MGET alongside the enrichment lookups.
+        """
+        if self.health_cache.enabled:
+            _, health = await asyncio.gather(
+                asyncio.to_thread(self._enrich_context, payment_create),
+                self.health_cache.snapshot_async()
+            )
+            payment_create.provider_health = self._health_for(health)
+        else:
+            await asyncio.to_thread(self._enrich_context, payment_create)
+
+    def _enrich_context(self, payment_create: PaymentCreate):
         # Attach BIN metadata if possible
         if self.bin_repository and hasattr(payment_create, "payment_method") and payment_create.payment_method.bin:
             payment_create.bin_metadata = self.bin_repository.find_by_bin(payment_create.payment_method.bin)
@@ -108,63 +225,69 @@ class RoutingService:
         # Attach Interchange rules
         if self.fee_repository:
             payment_create.interchange_fees = self.fee_repository.list_all()
-            
-        # Attach Health status
-        if self.redis_client:
-            health = {}
-            for p in [PaymentProvider.STRIPE, PaymentProvider.ADYEN, PaymentProvider.BRAINTREE]:
-                status = self.redis_client.get(f"provider_health:{p.value.lower()}")
-                health[p.value] = status.decode('utf-8') if status else "up"
-            payment_create.provider_health = health
-        # --------------------------------------------------
 
+    def _health_for(self, health: Dict[str, str]) -> Dict[str, str]:
+        return {p.value: health.get(p.value, "up") for p in self.HEALTH_CHECKED_PROVIDERS}
+
+    def _routing_dimension(self, payment_create: PaymentCreate) -> RoutingDimension:
         # In a real app, we'd filter by dimension here
-        dimension = RoutingDimension(
+        return RoutingDimension(
             payment_method_type="credit_card",
             currency=payment_create.currency,
             region="domestic" # Default for now
         )
-        performance_data = self.performance_repository.find_by_dimension(dimension)
-        
-        # 2. Reconcile into ResolvedProvider view (Deterministic Source of Truth)
-        resolved_map = {}
-        
-        # Priority 1: Performance Data (Dynamic)
-        for perf in performance_data:
-            # Reconstruct extra fields from RoutingDimension
-            extra_from_dim = perf.dimension.model_extra or {}
-
-            resolved_map[perf.provider] = ResolvedProvider(
-                provider=perf.provider,
-                fixed_fee=perf.metrics.cost_structure.fixed_fee,
-                variable_fee_percent=perf.metrics.cost_structure.variable_fee_percent,
-                auth_rate=perf.metrics.auth_rate,
-                avg_latency_ms=perf.metrics.avg_latency_ms,
-                extra_fields=extra_from_dim
-            )
-            
-        # Priority 2: Static Fees (Fallback if not in Performance Data)
-        for fee in all_fees:
-            if fee.provider not in resolved_map:
-                resolved_map[fee.provider] = ResolvedProvider(
-                    provider=fee.provider,
-                    fixed_fee=fee.fixed_fee,
-                    variable_fee_percent=fee.variable_fee_percent,
-                    auth_rate=0.95, # Default auth rate for static fees
-                    avg_latency_ms=300 # Default latency for static fees
-                )
-        
-        resolved_providers = list(resolved_map.values())
 
-        # 3. Delegate to strategy
-        provider = self.strategy.decide(
-            payment_in=payment_create,
-            providers=resolved_providers
-        )
-        
+    def _decide_compiled(self, payment_create: PaymentCreate) -> PaymentProvider:
+        """
+        Fast path for strategies that only need fees and metrics: no context
+        enrichment and no ResolvedProvider construction.
+        """
+        routes = self._lookup_routes(payment_create)
+        return self._log_decision(self.strategy.decide_compiled(payment_create, routes))
+
+    def _lookup_routes(self, payment_create: PaymentCreate) -> Sequence[RouteEntry]:
+        return self._available(self.routing_table.lookup(self._routing_dimension(payment_create)))
+
+    def _available(self, routes: Sequence[RouteEntry]) -> Sequence[RouteEntry]:
+        """
+        Drops providers whose circuit is open (in-memory check, no network read).
+        If every circuit is open, all routes are kept rather than none.
+        """
+        if self.processor_registry is None:
+            return routes
+        available = tuple(route for route in routes if self.processor_registry.is_available(route.provider))
+        return available or routes
+
+    def _log_decision(self, provider: PaymentProvider) -> PaymentProvider:
         print(f"Routing Decision: Strategy {self.strategy.__class__.__name__} chose '{provider.value}'")
         return provider
 
+    def _log_ranking(self, ranked: List[RankedRoute]) -> List[RankedRoute]:
+        order = " > ".join(r.provider.value for r in ranked)
+        print(f"Routing Decision: Strategy {self.strategy.__class__.__name__} ranked '{order}'")
+        return ranked
+
+    def resolve_providers(self, payment_create: PaymentCreate) -> List[ResolvedProvider]:
+        """
+        Reconciled fee and performance view of every candidate provider.
+        """
+        return self._resolve_providers(payment_create)
+
+    def _resolve_providers(self, payment_create: PaymentCreate) -> List[ResolvedProvider]:
+        # Reconcile into ResolvedProvider view (Deterministic Source of Truth)
+        routes = self._lookup_routes(payment_create)
+        return [
+            ResolvedProvider(
+                provider=route.provider,
+                fixed_fee=route.fixed_fee,
+                variable_fee_percent=route.variable_fee_percent,
+                auth_rate=route.auth_rate,
+                avg_latency_ms=route.avg_latency_ms,
+                extra_fields=dict(route.extra_fields)
+            )
+            for route in routes
+        ]
+
 class PreprocessingService:
     """
     Service to handle pre-processing of payments, such as preparing routes for recurring payments.
@@ -172,12 +295,13 @@ class PreprocessingService:
     def __init__(
         self, 
         performance_repository: RoutingPerformanceRepository,
-        bin_repository: CardBINRepository,
-        fee_repository: InterchangeFeeRepository,
+        bin_repository: Optional[CardBINRepository] = None,
+        fee_repository: Optional[InterchangeFeeRepository] = None,
         redis_client: Optional[redis.Redis] = None,
         subscription_repository: Optional[SubscriptionRepository] = None,
         precalculated_route_repository: Optional[PrecalculatedRouteRepository] = None,
-        routing_service: Optional[RoutingService] = None
+        routing_service: Optional[RoutingService] = None,
+        health_cache: Optional[ProviderHealthCache] = None
     ):
         self.performance_repository = performance_repository
         self.bin_repository = bin_repository
@@ -186,6 +310,7 @@ class PreprocessingService:
         self.subscription_repository = subscription_repository
         self.precalculated_route_repository = precalculated_route_repository
         self.routing_service = routing_service
+        self.health_cache = health_cache or ProviderHealthCache(redis_client)
 
     def preprocess_recurrent_payment(
         self, 
@@ -205,7 +330,7 @@ class PreprocessingService:
     def _determine_route(self, context: PaymentContext) -> PaymentRoute:
         # 1. Lookup BIN Metadata
         bin_data = None
-        if context.payment_method.bin:
+        if context.payment_method.bin and self.bin_repository:
             bin_data = self.bin_repository.find_by_bin(context.payment_method.bin)
 
         # 2. Build Dimension from Context and BIN data
@@ -222,17 +347,9 @@ class PreprocessingService:
             currency="USD"
         )
 
-        # 3. Check Provider Health (Redis)
-        healthy_providers = []
+        # 3. Check Provider Health (served from memory, refreshed with one MGET)
         all_providers = [PaymentProvider.STRIPE, PaymentProvider.ADYEN, PaymentProvider.BRAINTREE]
-        
-        if self.redis_client:
-            for provider in all_providers:
-                health = self.redis_client.get(f"provider_health:{provider.value.lower()}")
-                if health != b"down":
-                    healthy_providers.append(provider)
-        else:
-            healthy_providers = all_providers
+        healthy_providers = self.health_cache.healthy(all_providers)
 
         # 4. Get Candidates via Performance Repository
         candidates = self.performance_repository.find_by_dimension(dimension)
@@ -265,24 +382,65 @@ class PreprocessingService:
             routing_reason=f"Optimal route for {network} {card_type} ({region}). Scoring: {score(best_candidate):.4f}"
         )
 
-    def precalculate_upcoming_renewals(self, lookahead_days: int = 7):
+    def precalculate_upcoming_renewals(
+        self,
+        lookahead_days: int = 7,
+        batch_size: Optional[int] = None,
+        shard_key_range: Optional[Tuple[int, int]] = None,
+        route_stale_before: Optional[datetime] = None,
+        heartbeat: Optional[Callable[[], bool]] = None
+    ) -> int:
         """
         Scans for subscriptions renewing within the lookahead window and 
         pre-calculates the best routing decision.
+
+        Subscriptions are paged by keyset, routed once per equivalent routing
+        context (merchant, currency, amount) and upserted one batch at a time.
+        shard_key_range and route_stale_before narrow the scan to one shard and to
+        subscriptions whose route is missing or stale (see
+        SubscriptionRepository.find_upcoming_renewals_page). heartbeat is called
+        after every batch; returning False stops the scan.
+        Returns the number of routes written.
         """
         if not self.subscription_repository or not self.precalculated_route_repository or not self.routing_service:
             print("Warning: Repositories or RoutingService not injected. Skipping pre-calculation.")
-            return
+            return 0
 
         from datetime import timedelta
         now = now_utc()
         target_date = now + timedelta(days=lookahead_days)
-        
-        upcoming_subscriptions = self.subscription_repository.find_upcoming_renewals(now, target_date)
-        print(f"Found {len(upcoming_subscriptions)} upcoming renewals.")
+        batch_size = batch_size or int(os.getenv("RENEWAL_BATCH_SIZE", "1000"))
+        routing_decision = f"Pre-calculated via {self.routing_service.strategy.__class__.__name__} at {now.isoformat()}"
+
+        # Decisions are reused across pages for the whole run
+        decisions: Dict[tuple, PaymentProvider] = {}
+        total = 0
+        pages = self.subscription_repository.iter_upcoming_renewals(
+            now, target_date, batch_size=batch_size, shard_key_range=shard_key_range, route_stale_before=route_stale_before
+        )
+        for page in pages:
+            routes = [
+                PrecalculatedRouteCreate(
+                    subscription_id=sub.id,
+                    provider=self._renewal_route(sub, decisions),
+                    routing_decision=routing_decision,
+                    expires_at=sub.next_renewal_at + timedelta(hours=24) # Valid until slightly after renewal
+                )
+                for sub in page
+            ]
+            total += self.precalculated_route_repository.save_many(routes)
+            if heartbeat is not None and not heartbeat():
+                print(f"Pre-calculation stopped after {total} renewals: heartbeat failed.")
+                return total
+
+        print(f"Pre-calculated routes for {total} upcoming renewals ({len(decisions)} distinct routing contexts).")
+        return total
 
-        for sub in upcoming_subscriptions:
-            # Create a PaymentCreate object for the routing service
+    def _renewal_route(self, sub: Subscription, decisions: Dict[tuple, PaymentProvider]) -> PaymentProvider:
+        # Routing only depends on these fields; plans share a handful of price points
+        key = (sub.merchant_id, sub.currency, sub.amount)
+        provider = decisions.get(key)
+        if provider is None:
             payment_in = PaymentCreate(
                 merchant_id=sub.merchant_id,
                 customer_id=sub.customer_id,
@@ -290,16 +448,6 @@ class PreprocessingService:
                 currency=sub.currency,
                 description=f"Pre-calculation for renewal of sub {sub.id}"
             )
-            
-            # Determine the best provider
-            best_provider = self.routing_service.find_best_route(payment_in)
-            
-            # Persist the decision
-            route_in = PrecalculatedRouteCreate(
-                subscription_id=sub.id,
-                provider=best_provider,
-                routing_decision=f"Pre-calculated via {self.routing_service.strategy.__class__.__name__} at {now.isoformat()}",
-                expires_at=sub.next_renewal_at + timedelta(hours=24) # Valid until slightly after renewal
-            )
-            self.precalculated_route_repository.save(route_in)
-            print(f"Pre-calculated route for subscription {sub.id}: {best_provider.value}")
+            provider = self.routing_service.find_best_route(payment_in)
+            decisions[key] = provider
+        return provider
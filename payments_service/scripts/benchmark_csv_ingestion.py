@@ -0,0 +1,93 @@
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from payments_service.app.routing.ingestion.parsers import StripeCsvParser
+from payments_service.app.routing.ingestion.csv_provider import CsvExportDataProvider
+from payments_service.app.routing.ingestion.service import DataIngestor
+from payments_service.app.routing.ingestion.parallel import ParallelIngestionRunner
+from payments_service.app.routing.decisioning.repository import RoutingPerformanceRepository
+from payments_service.app.routing.decisioning.strategies import StaticAggregationStrategy
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+
+HEADER = ["id", "amount", "currency", "fee", "net", "type", "created", "card_brand", "card_country", "status"]
+
+def generate_stripe_export(path: str, rows: int):
+    brands = ["Visa", "Mastercard", "Amex", "Discover"]
+    countries = ["US", "US", "US", "GB", "DE"]
+    start = datetime(2026, 1, 1)
+    with open(path, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            amount = round(random.uniform(5, 500), 2)
+            writer.writerow([
+                f"bt_{i}", f"{amount:.2f}", "usd", f"{amount * 0.029 + 0.3:.2f}", f"{amount * 0.971 - 0.3:.2f}",
+                "charge", (start + timedelta(seconds=i // 10)).strftime("%Y-%m-%d %H:%M:%S"),
+                random.choice(brands), random.choice(countries),
+                "available" if random.random() < 0.92 else "pending"
+            ])
+
+class RowByRowProvider:
+    """
+    The original path: DictReader + parse() per row into a fully materialized list.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.parser = StripeCsvParser()
+
+    def iter_data(self):
+        with open(self.path, mode='r', encoding='utf-8') as f:
+            return [self.parser.parse(row) for row in csv.DictReader(f)]
+
+def run(label: str, provider, rows: int):
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    ingestor = DataIngestor(repo, StaticAggregationStrategy())
+    started = time.perf_counter()
+    ingestor.ingest_from_provider(provider)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f}s  {rows / elapsed:>12,.0f} rows/sec  ({len(repo.get_all())} dimensions)")
+
+def run_parallel(jobs, rows: int, workers: int, chunk_size: int):
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    runner = ParallelIngestionRunner(repo, StaticAggregationStrategy(), max_workers=workers, chunk_size=chunk_size)
+    started = time.perf_counter()
+    runner.ingest_files(jobs)
+    elapsed = time.perf_counter() - started
+    print(f"{f'parallel ({workers} workers)':<28} {elapsed:8.2f}s  {rows / elapsed:>12,.0f} rows/sec  ({len(repo.get_all())} dimensions)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark processor export ingestion throughput.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-size", type=int, default=5_000)
+    parser.add_argument("--skip-row-by-row", action="store_true", help="Only run the streaming path")
+    parser.add_argument("--files", type=int, default=1, help="Split the rows over this many exports and ingest them in parallel")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.files > 1:
+            per_file = args.rows // args.files
+            print(f"Generating {args.files} Stripe exports of {per_file:,} rows...")
+            jobs = []
+            for i in range(args.files):
+                path = os.path.join(tmp, f"stripe_export_{i}.csv")
+                generate_stripe_export(path, per_file)
+                jobs.append((path, StripeCsvParser()))
+            for workers in sorted({1, args.workers}):
+                run_parallel(jobs, per_file * args.files, workers, args.chunk_size)
+            return
+
+        path = os.path.join(tmp, "stripe_export.csv")
+        print(f"Generating {args.rows:,} row Stripe export...")
+        generate_stripe_export(path, args.rows)
+
+        if not args.skip_row_by_row:
+            run("row-by-row (DictReader)", RowByRowProvider(path), args.rows)
+        run(f"streaming (chunk={args.chunk_size:,})", CsvExportDataProvider(path, StripeCsvParser(), args.chunk_size), args.rows)
+
+if __name__ == "__main__":
+    main()
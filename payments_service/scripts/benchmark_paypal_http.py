@@ -0,0 +1,85 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+import httpx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from payments_service.app.processors.adapters.paypal_adapter import PayPalProcessor
+from payments_service.app.processors.models import InternalChargeRequest
+
+class PayPalStubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal local stand-in for the PayPal token, order and capture endpoints.
+    """
+    protocol_version = "HTTP/1.1" # keep-alive
+    disable_nagle_algorithm = True # headers and body are separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/v1/oauth2/token":
+            body = {"access_token": "tok", "expires_in": 3600}
+        elif self.path.endswith("/capture"):
+            body = {"purchase_units": [{"payments": {"captures": [{"id": "cap_1"}]}}]}
+        else:
+            body = {"id": "order_1", "status": "CREATED"}
+        payload = json.dumps(body).encode()
+        self.send_response(200 if self.path == "/v1/oauth2/token" else 201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class PerCallClientPayPalProcessor(PayPalProcessor):
+    """
+    The previous behaviour: a fresh httpx.Client (and connection) for every request.
+    """
+    def _fetch_token(self):
+        with httpx.Client() as client:
+            resp = client.post(f"{self.base_url}/v1/oauth2/token", **self._token_request_kwargs())
+            resp.raise_for_status()
+            data = resp.json()
+            return data["access_token"], data["expires_in"]
+
+    def _request(self, method, path, json_data=None, headers=None):
+        token = self._get_access_token()
+        with httpx.Client() as client:
+            return client.request(method, f"{self.base_url}{path}", headers=self._request_headers(token, headers), json=json_data)
+
+def measure(label: str, processor: PayPalProcessor, charges: int):
+    request = InternalChargeRequest(amount=10.0, currency="USD", merchant_id="m1", customer_id="c1", payment_method_token="tok")
+    processor.process_charge(request) # warm-up (token fetch)
+    latencies = []
+    for _ in range(charges):
+        started = time.perf_counter()
+        processor.process_charge(request)
+        latencies.append((time.perf_counter() - started) * 1000)
+    processor.close()
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<22} p50 {statistics.median(latencies):6.2f}ms  p95 {p95:6.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call vs pooled HTTP clients for PayPal charges.")
+    parser.add_argument("--charges", type=int, default=300)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PayPalStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        print(f"{args.charges} charges (create order + capture) against a local stub at {base_url}")
+        for label, cls in (("per-call client", PerCallClientPayPalProcessor), ("pooled client", PayPalProcessor)):
+            processor = cls(client_id="id", secret="secret")
+            processor.base_url = base_url
+            measure(label, processor, args.charges)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
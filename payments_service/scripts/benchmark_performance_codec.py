@@ -0,0 +1,69 @@
+import json
+import time
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.core.repositories.codecs import JsonRecordCodec
+from payments_service.app.routing.decisioning.codec import BinaryPerformanceCodec
+from payments_service.app.routing.decisioning.models import (
+    ProviderPerformance, RoutingDimension, PerformanceMetrics, CostStructure
+)
+
+ITERATIONS = 20_000
+REPEATS = 5
+
+def build_dimension_records():
+    dimension = RoutingDimension(
+        payment_method_type="credit_card", network="visa", card_type="credit", currency="USD", mcc="5411"
+    )
+    return [
+        ProviderPerformance(
+            provider=provider,
+            dimension=dimension,
+            metrics=PerformanceMetrics(
+                auth_rate=0.9 + i / 100, fraud_rate=0.01, avg_latency_ms=180 + i * 20,
+                cost_structure=CostStructure(variable_fee_percent=2.9 - i / 10, fixed_fee=0.30)
+            )
+        )
+        for i, provider in enumerate([PaymentProvider.STRIPE, PaymentProvider.ADYEN, PaymentProvider.BRAINTREE, PaymentProvider.PAYPAL])
+    ]
+
+def time_per_dimension(fn) -> float:
+    # Best of several runs to keep scheduler noise out of the comparison
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / ITERATIONS * 1e6
+
+def main():
+    records = build_dimension_records()
+
+    # Original layout: one JSON string per dimension, json.loads + model_validate per record
+    legacy_blob = json.dumps([r.model_dump() for r in records])
+    legacy_us = time_per_dimension(
+        lambda: [ProviderPerformance.model_validate(v) for v in json.loads(legacy_blob)]
+    )
+
+    results = [("legacy JSON list", len(legacy_blob), legacy_us)]
+    for label, codec in (("JSON hash fields", JsonRecordCodec(ProviderPerformance)), ("binary v1 hash fields", BinaryPerformanceCodec())):
+        encoded = [codec.encode(r) for r in records]
+        assert [codec.decode(e) for e in encoded] == records
+        size = sum(len(e) for e in encoded)
+        results.append((label, size, time_per_dimension(lambda: [codec.decode(e) for e in encoded])))
+
+    # Values change on every read: no memoized records, only shared dimensions
+    binary = BinaryPerformanceCodec()
+    encoded = [binary.encode(r) for r in records]
+    results.append((
+        "binary v1 (cold)", sum(len(e) for e in encoded),
+        time_per_dimension(lambda: [binary._decode_binary(e) for e in encoded])
+    ))
+
+    print(f"Decoding one dimension with {len(records)} providers (best of {REPEATS} x {ITERATIONS:,})")
+    print(f"{'format':<24} {'bytes':>7} {'decode us':>10}")
+    for label, size, decode_us in results:
+        print(f"{label:<24} {size:>7} {decode_us:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from payments_service.app.core.repositories.database import create_db_engine
+from payments_service.app.core.repositories.migrations import migrate, partition_payments, schema_migrations
+from payments_service.app.core.repositories.models import Base, PaymentORM, SubscriptionORM, PrecalculatedRouteORM
+from payments_service.app.core.utils.datetime_utils import now_utc
+
+# Seeded rows relative to --rows payments
+SUBSCRIPTIONS_PER_PAYMENT = 1 / 5
+ROUTES_PER_PAYMENT = 1 / 20
+MERCHANTS = 1000
+RUNS = 7
+
+QUERIES = [
+    ("renewal page (7d, 1000 rows)",
+     "SELECT id FROM subscriptions WHERE status = 'active' AND next_renewal_at >= :now AND next_renewal_at <= :week "
+     "ORDER BY next_renewal_at, id LIMIT 1000"),
+    ("expired routes (sweep)",
+     "SELECT count(*) FROM precalculated_routes WHERE expires_at < :month_ago"),
+    ("merchant listing (latest 50)",
+     "SELECT * FROM payments WHERE merchant_id = 'merchant_42' ORDER BY created_at DESC LIMIT 50"),
+    ("customer history (latest 50)",
+     "SELECT * FROM payments WHERE customer_id = 'cust_4242' ORDER BY created_at DESC LIMIT 50"),
+    ("merchant volume (last 24h)",
+     "SELECT count(*), sum(amount) FROM payments WHERE merchant_id = 'merchant_42' AND created_at >= :day_ago"),
+]
+
+def reset_schema(engine: Engine):
+    """
+    Recreates the tables as they were before migration 2: no secondary
+    indexes, payments not partitioned.
+    """
+    Base.metadata.drop_all(bind=engine)
+    schema_migrations.drop(bind=engine, checkfirst=True)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in (PaymentORM.__table__, SubscriptionORM.__table__, PrecalculatedRouteORM.__table__):
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+def seed_postgres(engine: Engine, rows: int):
+    # Generated server-side; 10M rows take minutes rather than hours
+    params = {"rows": rows, "subs": int(rows * SUBSCRIPTIONS_PER_PAYMENT), "routes": int(rows * ROUTES_PER_PAYMENT), "merchants": MERCHANTS}
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO payments (id, merchant_id, customer_id, amount, currency, provider, status, created_at, updated_at)
+            SELECT 'pay_' || i, 'merchant_' || (i % :merchants), 'cust_' || (i % (:rows / 10)), (i % 500) + 0.99, 'USD',
+                   'stripe', 'succeeded', now() - (i % 31536000) * interval '1 second', now()
+            FROM generate_series(1, :rows) AS i
+        """), params)
+        conn.execute(text("""
+            INSERT INTO subscriptions (id, customer_id, merchant_id, amount, currency, next_renewal_at, status, created_at, updated_at)
+            SELECT 'sub_' || i, 'cust_' || i, 'merchant_' || (i % :merchants), 9.99, 'USD',
+                   now() + ((i * 7919) % 31536000) * interval '1 second',
+                   CASE WHEN i % 10 = 0 THEN 'cancelled' ELSE 'active' END, now(), now()
+            FROM generate_series(1, :subs) AS i
+        """), params)
+        conn.execute(text("""
+            INSERT INTO precalculated_routes (subscription_id, provider, routing_decision, expires_at, created_at)
+            SELECT 'sub_' || i, 'stripe', 'benchmark', now() + ((i * 7919) % 5184000 - 2592000) * interval '1 second', now()
+            FROM generate_series(1, :routes) AS i
+        """), params)
+
+def seed_batched(engine: Engine, rows: int, batch_size: int = 50_000):
+    now = now_utc()
+    customers = max(rows // 10, 1)
+
+    def insert(table, count, make_row):
+        for start in range(1, count + 1, batch_size):
+            with engine.begin() as conn:
+                conn.execute(table.insert(), [make_row(i) for i in range(start, min(start + batch_size, count + 1))])
+
+    insert(PaymentORM.__table__, rows, lambda i: {
+        "id": f"pay_{i}", "merchant_id": f"merchant_{i % MERCHANTS}", "customer_id": f"cust_{i % customers}",
+        "amount": i % 500 + 0.99, "currency": "USD", "provider": "stripe", "status": "succeeded",
+        "created_at": now - timedelta(seconds=i % 31536000), "updated_at": now
+    })
+    insert(SubscriptionORM.__table__, int(rows * SUBSCRIPTIONS_PER_PAYMENT), lambda i: {
+        "id": f"sub_{i}", "customer_id": f"cust_{i}", "merchant_id": f"merchant_{i % MERCHANTS}", "amount": 9.99,
+        "currency": "USD", "next_renewal_at": now + timedelta(seconds=(i * 7919) % 31536000),
+        "status": "cancelled" if i % 10 == 0 else "active", "created_at": now, "updated_at": now
+    })
+    insert(PrecalculatedRouteORM.__table__, int(rows * ROUTES_PER_PAYMENT), lambda i: {
+        "subscription_id": f"sub_{i}", "provider": "stripe", "routing_decision": "benchmark",
+        "expires_at": now + timedelta(seconds=(i * 7919) % 5184000 - 2592000), "created_at": now
+    })
+
+def analyze(engine: Engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+def measure(engine: Engine) -> dict:
+    now = now_utc()
+    params = {
+        "now": now,
+        "week": now + timedelta(days=7),
+        "day_ago": now - timedelta(days=1),
+        "month_ago": now - timedelta(days=29)
+    }
+    results = {}
+    with engine.connect() as conn:
+        for label, sql in QUERIES:
+            statement = text(sql)
+            conn.execute(statement, params).fetchall() # warm the cache
+            timings = []
+            for _ in range(RUNS):
+                started = time.perf_counter()
+                conn.execute(statement, params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(timings)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency before and after the index/partitioning migrations")
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"),
+                        help="A scratch database; its tables are dropped. Defaults to a temporary SQLite file")
+    parser.add_argument("--rows", type=int, default=None, help="Payments to seed (default 10M on PostgreSQL, 1M otherwise)")
+    args = parser.parse_args()
+
+    tmp = None
+    database_url = args.database_url
+    if database_url is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        database_url = f"sqlite:///{tmp.name}"
+    engine = create_db_engine(database_url)
+    postgres = engine.dialect.name == "postgresql"
+    rows = args.rows or (10_000_000 if postgres else 1_000_000)
+
+    reset_schema(engine)
+    print(f"Seeding {rows:,} payments, {int(rows * SUBSCRIPTIONS_PER_PAYMENT):,} subscriptions and "
+          f"{int(rows * ROUTES_PER_PAYMENT):,} routes into {engine.dialect.name}...")
+    started = time.perf_counter()
+    seed_postgres(engine, rows) if postgres else seed_batched(engine, rows)
+    analyze(engine)
+    print(f"Seeded in {time.perf_counter() - started:.0f}s")
+
+    before = measure(engine)
+    started = time.perf_counter()
+    migrate(engine)
+    if postgres:
+        partition_payments(engine)
+    analyze(engine)
+    print(f"Migrated in {time.perf_counter() - started:.0f}s")
+    after = measure(engine)
+
+    print(f"\n{'query':<32} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label, _ in QUERIES:
+        print(f"{label:<32} {before[label]:>10.2f} {after[label]:>10.2f} {before[label] / max(after[label], 1e-6):>7.0f}x")
+
+    engine.dispose()
+    if tmp is not None:
+        os.unlink(tmp.name)
+
+if __name__ == "__main__":
+    main()
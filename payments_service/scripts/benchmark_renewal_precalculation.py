@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+from sqlalchemy import insert
+from payments_service.app.core.models.payment import PaymentCreate
+from payments_service.app.core.models.precalculated_route import PrecalculatedRouteCreate
+from payments_service.app.core.repositories.database import create_db_engine, create_session_factory
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.app.core.repositories.models import Base, SubscriptionORM, PrecalculatedRouteORM
+from payments_service.app.core.repositories.subscription_repository import SubscriptionRepository
+from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.utils.datetime_utils import now_utc
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository
+from payments_service.app.routing.preprocessing import RoutingService, PreprocessingService, FeeService
+
+PRICE_POINTS = [4.99, 9.99, 19.99, 49.99, 99.0]
+
+def seed(session_factory, count: int):
+    now = now_utc()
+    rows = [
+        {
+            "id": f"sub_{i:08d}",
+            "customer_id": f"cust_{i}",
+            "merchant_id": f"merchant_{i % 20}",
+            "amount": random.choice(PRICE_POINTS),
+            "currency": random.choice(["USD", "EUR"]),
+            "next_renewal_at": now + timedelta(hours=random.randint(1, 6 * 24)),
+            "status": "active"
+        }
+        for i in range(count)
+    ]
+    with session_factory() as db:
+        db.execute(insert(SubscriptionORM), rows)
+        db.commit()
+
+def clear_routes(session_factory):
+    with session_factory() as db:
+        db.query(PrecalculatedRouteORM).delete()
+        db.commit()
+
+def run_legacy(service: PreprocessingService):
+    """
+    The original loop: one query for everything, then route + save per subscription.
+    """
+    now = now_utc()
+    subs = service.subscription_repository.find_upcoming_renewals(now, now + timedelta(days=7))
+    for sub in subs:
+        payment_in = PaymentCreate(
+            merchant_id=sub.merchant_id, customer_id=sub.customer_id, amount=sub.amount, currency=sub.currency
+        )
+        provider = service.routing_service.find_best_route(payment_in)
+        service.precalculated_route_repository.save(PrecalculatedRouteCreate(
+            subscription_id=sub.id, provider=provider, routing_decision="legacy",
+            expires_at=sub.next_renewal_at + timedelta(hours=24)
+        ))
+    return len(subs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Renewal pre-calculation throughput")
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    tmp = None
+    database_url = args.database_url
+    if database_url is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        database_url = f"sqlite:///{tmp.name}"
+    engine = create_db_engine(database_url)
+    Base.metadata.drop_all(bind=engine, tables=[SubscriptionORM.__table__, PrecalculatedRouteORM.__table__])
+    Base.metadata.create_all(bind=engine)
+    session_factory = create_session_factory(engine)
+
+    performance_repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    service = PreprocessingService(
+        performance_repository=performance_repo,
+        subscription_repository=SubscriptionRepository(session_factory),
+        precalculated_route_repository=PrecalculatedRouteRepository(session_factory),
+        routing_service=RoutingService(FeeService(), performance_repo)
+    )
+
+    print(f"Seeding {args.count:,} subscriptions into {engine.dialect.name}...")
+    seed(session_factory, args.count)
+
+    results = []
+    if not args.skip_legacy:
+        started = time.perf_counter()
+        written = run_legacy(service)
+        results.append(("per-subscription save", written, time.perf_counter() - started))
+        clear_routes(session_factory)
+
+    started = time.perf_counter()
+    written = service.precalculate_upcoming_renewals(lookahead_days=7, batch_size=args.batch_size)
+    results.append((f"batched (batch={args.batch_size})", written, time.perf_counter() - started))
+
+    print(f"{'pipeline':<28} {'renewals':>9} {'seconds':>8} {'renewals/s':>11}")
+    for label, written, elapsed in results:
+        print(f"{label:<28} {written:>9,} {elapsed:>8.2f} {written / elapsed:>11,.0f}")
+
+    engine.dispose()
+    if tmp is not None:
+        os.unlink(tmp.name)
+
+if __name__ == "__main__":
+    main()
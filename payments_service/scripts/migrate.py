@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import redis
+from payments_service.app.core.repositories.database import create_db_engine
+from payments_service.app.core.repositories.migrations import (
+    MIGRATIONS, applied_versions, migrate, migrate_routing_performance_keys, partition_payments, partition_precalculated_routes
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations to DATABASE_URL")
+    parser.add_argument("--status", action="store_true", help="List migrations and whether they are applied")
+    parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    parser.add_argument("--partition-payments", action="store_true",
+                        help="Partition payments by month of created_at (PostgreSQL); locks payments while rows are copied")
+    parser.add_argument("--partition-routes", action="store_true",
+                        help="Partition precalculated_routes by day of expiry (PostgreSQL), for PRECALC_ROUTE_RETENTION=partition")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("Error: DATABASE_URL not set.")
+        sys.exit(1)
+    engine = create_db_engine(database_url)
+
+    if args.status:
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            print(f"{'[x]' if migration.version in done else '[ ]'} {migration.version:>3}  {migration.description}")
+    else:
+        applied = migrate(engine, target=args.target)
+        print(f"Applied {len(applied)} migration(s): {applied}" if applied else "Schema is up to date.")
+        if args.partition_payments:
+            partition_payments(engine)
+        if args.partition_routes:
+            partition_precalculated_routes(engine)
+        if os.getenv("REDIS_URL"):
+            migrate_routing_performance_keys(redis.from_url(os.getenv("REDIS_URL")))
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
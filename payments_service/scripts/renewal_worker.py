@@ -3,20 +3,24 @@ import os
 import signal
 import sys
 from datetime import datetime, timezone
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 from payments_service.app.core.repositories.subscription_repository import SubscriptionRepository
 from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.repositories.renewal_lease_repository import RenewalLeaseRepository
+from payments_service.app.core.services.route_sweeper import PrecalculatedRouteSweeper
+from payments_service.app.core.repositories.database import create_db_engine, create_session_factory
 from payments_service.app.routing.decisioning.repository import RoutingPerformanceRepository
 from payments_service.app.routing.preprocessing.service import PreprocessingService, FeeService
-from payments_service.app.core.api.dependencies import _initialize_strategy, intelligence_store
-from payments_service.app.routing.preprocessing import RoutingService
+from payments_service.app.core.api.dependencies import _initialize_strategy, intelligence_store, provider_health_cache, precalc_route_cache
+from payments_service.app.routing.preprocessing import RoutingService, ShardedRenewalRunner
 
 # Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
 RENEWAL_CHECK_INTERVAL_SECONDS = int(os.getenv("RENEWAL_CHECK_INTERVAL_SECONDS", "60"))
 RENEWAL_LOOKAHEAD_DAYS = int(os.getenv("RENEWAL_LOOKAHEAD_DAYS", "7"))
+# "sharded" (default): workers lease shards and only refresh new or stale routes,
+# so any number of them can run side by side. "single": rescan the whole window.
+RENEWAL_WORKER_MODE = os.getenv("RENEWAL_WORKER_MODE", "sharded")
 
 class RenewalWorker:
     def __init__(self):
@@ -24,13 +28,13 @@ class RenewalWorker:
             print("Error: DATABASE_URL not set.")
             sys.exit(1)
         
-        engine = create_engine(DATABASE_URL)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        self.db = SessionLocal()
+        self.engine = create_db_engine(DATABASE_URL)
+        SessionLocal = create_session_factory(self.engine)
         
         # Initialize Repositories
-        sub_repo = SubscriptionRepository(self.db)
-        precalc_repo = PrecalculatedRouteRepository(self.db)
+        sub_repo = SubscriptionRepository(SessionLocal)
+        # Writing through a shared (Redis) cache warms it for the API nodes ahead of the renewal date
+        precalc_repo = PrecalculatedRouteRepository(SessionLocal, cache=precalc_route_cache if precalc_route_cache.shared else None)
         perf_repo = RoutingPerformanceRepository(intelligence_store)
         
         # Initialize Services
@@ -38,15 +42,20 @@ class RenewalWorker:
         routing_svc = RoutingService(
             fee_service=FeeService(),
             performance_repository=perf_repo,
-            strategy=routing_strategy
+            strategy=routing_strategy,
+            health_cache=provider_health_cache
         )
         
         self.preprocessing_service = PreprocessingService(
             performance_repository=perf_repo,
             subscription_repository=sub_repo,
             precalculated_route_repository=precalc_repo,
-            routing_service=routing_svc
+            routing_service=routing_svc,
+            health_cache=provider_health_cache
         )
+        self.runner = ShardedRenewalRunner.from_env(self.preprocessing_service, RenewalLeaseRepository(SessionLocal))
+        # Expired routes are removed in throttled chunks (or whole partitions) alongside the cycles
+        self.sweeper = PrecalculatedRouteSweeper.from_env(precalc_repo, self.engine)
         
         self.running = True
         signal.signal(signal.SIGINT, self.stop)
@@ -55,13 +64,20 @@ class RenewalWorker:
     def stop(self, signum, frame):
         print("Stopping worker...")
         self.running = False
+        self.runner.stop()
 
     def run(self):
-        print(f"Starting Renewal Preprocessing Worker (Every {RENEWAL_CHECK_INTERVAL_SECONDS}s, Lookahead: {RENEWAL_LOOKAHEAD_DAYS} days)")
+        self.sweeper.start()
+        print(f"Starting Renewal Preprocessing Worker (Every {RENEWAL_CHECK_INTERVAL_SECONDS}s, Lookahead: {RENEWAL_LOOKAHEAD_DAYS} days, Mode: {RENEWAL_WORKER_MODE})")
+        if RENEWAL_WORKER_MODE == "sharded":
+            print(f"Worker {self.runner.owner} sharing {self.runner.shard_count} shards")
         while self.running:
             try:
                 print(f"[{datetime.now(timezone.utc).isoformat()}] Running pre-calculation cycle...")
-                self.preprocessing_service.precalculate_upcoming_renewals(lookahead_days=RENEWAL_LOOKAHEAD_DAYS)
+                if RENEWAL_WORKER_MODE == "sharded":
+                    self.runner.run_cycle()
+                else:
+                    self.preprocessing_service.precalculate_upcoming_renewals(lookahead_days=RENEWAL_LOOKAHEAD_DAYS)
             except Exception as e:
                 print(f"Error in pre-calculation cycle: {e}")
             
@@ -71,7 +87,9 @@ class RenewalWorker:
                     break
                 time.sleep(1)
         
-        self.db.close()
+        self.sweeper.stop()
+        print(f"Route sweeper: {self.sweeper.stats()}")
+        self.engine.dispose()
         print("Worker stopped.")
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ import random
 import time
 import json
 import redis
+import threading
+import uuid
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
@@ -30,6 +32,46 @@ from payments_service.app.routing.preprocessing.service import RoutingService, F
 from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
 from payments_service.app.routing.ingestion.data_generator import DataGenerator
 from payments_service.app.routing.ingestion.service import DataIngestor
+from payments_service.app.core.models.merchant import Merchant
+from payments_service.app.core.models.customer import Customer
+from payments_service.app.core.repositories.datastore import InMemoryRelationalStore
+from payments_service.app.core.repositories.merchant_repository import MerchantRepository
+from payments_service.app.core.repositories.customer_repository import CustomerRepository
+from payments_service.app.core.repositories.payment_repository import PaymentRepository
+from payments_service.app.core.services.payment_service import PaymentService
+from payments_service.app.core.services.hedging import HedgingPolicy
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.processors.models import InternalChargeResponse, ProcessorStatus
+
+class SimulatedLatencyProcessor(PaymentProcessor):
+    """
+    Mock processor with a long-tailed latency: mostly close to its average,
+    with occasional stalls several times slower.
+    """
+    def __init__(self, name: str, avg_latency_ms: float, stall_rate: float = 0.05, stall_factor: float = 8.0):
+        self.name = name
+        self.avg_latency_ms = avg_latency_ms
+        self.stall_rate = stall_rate
+        self.stall_factor = stall_factor
+        self.refunds = 0
+        self._lock = threading.Lock()
+
+    def process_charge(self, request):
+        latency = random.lognormvariate(0, 0.25) * self.avg_latency_ms * 0.8
+        if random.random() < self.stall_rate:
+            latency *= self.stall_factor
+        time.sleep(latency / 1000)
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS, processor_transaction_id=f"{self.name}_{uuid.uuid4().hex[:12]}")
+
+    def refund(self, processor_transaction_id, amount):
+        with self._lock:
+            self.refunds += 1
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
+
+    @property
+    def provider_name(self) -> str:
+        return self.name
 
 class StressSimulator:
     def __init__(self, use_llm: bool = False, concurrency: int = 5):
@@ -67,7 +109,7 @@ class StressSimulator:
             def fetch_data(self): return records
             
         ingestor.ingest_from_provider(MockDataProvider())
-        print(f"Seeded {len(self.repo.get_all())} performance records.")
+        print(f"Seeded {sum(1 for _ in self.repo.iter_all())} performance records.")
 
     def simulate_outage(self, provider: PaymentProvider, duration_sec: int):
         """Sets a provider to 'down' in Redis for a specific duration."""
@@ -121,6 +163,70 @@ class StressSimulator:
         with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
             executor.map(self.run_transaction, range(count))
 
+    def run_hedge_comparison(self, count: int):
+        """
+        Runs the same charge load through PaymentService with and without hedged
+        authorizations against simulated long-tailed processors, and reports the
+        tail-latency difference.
+        """
+        sample = PaymentCreate(merchant_id="m_hedge", customer_id="c_hedge", amount=50.0, currency="USD")
+        registry = ProcessorRegistry()
+        for resolved in self.routing_service.resolve_providers(sample):
+            registry.register(resolved.provider, SimulatedLatencyProcessor(resolved.provider.value, resolved.avg_latency_ms))
+
+        merchant_repo = MerchantRepository(InMemoryRelationalStore())
+        customer_repo = CustomerRepository(InMemoryRelationalStore())
+        merchant_repo.save(Merchant(
+            id="m_hedge", name="Hedged Merchant", email="m@example.com", mcc="5411",
+            country="US", currency="USD", tax_id="TAX123"
+        ))
+        customer_repo.save(Customer(id="c_hedge", merchant_id="m_hedge", email="c@example.com", payment_method_token="tok_visa"))
+
+        def build(policy):
+            return PaymentService(
+                payment_repo=PaymentRepository(InMemoryRelationalStore()),
+                merchant_repo=merchant_repo,
+                customer_repo=customer_repo,
+                routing_service=self.routing_service,
+                processor_registry=registry,
+                hedging_policy=policy
+            )
+
+        reports = []
+        for label, service in (("single provider", build(None)), ("hedged", build(HedgingPolicy(merchant_ids=["m_hedge"])))):
+            print(f"Executing {count} charges ({label}) with concurrency {self.concurrency}...")
+
+            def timed_charge(_):
+                started = time.perf_counter()
+                service.create_charge(sample.model_copy())
+                return (time.perf_counter() - started) * 1000
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                latencies = sorted(executor.map(timed_charge, range(count)))
+            reports.append((label, latencies))
+            if service.hedged_executor:
+                service.hedged_executor.close(wait=True)
+                hedge_stats = service.hedged_executor.stats()
+
+        def percentile(values, pct):
+            return values[min(int(len(values) * pct), len(values) - 1)]
+
+        print("\n" + "="*40)
+        print("HEDGED AUTHORIZATION REPORT")
+        print("="*40)
+        print(f"{'mode':<16} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for label, latencies in reports:
+            print(
+                f"{label:<16} {percentile(latencies, 0.5):7.0f}ms {percentile(latencies, 0.95):7.0f}ms "
+                f"{percentile(latencies, 0.99):7.0f}ms {latencies[-1]:7.0f}ms"
+            )
+        (_, baseline), (_, hedged) = reports
+        print(f"\np95 improvement: {percentile(baseline, 0.95) - percentile(hedged, 0.95):.0f}ms")
+        print(f"p99 improvement: {percentile(baseline, 0.99) - percentile(hedged, 0.99):.0f}ms")
+        print(f"Hedges issued: {hedge_stats['hedges_issued']}/{hedge_stats['charges']} (backup won {hedge_stats['backup_wins']})")
+        print(f"Losing charges voided: {hedge_stats['losers_voided']} (failed voids: {hedge_stats['void_failures']}, needs reconciliation: {hedge_stats['needs_reconciliation']})")
+        print("="*40)
+
     def print_report(self):
         """Prints a summary of the stress test results."""
         successes = [r for r in self.results if r["status"] == "success"]
@@ -157,6 +263,7 @@ if __name__ == "__main__":
     parser.add_argument("--fail-llm", action="store_true", help="Simulate a failure in the LLM service.")
     parser.add_argument("--burst", type=int, default=10, help="Number of transactions in the burst.")
     parser.add_argument("--outage", action="store_true", help="Simulate a provider outage during the test.")
+    parser.add_argument("--hedge", action="store_true", help="Compare charge tail latency with and without hedged authorizations.")
     
     args = parser.parse_args()
 
@@ -175,7 +282,9 @@ if __name__ == "__main__":
     sim = StressSimulator(use_llm=args.llm, concurrency=5)
     sim.seed_initial_data()
     
-    if args.outage:
+    if args.hedge:
+        sim.run_hedge_comparison(args.burst)
+    elif args.outage:
         # Run a small burst, kill a provider, run another burst
         sim.execute_burst(5)
         # Start outage in background or just wait? Let's just do it sequentially for clarity in this script
@@ -183,5 +292,6 @@ if __name__ == "__main__":
         sim.execute_burst(args.burst)
     else:
         sim.execute_burst(args.burst)
-        
-    sim.print_report()
+
+    if not args.hedge:
+        sim.print_report()
@@ -38,21 +38,7 @@ def test_enhanced_agentic_routing_flow(mock_aisuite_client):
         "routing_advice": "Prioritize Adyen for domestic debit."
     })))]
     
-    # Mock Health Sentinel
-    mock_health_resp = MagicMock()
-    mock_health_resp.choices = [MagicMock(message=MagicMock(content=json.dumps({
-        "analysis": "Adyen is reported as DOWN in Redis.",
-        "unhealthy_providers": ["adyen"],
-        "critical_alerts": ["ADYEN_DOWN"]
-    })))]
-    
-    # Mock Cost Analyst
-    mock_cost_resp = MagicMock()
-    mock_cost_resp.choices = [MagicMock(message=MagicMock(content=json.dumps({
-        "analysis": "Adyen is $0.05, Stripe is $0.10. Adyen is cheaper.",
-        "recommended_provider": "adyen",
-        "confidence": 0.9
-    })))]
+    # HealthSentinel and CostAnalyst are computed locally, without model calls
     
     # Mock Supervisor (Synthesis)
     mock_supervisor_resp = MagicMock()
@@ -73,10 +59,8 @@ def test_enhanced_agentic_routing_flow(mock_aisuite_client):
     mock_client_instance.chat.completions.create.side_effect = [
         mock_plan_resp,       # 1. Planner
         mock_network_resp,    # 2. Network Intelligence
-        mock_health_resp,     # 3. Health Sentinel
-        mock_cost_resp,       # 4. Cost Analyst
-        mock_supervisor_resp,  # 5. Supervisor Proposal
-        mock_critic_resp      # 6. Critic Review
+        mock_supervisor_resp,  # 3. Supervisor Proposal
+        mock_critic_resp      # 4. Critic Review
     ]
     
     # 2. Setup Test Data
@@ -96,7 +80,7 @@ def test_enhanced_agentic_routing_flow(mock_aisuite_client):
     
     # 4. Assertions
     assert best_provider == PaymentProvider.STRIPE # Critic override worked
-    assert mock_client_instance.chat.completions.create.call_count == 6
+    assert mock_client_instance.chat.completions.create.call_count == 4
     print("Enhanced Agentic Routing flow verified!")
 
 if __name__ == "__main__":
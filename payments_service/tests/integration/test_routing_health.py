@@ -43,7 +43,7 @@ def test_routing_respects_health():
     mock_bin_repo.find_by_bin.return_value = None # Use defaults
     
     # 3. Simulate SCENARIO: Adyen is CHEAPER but DOWN
-    mock_redis.get.side_effect = lambda key: b"down" if "adyen" in key else b"up"
+    mock_redis.mget.side_effect = lambda keys: [b"down" if "adyen" in key else b"up" for key in keys]
     
     # 4. Execute
     route = service.preprocess_recurrent_payment(
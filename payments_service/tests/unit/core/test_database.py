@@ -0,0 +1,46 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from payments_service.app.core.repositories.models import Base, MerchantORM
+from payments_service.app.core.repositories.database import create_db_engine, create_session_factory, session_scope
+from payments_service.app.core.repositories.datastore import PostgresRelationalStore
+from payments_service.app.core.models.merchant import Merchant
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File-backed so every pooled connection sees the same database
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'payments.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield create_session_factory(engine)
+    engine.dispose()
+
+def test_session_scope_closes_factory_sessions(session_factory):
+    with session_scope(session_factory) as session:
+        assert session.is_active
+        session.execute(MerchantORM.__table__.select())
+        assert session.in_transaction()
+    assert not session.in_transaction()
+
+def test_session_scope_leaves_bound_session_open(session_factory):
+    bound = session_factory()
+    with session_scope(bound) as session:
+        session.execute(MerchantORM.__table__.select())
+    assert session is bound
+    assert bound.in_transaction()
+    bound.close()
+
+def test_store_is_safe_across_threads(session_factory):
+    store = PostgresRelationalStore(session_factory, MerchantORM, Merchant)
+
+    def onboard(i: int) -> Merchant:
+        merchant = Merchant(
+            id=f"m{i}", name=f"Merchant {i}", email="m@example.com", mcc="5411",
+            country="US", currency="USD", tax_id=f"TAX{i}"
+        )
+        store.save(merchant.id, merchant)
+        return store.find_by_id(merchant.id)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found = list(executor.map(onboard, range(40)))
+
+    assert [m.id for m in found] == [f"m{i}" for i in range(40)]
+    assert len(store.list_all()) == 40
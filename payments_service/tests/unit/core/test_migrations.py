@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, inspect, text
+from payments_service.app.core.repositories.models import Base, SubscriptionORM, subscription_shard_key
+from payments_service.app.core.repositories.migrations import (
+    MIGRATIONS, applied_versions, check_schema_version, migrate, payment_partition_name, _add_months
+)
+
+def index_names(engine, table):
+    return {i["name"] for i in inspect(engine).get_indexes(table)}
+
+def test_fresh_database_is_migrated_once():
+    engine = create_engine("sqlite:///:memory:")
+
+    assert migrate(engine) == [m.version for m in MIGRATIONS]
+    assert migrate(engine) == []
+    assert applied_versions(engine) == {m.version for m in MIGRATIONS}
+    assert "ix_payments_merchant_created" in index_names(engine, "payments")
+
+def test_startup_check_only_reads_the_schema_version():
+    engine = create_engine("sqlite:///:memory:")
+
+    with pytest.raises(RuntimeError, match="migrate.py"):
+        check_schema_version(engine)
+    assert not inspect(engine).has_table("payments")
+
+    migrate(engine)
+    check_schema_version(engine)
+
+def test_existing_tables_get_indexes_used_by_the_renewal_scan():
+    engine = create_engine("sqlite:///:memory:")
+    # Created before the indexes were declared
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_subscriptions_active_renewal"))
+        conn.execute(text("DROP INDEX ix_precalculated_routes_expiry"))
+
+    migrate(engine)
+
+    assert "ix_subscriptions_active_renewal" in index_names(engine, "subscriptions")
+    assert "ix_precalculated_routes_expiry" in index_names(engine, "precalculated_routes")
+    with engine.connect() as conn:
+        plan = " ".join(str(row) for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM subscriptions WHERE status = 'active' "
+            "AND next_renewal_at >= '2026-01-01' AND next_renewal_at <= '2026-01-08' "
+            "ORDER BY next_renewal_at, id LIMIT 1000"
+        )))
+    assert "ix_subscriptions_active_renewal" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_existing_subscriptions_get_shard_keys_backfilled():
+    engine = create_engine("sqlite:///:memory:")
+    # Created before shard_key existed
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_subscriptions_active_renewal"))
+        conn.execute(text("ALTER TABLE subscriptions DROP COLUMN shard_key"))
+        for sub_id in ("sub_1", "sub_2", "0f3c9a2e-1111-4000-8000-000000000000"):
+            conn.execute(text(
+                "INSERT INTO subscriptions (id, customer_id, merchant_id, amount, currency, status, next_renewal_at) "
+                "VALUES (:id, 'c1', 'm1', 9.99, 'USD', 'active', '2026-01-01')"
+            ), {"id": sub_id})
+
+    migrate(engine)
+
+    with engine.connect() as conn:
+        keys = dict(conn.execute(text("SELECT id, shard_key FROM subscriptions")).all())
+    assert keys == {sub_id: subscription_shard_key(sub_id) for sub_id in keys}
+    assert len(keys) == 3
+
+def test_monthly_partition_names_roll_over_years():
+    december = datetime(2026, 12, 1, tzinfo=timezone.utc)
+
+    assert _add_months(december, 1) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert _add_months(december, -12) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert payment_partition_name(_add_months(december, 3)) == "payments_2027_03"
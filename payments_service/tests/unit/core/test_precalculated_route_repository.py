@@ -1,9 +1,12 @@
+import time
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta, timezone
-from payments_service.app.core.repositories.models import Base
+from payments_service.app.core.repositories.models import Base, PrecalculatedRouteORM
+from payments_service.app.core.utils.datetime_utils import normalize_to_utc
 from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.repositories.precalculated_route_cache import PrecalculatedRouteCache
 from payments_service.app.core.models.precalculated_route import PrecalculatedRouteCreate
 from payments_service.app.core.models.payment import PaymentProvider
 
@@ -16,6 +19,45 @@ def db_session():
     yield session
     session.close()
 
+class CountingSessionFactory:
+    """
+    Opens sessions on an in-memory database, counting units of work.
+    """
+    def __init__(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        self.factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self.factory()
+
+class FakeRedis:
+    """
+    GET/SET EXAT/DELETE plus a non-transactional pipeline.
+    """
+    def __init__(self):
+        self.data = {}
+        self.expire_at = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, exat=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.expire_at[key] = exat
+        return self
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
 def test_save_and_find_precalculated_route(db_session):
     repo = PrecalculatedRouteRepository(db_session)
     expiry = datetime.now(timezone.utc) + timedelta(hours=24)
@@ -54,6 +96,17 @@ def test_upsert_precalculated_route(db_session):
     assert found.provider == PaymentProvider.ADYEN
     assert found.routing_decision == "D2"
 
+def test_save_resets_created_at_so_routes_are_not_stale(db_session):
+    repo = PrecalculatedRouteRepository(db_session)
+    expiry = datetime.now(timezone.utc) + timedelta(days=2)
+    first = repo.save(PrecalculatedRouteCreate(subscription_id="sub1", provider=PaymentProvider.STRIPE, routing_decision="D1", expires_at=expiry))
+    db_session.query(PrecalculatedRouteORM).update({"created_at": datetime.now(timezone.utc) - timedelta(days=1)})
+    db_session.commit()
+
+    second = repo.save(PrecalculatedRouteCreate(subscription_id="sub1", provider=PaymentProvider.ADYEN, routing_decision="D2", expires_at=expiry))
+
+    assert normalize_to_utc(second.created_at) >= normalize_to_utc(first.created_at)
+
 def test_delete_expired_routes(db_session):
     repo = PrecalculatedRouteRepository(db_session)
     now = datetime.now(timezone.utc)
@@ -74,3 +127,90 @@ def test_delete_expired_routes(db_session):
     
     assert repo.find_by_subscription_id("expired") is None
     assert repo.find_by_subscription_id("valid") is not None
+
+def test_save_many_upserts_in_bulk(db_session):
+    repo = PrecalculatedRouteRepository(db_session)
+    expiry = datetime.now(timezone.utc) + timedelta(hours=24)
+    repo.save(PrecalculatedRouteCreate(
+        subscription_id="sub1", provider=PaymentProvider.STRIPE, routing_decision="old", expires_at=expiry
+    ))
+
+    written = repo.save_many([
+        PrecalculatedRouteCreate(subscription_id=f"sub{i}", provider=PaymentProvider.ADYEN, routing_decision="batch", expires_at=expiry)
+        for i in range(1, 4)
+    ])
+
+    assert written == 3
+    updated = repo.find_by_subscription_id("sub1")
+    assert (updated.provider, updated.routing_decision) == (PaymentProvider.ADYEN, "batch")
+    assert repo.find_by_subscription_id("sub3").provider == PaymentProvider.ADYEN
+    assert repo.save_many([]) == 0
+
+def test_cached_routes_resolve_without_db_reads():
+    sessions = CountingSessionFactory()
+    repo = PrecalculatedRouteRepository(sessions, cache=PrecalculatedRouteCache())
+    now = datetime.now(timezone.utc)
+    repo.save_many([
+        PrecalculatedRouteCreate(subscription_id="sub1", provider=PaymentProvider.ADYEN, routing_decision="D", expires_at=now + timedelta(hours=24)),
+        PrecalculatedRouteCreate(subscription_id="gone", provider=PaymentProvider.ADYEN, routing_decision="D", expires_at=now - timedelta(hours=1))
+    ])
+
+    opened = sessions.opened
+    for _ in range(10):
+        assert repo.find_by_subscription_id("sub1").provider == PaymentProvider.ADYEN
+    assert sessions.opened == opened
+
+    # Expired routes are never cached
+    repo.find_by_subscription_id("gone")
+    assert sessions.opened == opened + 1
+
+def test_warm_cache_loads_upcoming_routes_in_bulk():
+    sessions = CountingSessionFactory()
+    now = datetime.now(timezone.utc)
+    PrecalculatedRouteRepository(sessions).save_many([
+        PrecalculatedRouteCreate(
+            subscription_id=f"sub{i}", provider=PaymentProvider.STRIPE, routing_decision="D",
+            expires_at=now + timedelta(hours=12 if i < 25 else 24 * 30)
+        )
+        for i in range(30)
+    ])
+    repo = PrecalculatedRouteRepository(sessions, cache=PrecalculatedRouteCache())
+
+    opened = sessions.opened
+    assert repo.warm_cache(horizon_hours=48, batch_size=10) == 25
+    assert sessions.opened == opened + 3
+
+    opened = sessions.opened
+    assert all(repo.find_by_subscription_id(f"sub{i}") for i in range(25))
+    assert sessions.opened == opened
+
+def test_redis_tier_shares_routes_across_nodes():
+    client = FakeRedis()
+    expiry = datetime.now(timezone.utc) + timedelta(hours=24)
+    writer = PrecalculatedRouteRepository(CountingSessionFactory(), cache=PrecalculatedRouteCache(client))
+    writer.save(PrecalculatedRouteCreate(subscription_id="sub1", provider=PaymentProvider.BRAINTREE, routing_decision="D", expires_at=expiry))
+
+    assert client.expire_at["precalculated_route:sub1"] == int(expiry.timestamp())
+
+    # Another node: empty local tier, its own (empty) database
+    sessions = CountingSessionFactory()
+    reader_cache = PrecalculatedRouteCache(client)
+    reader = PrecalculatedRouteRepository(sessions, cache=reader_cache)
+    assert reader.find_by_subscription_id("sub1").provider == PaymentProvider.BRAINTREE
+    assert reader.find_by_subscription_id("sub1").expires_at == expiry
+    assert sessions.opened == 0
+    assert (reader_cache.stats()["redis_hits"], reader_cache.stats()["hits"]) == (1, 1)
+
+def test_local_copies_expire_without_redis():
+    sessions = CountingSessionFactory()
+    expiry = datetime.now(timezone.utc) + timedelta(days=3)
+    api = PrecalculatedRouteRepository(sessions, cache=PrecalculatedRouteCache(local_ttl_seconds=0.05))
+    api.save(PrecalculatedRouteCreate(subscription_id="sub1", provider=PaymentProvider.STRIPE, routing_decision="D", expires_at=expiry))
+    assert api.find_by_subscription_id("sub1").provider == PaymentProvider.STRIPE
+
+    # The renewal worker recalculates in another process, without access to this cache
+    worker = PrecalculatedRouteRepository(sessions)
+    worker.save(PrecalculatedRouteCreate(subscription_id="sub1", provider=PaymentProvider.ADYEN, routing_decision="D2", expires_at=expiry))
+
+    time.sleep(0.1)
+    assert api.find_by_subscription_id("sub1").provider == PaymentProvider.ADYEN
@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.core.models.precalculated_route import PrecalculatedRouteCreate
+from payments_service.app.core.repositories.models import Base, PrecalculatedRouteORM
+from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.services.route_sweeper import PrecalculatedRouteSweeper
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+def seed(engine, expired, live):
+    repo = PrecalculatedRouteRepository(sessionmaker(bind=engine))
+    now = datetime.now(timezone.utc)
+    repo.save_many([
+        PrecalculatedRouteCreate(
+            subscription_id=f"sub{i:04d}", provider=PaymentProvider.STRIPE, routing_decision="D",
+            expires_at=now - timedelta(hours=1 + i) if i < expired else now + timedelta(days=1)
+        )
+        for i in range(expired + live)
+    ])
+    return repo
+
+def remaining(engine):
+    with sessionmaker(bind=engine)() as db:
+        return db.query(PrecalculatedRouteORM).count()
+
+def test_expired_routes_are_deleted_in_bounded_chunks(engine):
+    repo = seed(engine, expired=25, live=5)
+    sweeper = PrecalculatedRouteSweeper(repo, chunk_size=10, pause_seconds=0)
+
+    assert sweeper.run_once() == 25
+    assert remaining(engine) == 5
+    stats = sweeper.stats()
+    assert (stats["chunks"], stats["rows_deleted"]) == (3, 25)
+    assert stats["last_run"]["rows_deleted"] == 25
+
+    assert sweeper.run_once() == 0
+
+def test_rate_cap_throttles_between_chunks(engine):
+    repo = seed(engine, expired=30, live=0)
+    sweeper = PrecalculatedRouteSweeper(repo, chunk_size=10, pause_seconds=0, max_rows_per_second=1000)
+    waits = []
+    sweeper._stopped.wait = waits.append
+
+    sweeper.run_once()
+
+    # Every chunk that deleted rows is followed by a pause of ~10 rows / 1000 rows/s
+    assert len(waits) == 3
+    assert all(0 < w <= 0.01 for w in waits)
+    assert sweeper.stats()["throttled_seconds"] > 0
+
+def test_delete_expired_still_removes_everything(engine):
+    repo = seed(engine, expired=12, live=3)
+
+    assert repo.delete_expired(datetime.now(timezone.utc), chunk_size=5) == 12
+    assert remaining(engine) == 3
+
+def short_chunks(repo):
+    real_chunk = repo.delete_expired_chunk
+    # A concurrent transaction holding row locks makes SKIP LOCKED return short chunks
+    repo.delete_expired_chunk = lambda current_time, limit: real_chunk(current_time, limit=min(limit, 2))
+    return repo
+
+def test_short_chunks_do_not_end_the_sweep(engine):
+    repo = short_chunks(seed(engine, expired=12, live=3))
+    sweeper = PrecalculatedRouteSweeper(repo, chunk_size=5, pause_seconds=0)
+
+    assert sweeper.run_once() == 12
+    assert remaining(engine) == 3
+    assert sweeper.stats()["chunks"] == 6
+
+def test_short_chunks_do_not_end_delete_expired(engine):
+    repo = short_chunks(seed(engine, expired=12, live=3))
+
+    assert repo.delete_expired(datetime.now(timezone.utc), chunk_size=5) == 12
+    assert remaining(engine) == 3
+
+def test_partition_retention_falls_back_to_chunks_when_not_partitioned(engine):
+    repo = seed(engine, expired=4, live=1)
+    sweeper = PrecalculatedRouteSweeper(repo, engine, retention="partition", pause_seconds=0)
+
+    assert sweeper.run_once() == 4
+    assert sweeper.stats()["partitions_dropped"] == 0
+
+def test_unknown_retention_is_rejected(engine):
+    with pytest.raises(ValueError):
+        PrecalculatedRouteSweeper(PrecalculatedRouteRepository(sessionmaker(bind=engine)), retention="truncate")
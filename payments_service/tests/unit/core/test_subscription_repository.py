@@ -67,3 +67,21 @@ def test_find_upcoming_renewals(db_session):
     
     assert len(upcoming) == 1
     assert upcoming[0].id == sub1.id
+
+def test_iter_upcoming_renewals_pages_by_keyset(db_session):
+    repo = SubscriptionRepository(db_session)
+    now = datetime.now(timezone.utc)
+    for i in range(7):
+        repo.save(SubscriptionCreate(
+            customer_id=f"c{i}", merchant_id="m1", amount=10, currency="USD",
+            next_renewal_at=now + timedelta(days=1 + i % 2)
+        ))
+    repo.save(SubscriptionCreate(
+        customer_id="late", merchant_id="m1", amount=10, currency="USD", next_renewal_at=now + timedelta(days=30)
+    ))
+
+    pages = list(repo.iter_upcoming_renewals(now, now + timedelta(days=7), batch_size=3))
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    keys = [(s.next_renewal_at, s.id) for page in pages for s in page]
+    assert keys == sorted(keys) and len(set(keys)) == 7
@@ -0,0 +1,57 @@
+import csv
+import os
+import pytest
+from datetime import datetime
+from payments_service.app.routing.ingestion import DataIngestor, StripeCsvParser, AdyenCsvParser, CsvExportDataProvider
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository, StaticAggregationStrategy
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.tests.unit.routing.providers import LocalFileDataProvider
+
+BASE_PATH = "payments_service/tests/data/raw_logs/"
+
+@pytest.mark.parametrize("file_name, parser", [
+    ("stripe_export.csv", StripeCsvParser()),
+    ("adyen_export.csv", AdyenCsvParser()),
+])
+def test_parse_chunk_matches_row_parser(file_name, parser):
+    with open(os.path.join(BASE_PATH, file_name), encoding="utf-8") as f:
+        header, *rows = list(csv.reader(f))
+
+    chunked = parser.parse_chunk(header, rows)
+    per_row = [parser.parse(dict(zip(header, row))) for row in rows]
+
+    assert [r.model_dump() for r in chunked] == [r.model_dump() for r in per_row]
+
+def test_both_paths_reject_timestamps_outside_the_export_format():
+    parser = StripeCsvParser()
+    header = ["amount", "currency", "status", "card_brand", "card_country", "created"]
+    for created in ("2024-01-01T10:00:00", "2024-01-01 10:00:00+00:00"):
+        row = ["10.00", "usd", "available", "Visa", "US", created]
+        with pytest.raises(ValueError):
+            parser.parse_chunk(header, [row])
+        with pytest.raises(ValueError):
+            parser.parse(dict(zip(header, row)))
+
+    record = parser.parse(dict(zip(header, ["10.00", "usd", "available", "Visa", "US", "2024-01-01 10:00:00"])))
+    assert record.timestamp == datetime(2024, 1, 1, 10, 0, 0)
+
+def test_streaming_provider_matches_full_load():
+    path = os.path.join(BASE_PATH, "stripe_export.csv")
+    # Tiny chunks so the fixture spans several of them
+    streaming = CsvExportDataProvider(path, StripeCsvParser(), chunk_size=2)
+    assert len(list(streaming.iter_chunks())) > 1
+
+    streamed_repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    DataIngestor(streamed_repo, StaticAggregationStrategy()).ingest_from_provider(streaming)
+
+    loaded_repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    DataIngestor(loaded_repo, StaticAggregationStrategy()).ingest_from_provider(
+        LocalFileDataProvider(path, StripeCsvParser())
+    )
+
+    assert streamed_repo.get_all() == loaded_repo.get_all()
+
+def test_empty_export(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("")
+    assert CsvExportDataProvider(str(path), StripeCsvParser()).fetch_data() == []
@@ -0,0 +1,74 @@
+from payments_service.app.core.models.payment import PaymentProvider, PaymentCreate
+from payments_service.app.core.models.metadata import CardBIN
+from payments_service.app.routing.decisioning.models import ResolvedProvider
+from payments_service.app.routing.decisioning.decision_cache import DecisionCache
+from payments_service.app.routing.decisioning.decision_strategies import ModelDecisionStrategy
+
+class CountingModelStrategy(ModelDecisionStrategy):
+    """
+    Stands in for a model: always picks the provider with the best auth rate.
+    """
+    def __init__(self, decision_cache=None, fail=False):
+        super().__init__(decision_cache)
+        self.calls = 0
+        self.fail = fail
+
+    def _model_decide(self, payment_in, providers):
+        self.calls += 1
+        if self.fail:
+            raise TimeoutError("model timed out")
+        return max(providers, key=lambda p: p.auth_rate).provider
+
+def providers(adyen_auth_rate=0.97):
+    return [
+        ResolvedProvider(provider=PaymentProvider.STRIPE, fixed_fee=0.30, variable_fee_percent=2.9, auth_rate=0.95, avg_latency_ms=300),
+        ResolvedProvider(provider=PaymentProvider.ADYEN, fixed_fee=0.12, variable_fee_percent=2.5, auth_rate=adyen_auth_rate, avg_latency_ms=250)
+    ]
+
+def payment(amount=42.0, merchant_id="m1", health=None, brand="Visa"):
+    payment_in = PaymentCreate(merchant_id=merchant_id, customer_id="c1", amount=amount, currency="USD")
+    payment_in.bin_metadata = CardBIN(bin="411111", brand=brand, type="credit", country="US")
+    payment_in.provider_health = health or {"stripe": "up", "adyen": "up"}
+    return payment_in
+
+def test_equivalent_transactions_skip_the_model():
+    cache = DecisionCache()
+    strategy = CountingModelStrategy(cache)
+
+    assert strategy.decide(payment(), providers()) == PaymentProvider.ADYEN
+    # Different merchant and amount, same class
+    assert strategy.decide(payment(amount=30.0, merchant_id="m2"), providers()) == PaymentProvider.ADYEN
+    assert strategy.rank(payment(amount=49.0), providers())[0].provider == PaymentProvider.ADYEN
+
+    assert strategy.calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+def test_context_changes_miss():
+    strategy = CountingModelStrategy(DecisionCache())
+    strategy.decide(payment(), providers())
+
+    strategy.decide(payment(amount=420.0), providers())
+    strategy.decide(payment(health={"stripe": "up", "adyen": "down"}), providers())
+    strategy.decide(payment(brand="Mastercard"), providers())
+    assert strategy.decide(payment(), providers(adyen_auth_rate=0.90)) == PaymentProvider.STRIPE
+
+    assert strategy.calls == 5
+
+def test_fallback_decisions_are_not_cached():
+    cache = DecisionCache()
+    strategy = CountingModelStrategy(cache, fail=True)
+
+    # Least cost fallback for $42: adyen
+    assert strategy.decide(payment(), providers()) == PaymentProvider.ADYEN
+    strategy.decide(payment(), providers())
+
+    assert strategy.calls == 2
+    assert cache.stats()["size"] == 0
+
+def test_without_cache_every_decision_calls_the_model():
+    strategy = CountingModelStrategy()
+    for _ in range(3):
+        strategy.decide(payment(), providers())
+
+    assert strategy.calls == 3
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from payments_service.app.core.models.payment import PaymentProvider, PaymentCreate
+from payments_service.app.routing.decisioning.models import ResolvedProvider
+from payments_service.app.routing.decisioning.interfaces import RoutingDecisionStrategy
+from payments_service.app.routing.decisioning.decision_strategies import ModelDecisionStrategy
+from payments_service.app.routing.decisioning.latency_budget import BudgetedDecisionStrategy, RoutingLatencyBudget
+
+class SlowStrategy(RoutingDecisionStrategy):
+    """
+    Stands in for a model-backed strategy that always picks PayPal.
+    """
+    def __init__(self, delay: float, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.finished = 0
+        self.threads = []
+
+    def decide(self, payment_in, providers):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        self.finished += 1
+        if self.fail:
+            raise RuntimeError("model returned garbage")
+        return PaymentProvider.PAYPAL
+
+PROVIDERS = [
+    ResolvedProvider(provider=PaymentProvider.STRIPE, fixed_fee=0.30, variable_fee_percent=2.9, auth_rate=0.95, avg_latency_ms=300),
+    ResolvedProvider(provider=PaymentProvider.PAYPAL, fixed_fee=0.49, variable_fee_percent=3.49, auth_rate=0.97, avg_latency_ms=400)
+]
+
+def payment(merchant_id="m1"):
+    return PaymentCreate(merchant_id=merchant_id, customer_id="c1", amount=50.0, currency="USD")
+
+def test_primary_wins_within_budget():
+    strategy = BudgetedDecisionStrategy(SlowStrategy(0.01), RoutingLatencyBudget(default_ms=500))
+
+    assert strategy.decide(payment(), PROVIDERS) == PaymentProvider.PAYPAL
+    assert strategy.stats()["fallbacks"] == 0
+
+def test_deadline_falls_back_and_counts_the_overrun():
+    primary = SlowStrategy(0.3)
+    strategy = BudgetedDecisionStrategy(primary, RoutingLatencyBudget(default_ms=50))
+
+    started = time.perf_counter()
+    assert strategy.decide(payment(), PROVIDERS) == PaymentProvider.STRIPE # least cost
+    assert time.perf_counter() - started < 0.2
+
+    time.sleep(0.4)
+    stats = strategy.stats()
+    assert primary.finished == 1 # kept running for the cache's sake
+    assert (stats["decisions"], stats["fallbacks"], stats["overruns"]) == (1, 1, 1)
+    assert stats["max_overrun_ms"] > 100
+
+def test_merchant_budgets_override_the_default():
+    budget = RoutingLatencyBudget(default_ms=50, merchant_budgets_ms={"patient": 1000, "unbounded": 0})
+    strategy = BudgetedDecisionStrategy(SlowStrategy(0.1), budget)
+
+    assert strategy.decide(payment("patient"), PROVIDERS) == PaymentProvider.PAYPAL
+    assert strategy.decide(payment("unbounded"), PROVIDERS) == PaymentProvider.PAYPAL
+    assert strategy.decide(payment("m1"), PROVIDERS) == PaymentProvider.STRIPE
+    assert budget.budget_ms("unbounded") is None
+
+class FailingModelStrategy(ModelDecisionStrategy):
+    def _model_decide(self, payment_in, providers):
+        raise RuntimeError("model returned garbage")
+
+def test_primary_errors_use_the_fallback():
+    strategy = BudgetedDecisionStrategy(SlowStrategy(0.0, fail=True), RoutingLatencyBudget(default_ms=500))
+
+    assert strategy.decide(payment(), PROVIDERS) == PaymentProvider.STRIPE
+    assert strategy.stats()["errors"] == 1
+
+def test_model_failures_are_counted():
+    # The model strategy's own least-cost fallback would hide the failure
+    for budget_ms in (500, 0):
+        strategy = BudgetedDecisionStrategy(FailingModelStrategy(fallback_on_error=False), RoutingLatencyBudget(default_ms=budget_ms))
+
+        assert strategy.decide(payment(), PROVIDERS) == PaymentProvider.STRIPE
+        assert asyncio.run(strategy.decide_async(payment(), PROVIDERS)) == PaymentProvider.STRIPE
+        stats = strategy.stats()
+        assert (stats["decisions"], stats["errors"], stats["fallbacks"]) == (2, 2, 2)
+
+def test_queued_calls_are_cancelled_at_the_deadline():
+    primary = SlowStrategy(0.3)
+    strategy = BudgetedDecisionStrategy(primary, RoutingLatencyBudget(default_ms=50), max_workers=1)
+
+    # The second call waits behind the first in the single worker
+    assert strategy.decide(payment(), PROVIDERS) == PaymentProvider.STRIPE
+    assert strategy.decide(payment(), PROVIDERS) == PaymentProvider.STRIPE
+
+    time.sleep(0.4)
+    stats = strategy.stats()
+    assert primary.finished == 1
+    assert (stats["fallbacks"], stats["overruns"], stats["cancelled"]) == (2, 1, 1)
+
+def test_async_deadline_falls_back():
+    strategy = BudgetedDecisionStrategy(SlowStrategy(0.3), RoutingLatencyBudget(default_ms=50))
+
+    async def route():
+        started = time.perf_counter()
+        provider = await strategy.decide_async(payment(), PROVIDERS)
+        return provider, time.perf_counter() - started
+
+    provider, elapsed = asyncio.run(route())
+
+    assert provider == PaymentProvider.STRIPE
+    assert elapsed < 0.2
+    assert strategy.rank(payment("m1"), PROVIDERS)[0].provider == PaymentProvider.STRIPE
+    assert strategy.stats()["fallbacks"] == 2
+
+def test_async_calls_run_on_the_budget_pool_and_queued_ones_are_cancelled():
+    primary = SlowStrategy(0.3)
+    strategy = BudgetedDecisionStrategy(primary, RoutingLatencyBudget(default_ms=50), max_workers=1)
+
+    async def route_twice():
+        # The second call waits behind the first in the single worker
+        return await asyncio.gather(strategy.decide_async(payment(), PROVIDERS), strategy.decide_async(payment(), PROVIDERS))
+
+    assert asyncio.run(route_twice()) == [PaymentProvider.STRIPE, PaymentProvider.STRIPE]
+
+    time.sleep(0.4)
+    stats = strategy.stats()
+    assert primary.finished == 1
+    assert primary.threads[0].startswith("routing-budget")
+    assert (stats["fallbacks"], stats["overruns"], stats["cancelled"]) == (2, 1, 1)
+
+def test_budget_from_env(monkeypatch):
+    monkeypatch.setenv("ROUTING_LATENCY_BUDGET_MS", "750")
+    monkeypatch.setenv("ROUTING_LATENCY_BUDGET_MERCHANTS", "fast=200, slow = 3000")
+
+    budget = RoutingLatencyBudget.from_env()
+
+    assert (budget.budget_ms("fast"), budget.budget_ms("slow"), budget.budget_ms("other")) == (200, 3000, 750)
@@ -0,0 +1,43 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from payments_service.app.routing.ingestion import DataIngestor, StripeCsvParser, AdyenCsvParser, ParallelIngestionRunner
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository, StaticAggregationStrategy
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.tests.unit.routing.providers import LocalFileDataProvider
+
+BASE_PATH = "payments_service/tests/data/raw_logs/"
+JOBS = [
+    (os.path.join(BASE_PATH, "stripe_export.csv"), StripeCsvParser()),
+    (os.path.join(BASE_PATH, "adyen_export.csv"), AdyenCsvParser()),
+    # The same export twice must double the counts, not duplicate the records
+    (os.path.join(BASE_PATH, "stripe_export.csv"), StripeCsvParser()),
+]
+
+def _sequential_performance():
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    ingestor = DataIngestor(repo, StaticAggregationStrategy())
+    records = []
+    for path, parser in JOBS:
+        records.extend(LocalFileDataProvider(path, parser).fetch_data())
+    ingestor.ingest_records(records)
+    return repo.get_all()
+
+def _key(performance):
+    return (performance.provider.value, performance.dimension.model_dump_json())
+
+def test_process_pool_matches_sequential_ingestion():
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    runner = ParallelIngestionRunner(repo, StaticAggregationStrategy(), max_workers=2)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        runner.ingest_files(JOBS, executor)
+
+    assert sorted(repo.get_all(), key=_key) == sorted(_sequential_performance(), key=_key)
+
+def test_partial_counts_are_merged():
+    runner = ParallelIngestionRunner(RoutingPerformanceRepository(InMemoryKeyValueStore()), StaticAggregationStrategy(), max_workers=1)
+    single = runner.aggregate_files(JOBS[:1])
+    merged = runner.aggregate_files(JOBS)
+
+    stripe_counts = sum(s.count for p, _, s in merged.items() if p.value == "stripe")
+    assert stripe_counts == 2 * single.record_count
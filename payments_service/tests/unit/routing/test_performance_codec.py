@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import MagicMock
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.core.repositories.datastore import RedisKeyValueStore
+from payments_service.app.routing.decisioning.codec import BinaryPerformanceCodec
+from payments_service.app.routing.decisioning.repository import provider_field
+from payments_service.app.routing.decisioning.models import (
+    ProviderPerformance, RoutingDimension, PerformanceMetrics, CostStructure
+)
+
+def _perf(provider=PaymentProvider.STRIPE, interchange=0.0, **dimension_extra):
+    return ProviderPerformance(
+        provider=provider,
+        dimension=RoutingDimension(payment_method_type="credit_card", network="visa", **dimension_extra),
+        metrics=PerformanceMetrics(
+            auth_rate=0.93, fraud_rate=0.01, avg_latency_ms=210,
+            cost_structure=CostStructure(variable_fee_percent=2.9, fixed_fee=0.3, interchange_plus_basis_points=interchange)
+        ),
+        data_window="batch"
+    )
+
+@pytest.mark.parametrize("perf", [_perf(), _perf(interchange=None), _perf(PaymentProvider.ADYEN, mcc="5411", tier=2)])
+def test_round_trip(perf):
+    codec = BinaryPerformanceCodec()
+    encoded = codec.encode(perf)
+    assert encoded.startswith(b"PP\x02")
+    assert len(encoded) < len(perf.model_dump_json())
+    assert codec.decode(encoded) == perf
+
+def test_dimensions_are_shared_between_providers():
+    codec = BinaryPerformanceCodec()
+    stripe = codec.decode(codec.encode(_perf(PaymentProvider.STRIPE)))
+    adyen = codec.decode(codec.encode(_perf(PaymentProvider.ADYEN)))
+    assert stripe.dimension is adyen.dimension
+
+def test_decoded_records_are_independent_copies():
+    codec = BinaryPerformanceCodec()
+    encoded = codec.encode(_perf())
+
+    first = codec.decode(encoded)
+    first.metrics.auth_rate = 0.1
+    first.metrics.cost_structure.fixed_fee = 9.0
+
+    assert codec.decode(encoded) == _perf()
+    assert codec.decode(encoded) is not codec.decode(encoded)
+
+def test_dimension_is_encoded_by_field_name():
+    codec = BinaryPerformanceCodec()
+    encoded = codec.encode(_perf(mcc="5411"))
+
+    assert b'"network":"visa"' in encoded
+    assert b'"mcc":"5411"' in encoded
+
+def test_v1_positional_dimensions_are_still_read():
+    codec = BinaryPerformanceCodec()
+    perf = _perf(mcc="5411")
+    # Same metrics and provider section; only the version byte and dimension differ
+    named = codec._encode_dimension(perf.dimension)
+    body = codec.encode(perf)[3:-len(named) - 2]
+    positional = b'["credit_card","card_on_file","visa","unknown","domestic","USD",false,{"mcc":"5411"}]'
+    v1 = b"PP\x01" + body + len(positional).to_bytes(2, "little") + positional
+
+    assert codec.decode(v1) == perf
+
+def test_legacy_json_and_unknown_versions():
+    codec = BinaryPerformanceCodec()
+    perf = _perf()
+    assert codec.decode(perf.model_dump_json().encode()) == perf
+    with pytest.raises(ValueError):
+        codec.decode(b"PP\x09" + codec.encode(perf)[3:])
+
+def test_store_writes_items_with_codec():
+    client = MagicMock()
+    perf = _perf()
+    codec = BinaryPerformanceCodec()
+    client.pipeline.return_value.execute.return_value = [1, {b"stripe": codec.encode(perf)}]
+
+    store = RedisKeyValueStore(client, list, item_key=provider_field, codec=codec)
+    assert store.upsert_items({"k": [perf]}, provider_field) == {"k": [perf]}
+    client.pipeline.return_value.hset.assert_called_once_with("k", mapping={"stripe": codec.encode(perf)})
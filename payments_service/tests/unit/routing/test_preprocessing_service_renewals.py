@@ -2,9 +2,21 @@ import pytest
 from unittest.mock import MagicMock
 from datetime import datetime, timezone, timedelta
 from payments_service.app.routing.preprocessing.service import PreprocessingService
-from payments_service.app.core.models.subscription import Subscription
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from payments_service.app.core.models.subscription import Subscription, SubscriptionCreate
+from payments_service.app.core.repositories.models import Base
+from payments_service.app.core.repositories.subscription_repository import SubscriptionRepository
+from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
 from payments_service.app.core.models.payment import PaymentProvider
 
+@pytest.fixture
+def db_session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
 def test_precalculate_upcoming_renewals_logic():
     # Setup Mocks
     mock_perf_repo = MagicMock()
@@ -29,20 +41,50 @@ def test_precalculate_upcoming_renewals_logic():
         next_renewal_at=now + timedelta(days=3)
     )
     
-    mock_sub_repo.find_upcoming_renewals.return_value = [sub]
+    mock_sub_repo.iter_upcoming_renewals.return_value = iter([[sub]])
     mock_routing_svc.find_best_route.return_value = PaymentProvider.ADYEN
+    mock_precalc_repo.save_many.side_effect = len
     
     # Execute
-    svc.precalculate_upcoming_renewals(lookahead_days=7)
+    written = svc.precalculate_upcoming_renewals(lookahead_days=7)
     
     # Verify
-    mock_sub_repo.find_upcoming_renewals.assert_called_once()
+    assert written == 1
+    mock_sub_repo.iter_upcoming_renewals.assert_called_once()
     mock_routing_svc.find_best_route.assert_called_once()
-    mock_precalc_repo.save.assert_called_once()
+    mock_precalc_repo.save_many.assert_called_once()
     
     # Check save payload
-    args, _ = mock_precalc_repo.save.call_args
-    route_in = args[0]
+    args, _ = mock_precalc_repo.save_many.call_args
+    route_in = args[0][0]
     assert route_in.subscription_id == "sub1"
     assert route_in.provider == PaymentProvider.ADYEN
     assert route_in.expires_at > sub.next_renewal_at
+
+def test_renewals_are_routed_once_per_context(db_session_factory):
+    sub_repo = SubscriptionRepository(db_session_factory)
+    precalc_repo = PrecalculatedRouteRepository(db_session_factory)
+    routing_svc = MagicMock()
+    routing_svc.find_best_route.side_effect = lambda p: PaymentProvider.ADYEN if p.amount < 20 else PaymentProvider.STRIPE
+    svc = PreprocessingService(
+        performance_repository=MagicMock(),
+        subscription_repository=sub_repo,
+        precalculated_route_repository=precalc_repo,
+        routing_service=routing_svc
+    )
+    now = datetime.now(timezone.utc)
+    subs = [
+        sub_repo.save(SubscriptionCreate(
+            customer_id=f"c{i}", merchant_id="m1", amount=[9.99, 29.99][i % 2], currency="USD",
+            next_renewal_at=now + timedelta(days=2)
+        ))
+        for i in range(25)
+    ]
+
+    assert svc.precalculate_upcoming_renewals(lookahead_days=7, batch_size=10) == 25
+
+    # Two price points, three pages: two routing calls
+    assert routing_svc.find_best_route.call_count == 2
+    for sub in subs:
+        expected = PaymentProvider.ADYEN if sub.amount < 20 else PaymentProvider.STRIPE
+        assert precalc_repo.find_by_subscription_id(sub.id).provider == expected
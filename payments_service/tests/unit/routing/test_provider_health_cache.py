@@ -0,0 +1,114 @@
+import asyncio
+import redis
+from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository
+from payments_service.app.routing.decisioning.interfaces import RoutingDecisionStrategy
+from payments_service.app.routing.preprocessing import RoutingService, PreprocessingService, FeeService, ProviderHealthCache
+from payments_service.app.routing.preprocessing.models import BillingType, Customer, PaymentMethodDetails, Product
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class HealthRedis:
+    """
+    Serves provider_health:* flags through MGET only, counting round-trips.
+    """
+    def __init__(self, flags=None):
+        self.flags = flags or {}
+        self.mgets = 0
+        self.fail = False
+
+    def mget(self, keys):
+        self.mgets += 1
+        if self.fail:
+            raise redis.ConnectionError("connection refused")
+        return [self.flags.get(k) for k in keys]
+
+class AsyncHealthRedis(HealthRedis):
+    async def mget(self, keys):
+        return super().mget(keys)
+
+class ContextStrategy(RoutingDecisionStrategy):
+    """
+    A context-enriched strategy, so RoutingService attaches provider health.
+    """
+    def decide(self, payment_in, providers):
+        return PaymentProvider.STRIPE
+
+def test_reads_are_served_from_one_mget_per_ttl():
+    clock = FakeClock()
+    client = HealthRedis({"provider_health:adyen": b"down"})
+    cache = ProviderHealthCache(client, ttl_seconds=5, clock=clock)
+
+    for _ in range(100):
+        assert not cache.is_up(PaymentProvider.ADYEN)
+        assert cache.is_up(PaymentProvider.STRIPE) # no flag means up
+    assert client.mgets == 1
+
+    client.flags = {}
+    clock.now = 5
+    assert cache.healthy([PaymentProvider.STRIPE, PaymentProvider.ADYEN]) == [PaymentProvider.STRIPE, PaymentProvider.ADYEN]
+    assert client.mgets == 2
+    assert cache.stats()["refreshes"] == 2
+
+def test_refresh_failure_serves_last_known_status():
+    clock = FakeClock()
+    client = HealthRedis({"provider_health:stripe": b"down"})
+    cache = ProviderHealthCache(client, ttl_seconds=5, clock=clock)
+    assert cache.snapshot()["stripe"] == "down"
+
+    client.fail = True
+    clock.now = 10
+    assert cache.snapshot()["stripe"] == "down"
+    # The failed refresh isn't retried on every read
+    assert cache.snapshot()["stripe"] == "down"
+    assert client.mgets == 2
+    assert cache.stats()["errors"] == 1
+
+def test_without_redis_every_provider_is_up():
+    cache = ProviderHealthCache()
+
+    assert not cache.enabled
+    assert set(cache.snapshot().values()) == {"up"}
+
+def test_call_sites_share_one_lookup():
+    client = HealthRedis({"provider_health:adyen": b"down"})
+    cache = ProviderHealthCache(client)
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    routing = RoutingService(FeeService(), repo, strategy=ContextStrategy(), health_cache=cache)
+    preprocessing = PreprocessingService(repo, bin_repository=None, fee_repository=None, health_cache=cache)
+
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")
+    routing.find_best_route(payment)
+    asyncio.run(routing.find_best_route_async(payment))
+    route = preprocessing.preprocess_recurrent_payment(
+        customer=Customer(id="c1", locale="en_US"),
+        payment_method=PaymentMethodDetails(type="credit_card"),
+        product=Product(id="p1", name="Plan"),
+        billing_type=BillingType.MONTHLY
+    )
+
+    assert payment.provider_health == {"stripe": "up", "adyen": "down", "braintree": "up"}
+    assert route.processor == PaymentProvider.STRIPE
+    assert cache.snapshot()["paypal"] == "up"
+    assert client.mgets == 1
+
+def test_async_client_refreshes_without_blocking():
+    client = AsyncHealthRedis({"provider_health:braintree": b"down"})
+    routing = RoutingService(
+        FeeService(),
+        RoutingPerformanceRepository(InMemoryKeyValueStore()),
+        strategy=ContextStrategy(),
+        async_redis_client=client
+    )
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")
+
+    asyncio.run(routing.find_best_route_async(payment))
+
+    assert payment.provider_health["braintree"] == "down"
+    assert client.mgets == 1
@@ -0,0 +1,116 @@
+import uuid
+import pytest
+from unittest.mock import MagicMock
+from datetime import timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.core.models.subscription import SubscriptionCreate
+from payments_service.app.core.repositories.models import Base, SubscriptionORM, SHARD_KEYSPACE, subscription_shard_key
+from payments_service.app.core.repositories.subscription_repository import SubscriptionRepository
+from payments_service.app.core.repositories.precalculated_route_repository import PrecalculatedRouteRepository
+from payments_service.app.core.repositories.renewal_lease_repository import RenewalLeaseRepository, shard_key_range
+from payments_service.app.core.utils.datetime_utils import now_utc
+from payments_service.app.routing.preprocessing import PreprocessingService, ShardedRenewalRunner
+
+@pytest.fixture
+def db_session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+def add_subscriptions(sub_repo, count):
+    return [
+        sub_repo.save(SubscriptionCreate(
+            customer_id=f"c{i}", merchant_id="m1", amount=9.99, currency="USD",
+            next_renewal_at=now_utc() + timedelta(days=2)
+        )).id
+        for i in range(count)
+    ]
+
+def make_runner(session_factory, owner, **kwargs):
+    routing = MagicMock()
+    routing.find_best_route.return_value = PaymentProvider.STRIPE
+    service = PreprocessingService(
+        performance_repository=MagicMock(),
+        subscription_repository=SubscriptionRepository(session_factory),
+        precalculated_route_repository=PrecalculatedRouteRepository(session_factory),
+        routing_service=routing
+    )
+    kwargs.setdefault("shard_count", 4)
+    return ShardedRenewalRunner(service, RenewalLeaseRepository(session_factory), owner=owner, **kwargs)
+
+def shard_of(sub_id, shard_count):
+    key = subscription_shard_key(sub_id)
+    matches = [s for s in range(shard_count) if shard_key_range(s, shard_count)[0] <= key < shard_key_range(s, shard_count)[1]]
+    assert len(matches) == 1
+    return matches[0]
+
+def test_shard_ranges_cover_the_keyspace_once():
+    for shard_count in (1, 3, 4, 7):
+        ranges = [shard_key_range(s, shard_count) for s in range(shard_count)]
+        assert ranges[0][0] == 0 and ranges[-1][1] == SHARD_KEYSPACE
+        assert all(ranges[i][1] == ranges[i + 1][0] for i in range(shard_count - 1))
+
+def test_non_uuid_ids_spread_across_shards():
+    shards = [shard_of(f"sub_{i}", 4) for i in range(400)]
+    assert all(shards.count(s) > 50 for s in range(4))
+    assert shard_of(str(uuid.uuid4()), 4) in range(4)
+
+def test_workers_skip_shards_leased_by_others(db_session_factory):
+    sub_ids = add_subscriptions(SubscriptionRepository(db_session_factory), 40)
+    leases = RenewalLeaseRepository(db_session_factory)
+    leases.ensure_shards(4)
+    held = leases.claim("worker-a", 4, 300, now_utc())
+
+    runner = make_runner(db_session_factory, "worker-b")
+    written = runner.run_cycle()
+
+    routes = PrecalculatedRouteRepository(db_session_factory)
+    routed = {s for s in sub_ids if routes.find_by_subscription_id(s)}
+    assert routed == {s for s in sub_ids if shard_of(s, 4) != held}
+    assert written == len(routed)
+    assert runner.stats()["shards_completed"] == 3
+
+def test_only_new_or_stale_subscriptions_are_reprocessed(db_session_factory):
+    sub_repo = SubscriptionRepository(db_session_factory)
+    sub_ids = add_subscriptions(sub_repo, 20)
+    runner = make_runner(db_session_factory, "worker-a", cycle_interval_seconds=0)
+
+    assert runner.run_cycle() == 20
+    assert runner.run_cycle() == 0
+
+    new_id = add_subscriptions(sub_repo, 1)[0]
+    # Renewal moved past the existing route's expiry
+    with db_session_factory() as db:
+        db.query(SubscriptionORM).filter(SubscriptionORM.id == sub_ids[0]).update(
+            {SubscriptionORM.next_renewal_at: now_utc() + timedelta(days=5)}
+        )
+        db.commit()
+
+    assert runner.run_cycle() == 2
+    assert PrecalculatedRouteRepository(db_session_factory).find_by_subscription_id(new_id)
+
+def test_completed_shards_wait_for_the_next_cycle(db_session_factory):
+    add_subscriptions(SubscriptionRepository(db_session_factory), 10)
+    first = make_runner(db_session_factory, "worker-a", cycle_interval_seconds=60)
+    second = make_runner(db_session_factory, "worker-b", cycle_interval_seconds=60)
+
+    first.run_cycle()
+    second.run_cycle()
+
+    assert first.stats()["shards_completed"] == 4
+    assert second.stats()["shards_completed"] == 0
+
+def test_expired_lease_of_a_crashed_worker_is_taken_over(db_session_factory):
+    add_subscriptions(SubscriptionRepository(db_session_factory), 10)
+    leases = RenewalLeaseRepository(db_session_factory)
+    leases.ensure_shards(4)
+    crashed = leases.claim("crashed", 4, -1, now_utc())
+
+    runner = make_runner(db_session_factory, "worker-b")
+    runner.run_cycle()
+
+    assert runner.stats()["shards_completed"] == 4
+    assert not leases.renew(crashed, "crashed", 300)
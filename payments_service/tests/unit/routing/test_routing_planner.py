@@ -0,0 +1,118 @@
+import time
+from payments_service.app.routing.decisioning.planner import RoutingPlanner, Capability
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.routing.decisioning.models import ResolvedProvider
+from payments_service.app.routing.decisioning.specialists import (
+    BaseAgent,
+    CostAnalystAgent,
+    LocalCostAnalystAgent,
+    LocalPerformanceAnalystAgent,
+    LocalHealthSentinelAgent
+)
+
+class SleepyAgent(BaseAgent):
+    """
+    Specialist answering after a fixed delay, without calling a model.
+    """
+    delay = 0.2
+    instances = 0
+
+    def __init__(self, model, client=None):
+        super().__init__(model, client)
+        type(self).instances += 1
+
+    def run(self, context):
+        time.sleep(self.delay)
+        return {"recommended_provider": context["provider"], "agent": type(self).__name__}
+
+class CostAgent(SleepyAgent):
+    instances = 0
+
+class PerformanceAgent(SleepyAgent):
+    instances = 0
+
+class HealthAgent(SleepyAgent):
+    instances = 0
+
+class StuckAgent(SleepyAgent):
+    delay = 1.0
+
+class BrokenAgent(SleepyAgent):
+    def run(self, context):
+        raise ConnectionError("model unavailable")
+
+def planner(step_timeout_seconds=0.5):
+    planner = RoutingPlanner(model="test:model", step_timeout_seconds=step_timeout_seconds)
+    planner.capabilities.clear()
+    for agent_class in (CostAgent, PerformanceAgent, HealthAgent, StuckAgent, BrokenAgent):
+        planner.register_capability(Capability(agent_class.__name__, "test", agent_class))
+    return planner
+
+def plan(*names):
+    return [{"agent": name, "reason": "test"} for name in names]
+
+def test_specialists_run_concurrently_with_shared_clients():
+    routing_planner = planner()
+
+    started = time.perf_counter()
+    results = routing_planner.execute_plan(plan("CostAgent", "PerformanceAgent", "HealthAgent"), {"provider": "stripe"})
+    elapsed = time.perf_counter() - started
+
+    assert set(results) == {"CostAgent", "PerformanceAgent", "HealthAgent"}
+    assert elapsed < 0.5 # three 0.2s specialists, not 0.6s
+    assert routing_planner._get_agent("CostAgent").client is routing_planner.client
+
+    routing_planner.execute_plan(plan("CostAgent"), {"provider": "stripe"})
+    assert CostAgent.instances == 1
+
+def test_slow_and_failing_specialists_yield_partial_results():
+    routing_planner = planner(step_timeout_seconds=0.4)
+
+    started = time.perf_counter()
+    results = routing_planner.execute_plan(plan("CostAgent", "StuckAgent", "BrokenAgent", "Unknown"), {"provider": "adyen"})
+
+    assert time.perf_counter() - started < 0.8
+    assert results["CostAgent"]["recommended_provider"] == "adyen"
+    assert results["StuckAgent"] == {"status": "timed_out"}
+    assert results["BrokenAgent"]["status"] == "failed"
+    assert "Unknown" not in results
+    routing_planner.close()
+
+def routing_context(amount=100.0):
+    providers = [
+        ResolvedProvider(provider=PaymentProvider.STRIPE, fixed_fee=0.30, variable_fee_percent=2.9, auth_rate=0.96, avg_latency_ms=300),
+        ResolvedProvider(provider=PaymentProvider.ADYEN, fixed_fee=0.12, variable_fee_percent=2.6, auth_rate=0.96, avg_latency_ms=220),
+        ResolvedProvider(provider=PaymentProvider.PAYPAL, fixed_fee=0.49, variable_fee_percent=3.49, auth_rate=0.93, avg_latency_ms=400)
+    ]
+    return {
+        "payment": {"amount": amount, "currency": "USD"},
+        "providers": [p.model_dump() for p in providers],
+        "provider_health": {"stripe": "up", "adyen": "degraded", "paypal": "down"}
+    }
+
+def test_local_specialists_match_the_model_schemas():
+    context = routing_context()
+
+    cost = LocalCostAnalystAgent().run(context)
+    performance = LocalPerformanceAnalystAgent().run(context)
+    health = LocalHealthSentinelAgent().run(context)
+
+    # adyen 2.72 < stripe 3.20 < paypal 3.98
+    assert cost["recommended_provider"] == "adyen"
+    assert 0.5 < cost["confidence"] <= 1.0 and cost["analysis"]
+    # stripe and adyen tie on auth rate; adyen is faster
+    assert performance["recommended_provider"] == "adyen"
+    assert performance["confidence"] == 0.5
+    assert health["unhealthy_providers"] == ["adyen", "paypal"]
+    assert health["critical_alerts"] == ["paypal is DOWN; do not route to it."]
+    assert LocalCostAnalystAgent().run({"providers": []})["recommended_provider"] is None
+
+def test_planner_runs_computable_steps_locally():
+    routing_planner = RoutingPlanner(model="test:model")
+    assert routing_planner.capabilities["CostAnalyst"].agent_class is LocalCostAnalystAgent
+
+    results = routing_planner.execute_plan(plan("CostAnalyst", "PerformanceAnalyst", "HealthSentinel"), routing_context())
+
+    assert set(results) == {"CostAnalyst", "PerformanceAnalyst", "HealthSentinel"}
+    assert results["HealthSentinel"]["unhealthy_providers"] == ["adyen", "paypal"]
+    assert RoutingPlanner(model="test:model", local_specialists=False).capabilities["CostAnalyst"].agent_class is CostAnalystAgent
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock
+from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository, RoutingDimension
+from payments_service.app.routing.decisioning.decision_strategies import DeterministicLeastCostStrategy
+from payments_service.app.routing.decisioning.interfaces import RoutingDecisionStrategy
+from payments_service.app.routing.decisioning.models import ProviderPerformance, PerformanceMetrics, CostStructure
+from payments_service.app.routing.preprocessing import CompiledRoutingTable, FeeService, RoutingService, FeeStructure
+from payments_service.tests.factories import create_mock
+
+USD_DOMESTIC = RoutingDimension(payment_method_type="credit_card", currency="USD", region="domestic")
+
+def _perf(provider: PaymentProvider, fixed_fee: float, variable_fee_percent: float) -> ProviderPerformance:
+    return create_mock(
+        ProviderPerformance,
+        provider=provider,
+        dimension=USD_DOMESTIC,
+        metrics=create_mock(
+            PerformanceMetrics,
+            cost_structure=CostStructure(fixed_fee=fixed_fee, variable_fee_percent=variable_fee_percent)
+        )
+    )
+
+@pytest.fixture
+def repo():
+    return RoutingPerformanceRepository(InMemoryKeyValueStore())
+
+def test_compiled_decision_matches_resolved_decision(repo):
+    repo.save(_perf(PaymentProvider.ADYEN, 0.05, 1.5))
+    service = RoutingService(fee_service=FeeService(), performance_repository=repo)
+    strategy = DeterministicLeastCostStrategy()
+
+    for amount in [1.0, 10.0, 99.99, 1000.0, 25000.0]:
+        payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=amount, currency="USD")
+        routes = service.routing_table.lookup(USD_DOMESTIC)
+        resolved = service._resolve_providers(payment)
+        assert strategy.decide_compiled(payment, routes) == strategy.decide(payment, resolved)
+        assert service.find_best_route(payment) == strategy.decide(payment, resolved)
+
+def test_strategies_without_a_compiled_path_fall_back_to_decide(repo):
+    class ReliabilityStrategy(RoutingDecisionStrategy):
+        # Opts into compiled routes without overriding decide_compiled
+        supports_compiled_routes = True
+
+        def decide(self, payment_in, providers):
+            return max(providers, key=lambda p: p.auth_rate).provider
+
+    service = RoutingService(fee_service=FeeService(), performance_repository=repo, strategy=ReliabilityStrategy())
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=50.0, currency="USD")
+
+    routes = service.routing_table.lookup(USD_DOMESTIC)
+    assert service.strategy.decide_compiled(payment, routes) == service.strategy.decide(payment, service._resolve_providers(payment))
+    assert service.find_best_route(payment) == service.strategy.decide(payment, service._resolve_providers(payment))
+
+def test_performance_data_takes_priority_over_static_fees(repo):
+    repo.save(_perf(PaymentProvider.STRIPE, 0.01, 0.1))
+    table = CompiledRoutingTable(FeeService(), repo)
+
+    routes = {r.provider: r for r in table.lookup(USD_DOMESTIC)}
+
+    assert routes[PaymentProvider.STRIPE].fixed_fee == 0.01
+    assert routes[PaymentProvider.PAYPAL].auth_rate == CompiledRoutingTable.DEFAULT_AUTH_RATE
+
+def test_table_is_reused_until_data_changes(repo):
+    spy = MagicMock(wraps=repo)
+    spy.version = repo.version
+    table = CompiledRoutingTable(FeeService(), spy)
+
+    first = table.lookup(USD_DOMESTIC)
+    assert table.lookup(USD_DOMESTIC) is first
+    assert spy.find_by_dimension.call_count == 1
+
+    spy.version += 1
+    table.lookup(USD_DOMESTIC)
+    assert spy.find_by_dimension.call_count == 2
+
+def test_table_rebuilds_on_save_and_fee_update(repo):
+    fees = FeeService()
+    service = RoutingService(fee_service=fees, performance_repository=repo)
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=100.0, currency="USD")
+
+    assert service.find_best_route(payment) == PaymentProvider.INTERNAL
+
+    repo.save(_perf(PaymentProvider.ADYEN, 0.0, 0.5))
+    assert service.find_best_route(payment) == PaymentProvider.ADYEN
+
+    fees.update_fees([
+        FeeStructure(provider=PaymentProvider.PAYPAL, fixed_fee=0.0, variable_fee_percent=0.1)
+    ])
+    assert service.find_best_route(payment) == PaymentProvider.PAYPAL
+
+def test_table_expires_after_max_age(repo):
+    table = CompiledRoutingTable(FeeService(), repo, max_age_seconds=0)
+    table.lookup(USD_DOMESTIC)
+    assert table.get_fresh(USD_DOMESTIC) is None
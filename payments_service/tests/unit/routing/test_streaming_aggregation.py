@@ -0,0 +1,66 @@
+import pickle
+from datetime import datetime
+from payments_service.app.core.models.payment import PaymentProvider
+from payments_service.app.routing.ingestion import RawTransactionRecord, DataIngestor
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository, StaticAggregationStrategy, RoutingDimension
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+
+def _records(count: int, provider=PaymentProvider.STRIPE, network="visa", mcc=None):
+    now = datetime.now()
+    for i in range(count):
+        yield RawTransactionRecord(
+            provider=provider,
+            payment_form="card_on_file",
+            processing_type="signature",
+            amount=10.0,
+            currency="USD",
+            status="succeeded" if i % 4 else "failed",
+            latency_ms=100 + (i % 3) * 50,
+            bin="411111",
+            card_type="credit",
+            network=network,
+            region="domestic",
+            timestamp=now,
+            extra_fields={"mcc": mcc} if mcc else {}
+        )
+
+def test_analyze_accepts_generator():
+    strategy = StaticAggregationStrategy()
+    results = strategy.analyze(_records(8))
+
+    assert len(results) == 1
+    assert results[0].metrics.auth_rate == 0.75
+    assert results[0].metrics.avg_latency_ms == 143
+
+def test_merged_partials_match_single_pass():
+    strategy = StaticAggregationStrategy(dynamic_dimensions=["mcc"])
+
+    def stream():
+        yield from _records(10, mcc="5411")
+        yield from _records(6, provider=PaymentProvider.ADYEN, network="mastercard")
+
+    single = strategy.analyze(stream())
+
+    left = strategy.aggregate(_records(7, mcc="5411"))
+    # Partials cross process boundaries in parallel ingestion
+    right = pickle.loads(pickle.dumps(strategy.aggregate(_records(3, mcc="5411"))))
+    right.add_all(_records(6, provider=PaymentProvider.ADYEN, network="mastercard"))
+    merged = strategy.summarize(left.merge(right))
+
+    assert left.record_count == 16
+    key = lambda p: (p.provider, p.dimension.network)
+    assert sorted(single, key=key) == sorted(merged, key=key)
+    assert any(p.dimension.model_extra == {"mcc": "5411"} for p in merged)
+
+def test_latency_variance_is_tracked():
+    aggregator = StaticAggregationStrategy().aggregate(_records(3))
+    (_, _, stats), = aggregator.items()
+    assert stats.count == 3
+    assert round(stats.latency_stddev_ms, 2) == 40.82
+
+def test_ingestor_streams_records():
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore())
+    DataIngestor(repo, StaticAggregationStrategy()).ingest_records(_records(4))
+
+    dim = RoutingDimension(payment_method_type="credit_card", network="visa", card_type="credit")
+    assert repo.find_by_dimension(dim)[0].metrics.auth_rate == 0.75
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import pytest
+from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider, PaymentStatus
+from payments_service.app.core.models.merchant import Merchant
+from payments_service.app.core.models.customer import Customer
+from payments_service.app.core.repositories.datastore import InMemoryRelationalStore, InMemoryKeyValueStore
+from payments_service.app.core.repositories.merchant_repository import MerchantRepository
+from payments_service.app.core.repositories.customer_repository import CustomerRepository
+from payments_service.app.core.repositories.payment_repository import PaymentRepository
+from payments_service.app.core.services.payment_service import PaymentService
+from payments_service.app.routing.preprocessing.service import RoutingService, FeeService
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository
+from payments_service.app.routing.decisioning.decision_strategies import FixedProviderStrategy
+from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeResponse, ProcessorStatus
+from payments_service.app.processors.adapters.internal_mock_adapter import InternalMockProcessor
+
+class SyncOnlyProcessor(PaymentProcessor):
+    """
+    Processor that only implements the blocking contract.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def process_charge(self, request):
+        self.calls += 1
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS, processor_transaction_id="sync_1")
+
+    def refund(self, processor_transaction_id, amount):
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
+
+    @property
+    def provider_name(self) -> str:
+        return "sync_only"
+
+@pytest.fixture
+def payment_service():
+    merchant_repo = MerchantRepository(InMemoryRelationalStore())
+    customer_repo = CustomerRepository(InMemoryRelationalStore())
+    merchant_repo.save(Merchant(
+        id="m1", name="Test Merchant", email="m@example.com", mcc="5411",
+        country="US", currency="USD", tax_id="TAX123"
+    ))
+    customer_repo.save(Customer(id="c1", merchant_id="m1", email="c@example.com", payment_method_token="tok_visa"))
+
+    registry = ProcessorRegistry()
+    registry.register(PaymentProvider.INTERNAL, InternalMockProcessor())
+    registry.register(PaymentProvider.ADYEN, SyncOnlyProcessor())
+
+    routing_service = RoutingService(
+        fee_service=FeeService(),
+        performance_repository=RoutingPerformanceRepository(InMemoryKeyValueStore()),
+        strategy=FixedProviderStrategy(PaymentProvider.INTERNAL)
+    )
+    return PaymentService(
+        payment_repo=PaymentRepository(InMemoryRelationalStore()),
+        merchant_repo=merchant_repo,
+        customer_repo=customer_repo,
+        routing_service=routing_service,
+        processor_registry=registry
+    )
+
+def test_create_charge_async(payment_service):
+    charge = PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")
+
+    payment = asyncio.run(payment_service.create_charge_async(charge))
+
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.provider == PaymentProvider.INTERNAL
+    assert payment.routing_decision == "AI Routing Decision (Live)"
+    assert payment_service.get_payment(payment.id) == payment
+
+def test_create_charge_async_unknown_customer(payment_service):
+    charge = PaymentCreate(merchant_id="m1", customer_id="missing", amount=25.0, currency="USD")
+
+    with pytest.raises(KeyError):
+        asyncio.run(payment_service.create_charge_async(charge))
+
+def test_sync_processor_is_offloaded(payment_service):
+    """
+    Adapters without a native async client still work through the default contract.
+    """
+    charge = PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD", provider=PaymentProvider.ADYEN)
+
+    payment = asyncio.run(payment_service.create_charge_async(charge))
+
+    assert payment.provider == PaymentProvider.ADYEN
+    assert payment.provider_payment_id == "sync_1"
+    assert payment_service.processor_registry.get_processor(PaymentProvider.ADYEN).calls == 1
+
+def test_find_best_route_async_matches_sync():
+    service = RoutingService(
+        fee_service=FeeService(),
+        performance_repository=RoutingPerformanceRepository(InMemoryKeyValueStore())
+    )
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=100.0, currency="USD")
+
+    assert asyncio.run(service.find_best_route_async(payment)) == service.find_best_route(payment)
+
+def test_feedback_is_collected_off_the_event_loop(payment_service):
+    threads = []
+
+    class RecordingCollector:
+        def collect(self, payment):
+            threads.append(threading.get_ident())
+
+    payment_service.feedback_collector = RecordingCollector()
+    charge = PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")
+
+    async def charge_and_loop_thread():
+        await payment_service.create_charge_async(charge)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(charge_and_loop_thread())
+
+    assert len(threads) == 1
+    assert threads[0] != loop_thread
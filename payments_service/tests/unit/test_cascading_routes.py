@@ -0,0 +1,257 @@
+import asyncio
+import httpx
+import pytest
+from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider, PaymentStatus
+from payments_service.app.core.models.merchant import Merchant
+from payments_service.app.core.models.customer import Customer
+from payments_service.app.core.repositories.datastore import InMemoryRelationalStore, InMemoryKeyValueStore
+from payments_service.app.core.repositories.merchant_repository import MerchantRepository
+from payments_service.app.core.repositories.customer_repository import CustomerRepository
+from payments_service.app.core.repositories.payment_repository import PaymentRepository
+from payments_service.app.core.services.payment_service import PaymentService
+from payments_service.app.core.services.cascade import CascadingExecutor, is_retryable
+from payments_service.app.routing.preprocessing.service import RoutingService, FeeService
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository
+from payments_service.app.routing.decisioning.decision_strategies import DeterministicLeastCostStrategy, FixedProviderStrategy
+from payments_service.app.processors.circuit_breaker import CircuitState
+from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeResponse, ProcessorStatus
+
+class ScriptedProcessor(PaymentProcessor):
+    """
+    Processor returning a fixed outcome (or raising), recording idempotency keys.
+    """
+    def __init__(self, name: str, error_code: str = None, raises: Exception = None):
+        self.name = name
+        self.error_code = error_code
+        self.raises = raises
+        self.idempotency_keys = []
+
+    def process_charge(self, request):
+        self.idempotency_keys.append(request.idempotency_key)
+        if self.raises:
+            raise self.raises
+        if self.error_code:
+            return InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code=self.error_code)
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS, processor_transaction_id=f"{self.name}_tx")
+
+    def refund(self, processor_transaction_id, amount):
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
+
+    @property
+    def provider_name(self) -> str:
+        return self.name
+
+class CountingStrategy(DeterministicLeastCostStrategy):
+    def __init__(self):
+        self.rankings = 0
+
+    def rank_compiled(self, payment_in, routes):
+        self.rankings += 1
+        return super().rank_compiled(payment_in, routes)
+
+def routing_service(strategy=None):
+    return RoutingService(
+        fee_service=FeeService(),
+        performance_repository=RoutingPerformanceRepository(InMemoryKeyValueStore()),
+        strategy=strategy
+    )
+
+def test_ranked_routes_are_ordered_by_score():
+    service = routing_service()
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=100.0, currency="USD")
+
+    ranked = service.find_ranked_routes(payment)
+
+    assert ranked[0].provider == service.find_best_route(payment)
+    scores = [r.score for r in ranked]
+    assert scores == sorted(scores)
+    assert {r.provider for r in ranked} == {PaymentProvider.STRIPE, PaymentProvider.PAYPAL, PaymentProvider.BRAINTREE, PaymentProvider.INTERNAL}
+    assert asyncio.run(service.find_ranked_routes_async(payment)) == ranked
+
+def test_fixed_strategy_ranks_its_provider_first():
+    service = routing_service(FixedProviderStrategy(PaymentProvider.PAYPAL))
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=100.0, currency="USD")
+
+    ranked = service.find_ranked_routes(payment)
+
+    assert ranked[0].provider == PaymentProvider.PAYPAL
+    assert [r.score for r in ranked[1:]] == sorted(r.score for r in ranked[1:])
+
+def test_explicit_provider_is_the_only_route():
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=100.0, currency="USD", provider=PaymentProvider.ADYEN)
+
+    assert [r.provider for r in routing_service().find_ranked_routes(payment)] == [PaymentProvider.ADYEN]
+
+def test_hard_declines_are_not_retried():
+    assert is_retryable(InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code="do_not_honor"))
+    assert is_retryable(InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code="processor_unavailable"))
+    assert is_retryable(InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code="circuit_open"))
+    assert not is_retryable(InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code="stolen_card"))
+    assert not is_retryable(InternalChargeResponse(
+        status=ProcessorStatus.FAILURE, error_code="card_declined", raw_response={"error": {"decline_code": "fraudulent"}}
+    ))
+    assert not is_retryable(InternalChargeResponse(status=ProcessorStatus.SUCCESS))
+
+def test_unknown_outcomes_are_not_retried():
+    # The first processor may have captured these
+    assert not is_retryable(InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code="processor_error"))
+    assert not is_retryable(InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code="processor_timeout"))
+    assert not is_retryable(InternalChargeResponse(status=ProcessorStatus.PENDING))
+
+class StaticHealth:
+    def __init__(self, **statuses):
+        self.statuses = statuses
+
+    def snapshot(self):
+        return self.statuses
+
+    async def snapshot_async(self):
+        return self.statuses
+
+def build_service(processors, strategy, max_attempts=3):
+    merchant_repo = MerchantRepository(InMemoryRelationalStore())
+    customer_repo = CustomerRepository(InMemoryRelationalStore())
+    merchant_repo.save(Merchant(
+        id="m1", name="Test Merchant", email="m@example.com", mcc="5411",
+        country="US", currency="USD", tax_id="TAX123"
+    ))
+    customer_repo.save(Customer(id="c1", merchant_id="m1", email="c@example.com", payment_method_token="tok_visa"))
+
+    registry = ProcessorRegistry()
+    for provider, processor in processors.items():
+        registry.register(provider, processor)
+
+    return PaymentService(
+        payment_repo=PaymentRepository(InMemoryRelationalStore()),
+        merchant_repo=merchant_repo,
+        customer_repo=customer_repo,
+        routing_service=routing_service(strategy),
+        processor_registry=registry,
+        cascading_executor=CascadingExecutor(max_attempts=max_attempts)
+    )
+
+# For $25 USD the static fee schedule ranks internal < stripe < braintree < paypal
+CHARGE = dict(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")
+
+def test_soft_decline_cascades_without_rerouting():
+    strategy = CountingStrategy()
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", error_code="do_not_honor"),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe", raises=ConnectionRefusedError("processor unreachable")),
+        PaymentProvider.BRAINTREE: ScriptedProcessor("braintree")
+    }
+    service = build_service(processors, strategy)
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.provider == PaymentProvider.BRAINTREE
+    assert payment.provider_payment_id == "braintree_tx"
+    assert payment.routing_decision.endswith("Cascaded to braintree after internal, stripe failed")
+    assert strategy.rankings == 1
+    assert [p.idempotency_keys for p in processors.values()] == [
+        [f"{payment.id}:internal"], [f"{payment.id}:stripe"], [f"{payment.id}:braintree"]
+    ]
+    assert service.cascading_executor.stats() == {"charges": 1, "cascaded": 1, "recovered": 1, "unknown_outcomes": 0}
+
+def test_hard_decline_stops_the_cascade():
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", error_code="stolen_card"),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe")
+    }
+    service = build_service(processors, DeterministicLeastCostStrategy())
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+
+    assert payment.status == PaymentStatus.FAILED
+    assert payment.provider == PaymentProvider.INTERNAL
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == []
+
+def test_cascade_is_bounded_by_max_attempts():
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", error_code="try_again_later"),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe", error_code="try_again_later"),
+        PaymentProvider.BRAINTREE: ScriptedProcessor("braintree")
+    }
+    service = build_service(processors, DeterministicLeastCostStrategy(), max_attempts=2)
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+
+    assert payment.status == PaymentStatus.FAILED
+    assert payment.provider == PaymentProvider.STRIPE
+    assert processors[PaymentProvider.BRAINTREE].idempotency_keys == []
+
+def test_async_charge_cascades():
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", raises=ConnectionRefusedError("processor unreachable")),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe")
+    }
+    service = build_service(processors, DeterministicLeastCostStrategy())
+
+    payment = asyncio.run(service.create_charge_async(PaymentCreate(**CHARGE)))
+
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.provider == PaymentProvider.STRIPE
+
+def test_unregistered_routes_are_skipped():
+    processors = {PaymentProvider.BRAINTREE: ScriptedProcessor("braintree")}
+    service = build_service(processors, DeterministicLeastCostStrategy())
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+
+    assert payment.provider == PaymentProvider.BRAINTREE
+
+def test_no_registered_route_raises():
+    service = build_service({}, DeterministicLeastCostStrategy())
+
+    with pytest.raises(ValueError):
+        service.create_charge(PaymentCreate(**CHARGE))
+
+def test_unknown_outcome_stops_the_cascade():
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", raises=httpx.ReadTimeout("no answer")),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe")
+    }
+    service = build_service(processors, DeterministicLeastCostStrategy())
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+
+    assert payment.status == PaymentStatus.PENDING
+    assert payment.provider == PaymentProvider.INTERNAL
+    assert payment.routing_decision.endswith("Outcome unknown on internal; needs reconciliation")
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == []
+    assert service.cascading_executor.stats()["unknown_outcomes"] == 1
+
+def test_fallbacks_reported_down_are_skipped():
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", error_code="do_not_honor"),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe"),
+        PaymentProvider.BRAINTREE: ScriptedProcessor("braintree")
+    }
+    service = build_service(processors, DeterministicLeastCostStrategy())
+    # The default compiled path never attaches provider_health to the charge
+    service.routing_service.health_cache = StaticHealth(stripe="down")
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+    assert payment.provider == PaymentProvider.BRAINTREE
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == []
+
+    payment = asyncio.run(service.create_charge_async(PaymentCreate(**CHARGE)))
+    assert payment.provider == PaymentProvider.BRAINTREE
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == []
+
+def test_fallbacks_with_open_circuits_are_skipped():
+    processors = {
+        PaymentProvider.INTERNAL: ScriptedProcessor("internal", error_code="do_not_honor"),
+        PaymentProvider.STRIPE: ScriptedProcessor("stripe"),
+        PaymentProvider.BRAINTREE: ScriptedProcessor("braintree")
+    }
+    service = build_service(processors, DeterministicLeastCostStrategy())
+    service.processor_registry.get_breaker(PaymentProvider.STRIPE).apply_remote_state(CircuitState.OPEN)
+
+    payment = service.create_charge(PaymentCreate(**CHARGE))
+
+    assert payment.provider == PaymentProvider.BRAINTREE
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == []
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import braintree
+import httpx
+import pytest
+import stripe
+from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.app.routing.preprocessing.service import RoutingService, FeeService
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository
+from payments_service.app.processors.circuit_breaker import CircuitBreaker, CircuitBreakingProcessor, CircuitState
+from payments_service.app.processors.adapters.braintree_adapter import BraintreeProcessor
+from payments_service.app.processors.adapters.paypal_adapter import PayPalProcessor
+from payments_service.app.processors.adapters.stripe_adapter import StripeProcessor
+from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
+from payments_service.app.processors.errors import is_unknown_outcome
+from payments_service.app.core.services.cascade import is_retryable
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RecordingRedis:
+    """
+    Captures what the registry writes and publishes.
+    """
+    def __init__(self):
+        self.values = {}
+        self.published = []
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+class OutcomeProcessor(PaymentProcessor):
+    def __init__(self, error_code: str = None):
+        self.error_code = error_code
+        self.charges = 0
+        self.refunds = 0
+
+    def process_charge(self, request):
+        self.charges += 1
+        if self.error_code:
+            return InternalChargeResponse(status=ProcessorStatus.FAILURE, error_code=self.error_code)
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS, processor_transaction_id="tx_1")
+
+    def refund(self, processor_transaction_id, amount):
+        self.refunds += 1
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
+
+    @property
+    def provider_name(self) -> str:
+        return "outcome"
+
+REQUEST = InternalChargeRequest(amount=10.0, currency="USD", merchant_id="m1", customer_id="c1", payment_method_token="tok")
+
+def breaker(clock, **kwargs):
+    return CircuitBreaker("stripe", failure_rate_threshold=0.5, window_size=10, min_calls=4, open_seconds=30, clock=clock, **kwargs)
+
+def test_opens_on_error_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    cb = breaker(clock)
+
+    for failed in (False, True, False):
+        cb.record(failed, 100)
+    assert cb.state == CircuitState.CLOSED # below min_calls
+    cb.record(True, 100)
+    assert cb.state == CircuitState.OPEN
+    assert not cb.allow_request()
+
+    clock.now = 30
+    assert cb.allow_request() # the single half-open probe
+    assert cb.state == CircuitState.HALF_OPEN
+    assert not cb.allow_request()
+    cb.record(False, 100)
+    assert cb.state == CircuitState.CLOSED
+    assert cb.snapshot()["calls"] == 0
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    cb = breaker(clock)
+    for _ in range(4):
+        cb.record(True, 100)
+
+    clock.now = 30
+    assert cb.allow_request()
+    cb.record(True, 100)
+
+    assert cb.state == CircuitState.OPEN
+    clock.now = 59
+    assert not cb.allow_request()
+
+def test_slow_calls_count_as_failures():
+    cb = breaker(FakeClock(), slow_call_ms=1000)
+    for _ in range(4):
+        cb.record(False, 1500)
+
+    assert cb.state == CircuitState.OPEN
+
+def test_rolling_window_forgets_old_failures():
+    cb = breaker(FakeClock())
+    for failed in (False,) * 4 + (True, True) + (False,) * 10:
+        cb.record(failed, 100)
+
+    assert cb.state == CircuitState.CLOSED
+    assert cb.snapshot()["error_rate"] == 0.0
+
+def test_registry_trips_on_technical_errors_only():
+    clock = FakeClock()
+    registry = ProcessorRegistry(breaker_factory=lambda name, **kw: CircuitBreaker(name, min_calls=4, window_size=10, clock=clock, **kw))
+    declining, failing = OutcomeProcessor("card_declined"), OutcomeProcessor("processor_error")
+    registry.register(PaymentProvider.ADYEN, declining)
+    registry.register(PaymentProvider.STRIPE, failing)
+
+    for _ in range(4):
+        registry.get_processor(PaymentProvider.ADYEN).process_charge(REQUEST)
+        registry.get_processor(PaymentProvider.STRIPE).process_charge(REQUEST)
+
+    assert registry.is_available(PaymentProvider.ADYEN)
+    assert not registry.is_available(PaymentProvider.STRIPE)
+
+    # Open circuit: the adapter isn't called, but refunds still go through
+    response = registry.get_processor(PaymentProvider.STRIPE).process_charge(REQUEST)
+    assert response.error_code == "circuit_open"
+    assert failing.charges == 4
+    registry.get_processor(PaymentProvider.STRIPE).refund("tx_1", None)
+    assert failing.refunds == 1
+    assert registry.circuit_states()["stripe"]["state"] == "open"
+
+def test_routing_skips_open_circuits():
+    registry = ProcessorRegistry()
+    for provider in (PaymentProvider.INTERNAL, PaymentProvider.STRIPE):
+        registry.register(provider, OutcomeProcessor())
+    service = RoutingService(
+        fee_service=FeeService(),
+        performance_repository=RoutingPerformanceRepository(InMemoryKeyValueStore()),
+        processor_registry=registry
+    )
+    payment = PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")
+    assert service.find_best_route(payment) == PaymentProvider.INTERNAL
+
+    registry.get_breaker(PaymentProvider.INTERNAL).apply_remote_state(CircuitState.OPEN)
+
+    assert service.find_best_route(payment) == PaymentProvider.STRIPE
+    assert PaymentProvider.INTERNAL not in [r.provider for r in service.find_ranked_routes(payment)]
+
+def test_state_changes_are_published_and_applied_remotely():
+    redis_a, redis_b = RecordingRedis(), RecordingRedis()
+    node_a = ProcessorRegistry(redis_client=redis_a, breaker_factory=lambda name, **kw: CircuitBreaker(name, min_calls=2, **kw))
+    node_b = ProcessorRegistry(redis_client=redis_b)
+    for registry in (node_a, node_b):
+        registry.register(PaymentProvider.STRIPE, OutcomeProcessor("processor_error"))
+
+    for _ in range(2):
+        node_a.get_processor(PaymentProvider.STRIPE).process_charge(REQUEST)
+
+    assert redis_a.values == {"circuit_breaker:stripe": "open"}
+    channel, event = redis_a.published[-1]
+    assert (channel, event["provider"], event["state"]) == (ProcessorRegistry.CIRCUIT_CHANNEL, "stripe", "open")
+
+    node_b._on_remote_state({"data": json.dumps(event).encode()})
+    assert not node_b.is_available(PaymentProvider.STRIPE)
+    # Adopting remote state is not re-published
+    assert redis_b.published == []
+    # A node ignores its own messages
+    node_a._on_remote_state({"data": json.dumps({**event, "state": "closed"})})
+    assert not node_a.is_available(PaymentProvider.STRIPE)
+
+def trips_after_four_charges(processor) -> CircuitBreaker:
+    cb = breaker(FakeClock())
+    wrapped = CircuitBreakingProcessor(processor, cb)
+    for _ in range(4):
+        response = wrapped.process_charge(REQUEST)
+        assert response.status == ProcessorStatus.FAILURE
+    return cb
+
+@pytest.mark.parametrize("error, code", [
+    (stripe.error.APIConnectionError("Network error"), "processor_timeout"),
+    (stripe.error.APIError("Internal error", http_status=500), "processor_error"),
+    (stripe.error.APIError("Unavailable", http_status=503), "processor_unavailable"),
+    (stripe.error.RateLimitError("Too many requests", http_status=429), "rate_limited"),
+])
+def test_stripe_outages_trip_the_breaker(monkeypatch, error, code):
+    def create(**params):
+        raise error
+    monkeypatch.setattr(stripe.PaymentIntent, "create", create)
+    processor = StripeProcessor(api_key="sk_test_live_mode")
+
+    assert processor.process_charge(REQUEST).error_code == code
+    assert trips_after_four_charges(processor).state == CircuitState.OPEN
+
+def test_stripe_card_declines_do_not_trip_the_breaker(monkeypatch):
+    def create(**params):
+        raise stripe.error.CardError("Your card was declined", param=None, code="card_declined")
+    monkeypatch.setattr(stripe.PaymentIntent, "create", create)
+
+    assert trips_after_four_charges(StripeProcessor(api_key="sk_test_live_mode")).state == CircuitState.CLOSED
+
+def paypal(handler) -> PayPalProcessor:
+    def route(request):
+        if request.url.path == "/v1/oauth2/token":
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 3600})
+        return handler(request)
+    processor = PayPalProcessor(client_id="id", secret="secret")
+    processor._client = httpx.Client(transport=httpx.MockTransport(route))
+    return processor
+
+def test_paypal_outages_trip_the_breaker():
+    unavailable = paypal(lambda request: httpx.Response(503, json={"message": "Service Unavailable"}))
+    assert unavailable.process_charge(REQUEST).error_code == "processor_unavailable"
+    assert trips_after_four_charges(unavailable).state == CircuitState.OPEN
+
+    def refused(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+    assert paypal(refused).process_charge(REQUEST).error_code == "processor_unavailable"
+    assert trips_after_four_charges(paypal(refused)).state == CircuitState.OPEN
+
+def test_paypal_declines_do_not_trip_the_breaker():
+    declined = paypal(lambda request: httpx.Response(422, json={"name": "UNPROCESSABLE_ENTITY", "message": "Declined"}))
+
+    assert declined.process_charge(REQUEST).error_code is None
+    assert trips_after_four_charges(declined).state == CircuitState.CLOSED
+
+def test_paypal_token_failures_are_not_unknown_outcomes():
+    charges = []
+    def route(request):
+        if request.url.path == "/v1/oauth2/token":
+            if request.headers.get("X-Fail") == "timeout":
+                raise httpx.ReadTimeout("token endpoint timed out", request=request)
+            return httpx.Response(500, json={"error": "server_error"})
+        charges.append(request)
+        return httpx.Response(201, json={"id": "order_1"})
+
+    failing = PayPalProcessor(client_id="id", secret="secret")
+    failing._client = httpx.Client(transport=httpx.MockTransport(route))
+    timing_out = PayPalProcessor(client_id="id", secret="secret")
+    timing_out._client = httpx.Client(transport=httpx.MockTransport(route), headers={"X-Fail": "timeout"})
+
+    for processor in (failing, timing_out):
+        response = processor.process_charge(REQUEST)
+        # No charge request went out: retry elsewhere instead of reconciling
+        assert response.error_code == "processor_unavailable"
+        assert is_retryable(response) and not is_unknown_outcome(response)
+        assert asyncio.run(processor.process_charge_async(REQUEST)).error_code == "processor_unavailable"
+    assert charges == []
+
+def test_braintree_outages_trip_the_breaker(monkeypatch):
+    processor = BraintreeProcessor(merchant_id="m", public_key="pub", private_key="priv")
+    def sale(params):
+        raise braintree.exceptions.ServiceUnavailableError()
+    monkeypatch.setattr(processor.gateway.transaction, "sale", sale)
+
+    assert processor.process_charge(REQUEST).error_code == "processor_unavailable"
+    assert trips_after_four_charges(processor).state == CircuitState.OPEN
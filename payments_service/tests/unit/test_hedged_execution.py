@@ -0,0 +1,321 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from payments_service.app.core.models.payment import PaymentCreate, PaymentProvider, PaymentStatus
+from payments_service.app.core.models.merchant import Merchant
+from payments_service.app.core.models.customer import Customer
+from payments_service.app.core.repositories.datastore import InMemoryRelationalStore, InMemoryKeyValueStore
+from payments_service.app.core.repositories.merchant_repository import MerchantRepository
+from payments_service.app.core.repositories.customer_repository import CustomerRepository
+from payments_service.app.core.repositories.payment_repository import PaymentRepository
+from payments_service.app.core.services.payment_service import PaymentService
+from payments_service.app.core.services.hedging import HedgingPolicy, HedgedExecutor
+from payments_service.app.core.services.cascade import CascadingExecutor
+from payments_service.app.processors.errors import is_unknown_outcome
+from payments_service.app.routing.preprocessing.service import RoutingService, FeeService
+from payments_service.app.routing.decisioning import RoutingPerformanceRepository
+from payments_service.app.routing.decisioning.decision_strategies import FixedProviderStrategy
+from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.processors.interfaces import PaymentProcessor
+from payments_service.app.processors.models import InternalChargeRequest, InternalChargeResponse, ProcessorStatus
+
+class DelayedProcessor(PaymentProcessor):
+    """
+    Processor answering after a fixed delay, recording charges and refunds.
+    """
+    def __init__(self, name: str, delay: float = 0.0, status: ProcessorStatus = ProcessorStatus.SUCCESS, raises: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.status = status
+        self.raises = raises
+        self.idempotency_keys = []
+        self.refunded = []
+        self._lock = threading.Lock()
+
+    def process_charge(self, request):
+        with self._lock:
+            self.idempotency_keys.append(request.idempotency_key)
+        time.sleep(self.delay)
+        if self.raises:
+            raise self.raises
+        return InternalChargeResponse(status=self.status, processor_transaction_id=f"{self.name}_tx")
+
+    async def process_charge_async(self, request):
+        self.idempotency_keys.append(request.idempotency_key)
+        await asyncio.sleep(self.delay)
+        if self.raises:
+            raise self.raises
+        return InternalChargeResponse(status=self.status, processor_transaction_id=f"{self.name}_tx")
+
+    def refund(self, processor_transaction_id, amount):
+        with self._lock:
+            self.refunded.append(processor_transaction_id)
+        return InternalChargeResponse(status=ProcessorStatus.SUCCESS)
+
+    @property
+    def provider_name(self) -> str:
+        return self.name
+
+def charge_request():
+    return InternalChargeRequest(
+        amount=10.0, currency="USD", merchant_id="m1", customer_id="c1",
+        payment_method_token="tok", idempotency_key="pay_1"
+    )
+
+def test_fast_primary_is_not_hedged():
+    executor = HedgedExecutor()
+    primary, backup = DelayedProcessor("stripe"), DelayedProcessor("adyen")
+
+    result = executor.execute((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=500)
+
+    assert result.provider == PaymentProvider.STRIPE
+    assert not result.hedged
+    assert backup.idempotency_keys == []
+    assert executor.stats()["hedges_issued"] == 0
+
+def test_slow_primary_loses_to_backup_and_is_voided():
+    executor = HedgedExecutor()
+    primary, backup = DelayedProcessor("stripe", delay=0.3), DelayedProcessor("adyen")
+
+    result = executor.execute((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+    executor.close(wait=True)
+
+    assert result.provider == PaymentProvider.ADYEN
+    assert result.hedged
+    assert result.response.processor_transaction_id == "adyen_tx"
+    # Each attempt is idempotent on its own processor
+    assert primary.idempotency_keys == ["pay_1:stripe"]
+    assert backup.idempotency_keys == ["pay_1:adyen"]
+    assert primary.refunded == ["stripe_tx"]
+    assert backup.refunded == []
+    assert executor.stats() == {"charges": 1, "hedges_issued": 1, "backup_wins": 1, "losers_voided": 1, "void_failures": 0, "needs_reconciliation": 0}
+
+def test_failed_backup_waits_for_primary():
+    executor = HedgedExecutor()
+    primary = DelayedProcessor("stripe", delay=0.1)
+    backup = DelayedProcessor("adyen", status=ProcessorStatus.FAILURE)
+
+    result = executor.execute((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=10)
+
+    assert result.provider == PaymentProvider.STRIPE
+    assert result.response.status == ProcessorStatus.SUCCESS
+    assert primary.refunded == []
+
+def test_both_failing_returns_primary_failure():
+    executor = HedgedExecutor()
+    primary = DelayedProcessor("stripe", delay=0.05, status=ProcessorStatus.FAILURE)
+    backup = DelayedProcessor("adyen", status=ProcessorStatus.FAILURE)
+
+    result = executor.execute((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=10)
+
+    assert result.provider == PaymentProvider.STRIPE
+    assert result.response.status == ProcessorStatus.FAILURE
+
+def declined_primary_and_timed_out_backup():
+    return [
+        (PaymentProvider.STRIPE, DelayedProcessor("stripe", delay=0.3, status=ProcessorStatus.FAILURE)),
+        (PaymentProvider.ADYEN, DelayedProcessor("adyen", delay=0.05, raises=httpx.ReadTimeout("no answer"))),
+        (PaymentProvider.BRAINTREE, DelayedProcessor("braintree"))
+    ]
+
+def test_unknown_hedge_attempt_stops_the_cascade():
+    candidates = declined_primary_and_timed_out_backup()
+    cascade = CascadingExecutor(max_attempts=3, hedged_executor=HedgedExecutor())
+
+    result = cascade.execute(candidates, charge_request(), hedge_delay_ms=50)
+
+    # Adyen may have captured: charging braintree could take the payment twice
+    assert result.provider == PaymentProvider.ADYEN
+    assert is_unknown_outcome(result.response)
+    assert [p for p, _ in result.attempts] == [PaymentProvider.STRIPE, PaymentProvider.ADYEN]
+    assert result.hedged_providers == [PaymentProvider.STRIPE, PaymentProvider.ADYEN]
+    assert candidates[2][1].idempotency_keys == []
+
+def test_async_unknown_hedge_attempt_stops_the_cascade():
+    candidates = declined_primary_and_timed_out_backup()
+    cascade = CascadingExecutor(max_attempts=3, hedged_executor=HedgedExecutor())
+
+    result = asyncio.run(cascade.execute_async(candidates, charge_request(), hedge_delay_ms=50))
+
+    assert result.provider == PaymentProvider.ADYEN
+    assert [p for p, _ in result.attempts] == [PaymentProvider.STRIPE, PaymentProvider.ADYEN]
+    assert candidates[2][1].idempotency_keys == []
+    assert cascade.stats()["unknown_outcomes"] == 1
+
+def test_declined_hedge_pair_cascades_with_both_attempts_recorded():
+    candidates = [
+        (PaymentProvider.STRIPE, DelayedProcessor("stripe", delay=0.1, status=ProcessorStatus.FAILURE)),
+        (PaymentProvider.ADYEN, DelayedProcessor("adyen", delay=0.05, status=ProcessorStatus.FAILURE)),
+        (PaymentProvider.BRAINTREE, DelayedProcessor("braintree"))
+    ]
+    cascade = CascadingExecutor(max_attempts=3, hedged_executor=HedgedExecutor())
+
+    result = cascade.execute(candidates, charge_request(), hedge_delay_ms=20)
+
+    assert result.provider == PaymentProvider.BRAINTREE
+    assert {p for p, _ in result.attempts[:2]} == {PaymentProvider.STRIPE, PaymentProvider.ADYEN}
+    assert result.attempts[2][0] == PaymentProvider.BRAINTREE
+    assert cascade.stats()["cascaded"] == 1
+
+def test_async_hedge_voids_the_loser():
+    executor = HedgedExecutor()
+    primary, backup = DelayedProcessor("stripe", delay=0.2), DelayedProcessor("adyen")
+
+    async def run():
+        result = await executor.execute_async((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+        # Let the primary finish so its void runs before the loop closes
+        await asyncio.sleep(0.3)
+        return result
+
+    result = asyncio.run(run())
+
+    assert result.provider == PaymentProvider.ADYEN
+    assert primary.refunded == ["stripe_tx"]
+    assert executor.stats()["losers_voided"] == 1
+
+def test_aclose_waits_for_losers_to_be_voided():
+    executor = HedgedExecutor()
+    primary, backup = DelayedProcessor("stripe", delay=0.2), DelayedProcessor("adyen")
+
+    async def run():
+        result = await executor.execute_async((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+        await executor.aclose(timeout=1.0)
+        return result
+
+    assert asyncio.run(run()).provider == PaymentProvider.ADYEN
+    assert primary.refunded == ["stripe_tx"]
+
+def test_aclose_is_bounded():
+    executor = HedgedExecutor()
+    primary, backup = DelayedProcessor("stripe", delay=1.0), DelayedProcessor("adyen")
+
+    async def run():
+        await executor.execute_async((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+        started = time.perf_counter()
+        await executor.aclose(timeout=0.05)
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 0.5
+    assert primary.refunded == []
+
+def test_loser_with_unknown_outcome_needs_reconciliation():
+    executor = HedgedExecutor()
+    # Read timeout after the request reached the processor: it may have captured
+    primary = DelayedProcessor("stripe", delay=0.1, raises=httpx.ReadTimeout("no answer"))
+    backup = DelayedProcessor("adyen")
+
+    result = executor.execute((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+    executor.close(wait=True)
+
+    assert result.provider == PaymentProvider.ADYEN
+    assert primary.refunded == []
+    assert executor.stats()["needs_reconciliation"] == 1
+    assert executor.stats()["losers_voided"] == 0
+
+def test_async_pending_loser_needs_reconciliation():
+    executor = HedgedExecutor()
+    primary = DelayedProcessor("stripe", delay=0.1, status=ProcessorStatus.PENDING)
+    backup = DelayedProcessor("adyen")
+
+    async def run():
+        result = await executor.execute_async((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+        await asyncio.sleep(0.2)
+        return result
+
+    result = asyncio.run(run())
+
+    assert result.provider == PaymentProvider.ADYEN
+    assert executor.stats()["needs_reconciliation"] == 1
+
+def test_declined_loser_is_not_reconciled():
+    executor = HedgedExecutor()
+    primary = DelayedProcessor("stripe", delay=0.1, status=ProcessorStatus.FAILURE)
+    backup = DelayedProcessor("adyen")
+
+    executor.execute((PaymentProvider.STRIPE, primary), (PaymentProvider.ADYEN, backup), charge_request(), delay_ms=20)
+    executor.close(wait=True)
+
+    assert executor.stats()["needs_reconciliation"] == 0
+
+def test_hedge_delay_is_clamped():
+    policy = HedgingPolicy(merchant_ids=["m1"], latency_multiplier=2.0, min_delay_ms=50, max_delay_ms=1000)
+
+    assert policy.hedge_delay_ms(200) == 400
+    assert policy.hedge_delay_ms(10) == 50
+    assert policy.hedge_delay_ms(5000) == 1000
+    assert policy.applies_to("m1") and not policy.applies_to("m2")
+    assert HedgingPolicy(merchant_ids=["*"]).applies_to("anyone")
+
+def test_policy_from_env_is_off_without_merchants(monkeypatch):
+    monkeypatch.delenv("HEDGED_MERCHANT_IDS", raising=False)
+    assert HedgingPolicy.from_env() is None
+
+    monkeypatch.setenv("HEDGED_MERCHANT_IDS", "m1, m2")
+    assert HedgingPolicy.from_env().merchant_ids == {"m1", "m2"}
+
+@pytest.fixture
+def processors():
+    return {
+        PaymentProvider.INTERNAL: DelayedProcessor("internal", delay=0.3),
+        PaymentProvider.STRIPE: DelayedProcessor("stripe")
+    }
+
+def build_service(processors, policy):
+    merchant_repo = MerchantRepository(InMemoryRelationalStore())
+    customer_repo = CustomerRepository(InMemoryRelationalStore())
+    for merchant_id in ("m1", "m2"):
+        merchant_repo.save(Merchant(
+            id=merchant_id, name="Test Merchant", email="m@example.com", mcc="5411",
+            country="US", currency="USD", tax_id=f"TAX-{merchant_id}"
+        ))
+    customer_repo.save(Customer(id="c1", merchant_id="m1", email="c@example.com", payment_method_token="tok_visa"))
+
+    registry = ProcessorRegistry()
+    for provider, processor in processors.items():
+        registry.register(provider, processor)
+
+    return PaymentService(
+        payment_repo=PaymentRepository(InMemoryRelationalStore()),
+        merchant_repo=merchant_repo,
+        customer_repo=customer_repo,
+        routing_service=RoutingService(
+            fee_service=FeeService(),
+            performance_repository=RoutingPerformanceRepository(InMemoryKeyValueStore()),
+            strategy=FixedProviderStrategy(PaymentProvider.INTERNAL)
+        ),
+        processor_registry=registry,
+        # Default performance data reports 300ms average latency
+        hedging_policy=policy
+    )
+
+def test_create_charge_hedges_for_opted_in_merchant(processors):
+    service = build_service(processors, HedgingPolicy(merchant_ids=["m1"], latency_multiplier=0.1, min_delay_ms=10))
+
+    payment = service.create_charge(PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD"))
+    service.hedged_executor.close(wait=True)
+
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.provider == PaymentProvider.STRIPE
+    assert payment.provider_payment_id == "stripe_tx"
+    assert "Hedged after 30ms across internal, stripe: stripe won" in payment.routing_decision
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == [f"{payment.id}:stripe"]
+    assert processors[PaymentProvider.INTERNAL].refunded == ["internal_tx"]
+
+def test_create_charge_async_hedges_for_opted_in_merchant(processors):
+    service = build_service(processors, HedgingPolicy(merchant_ids=["m1"], latency_multiplier=0.1, min_delay_ms=10))
+
+    payment = asyncio.run(service.create_charge_async(PaymentCreate(merchant_id="m1", customer_id="c1", amount=25.0, currency="USD")))
+
+    assert payment.provider == PaymentProvider.STRIPE
+    assert "Hedged" in payment.routing_decision
+
+def test_create_charge_not_hedged_for_other_merchants(processors):
+    service = build_service(processors, HedgingPolicy(merchant_ids=["m1"], latency_multiplier=0.1, min_delay_ms=10))
+
+    payment = service.create_charge(PaymentCreate(merchant_id="m2", customer_id="c1", amount=25.0, currency="USD"))
+
+    assert payment.provider == PaymentProvider.INTERNAL
+    assert processors[PaymentProvider.STRIPE].idempotency_keys == []
+    assert service.hedged_executor.stats()["charges"] == 0
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from payments_service.app.processors.adapters.paypal_adapter import PayPalProcessor
+from payments_service.app.processors.models import InternalChargeRequest
+from payments_service.app.processors.registry import ProcessorRegistry
+from payments_service.app.core.models.payment import PaymentProvider
+
+class PayPalStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+    disable_nagle_algorithm = True # headers and body are separate writes
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/v1/oauth2/token":
+            self._reply(200, {"access_token": "tok", "expires_in": 3600})
+        elif self.path.endswith("/capture"):
+            self._reply(201, {"purchase_units": [{"payments": {"captures": [{"id": "cap_1"}]}}]})
+        else:
+            self._reply(201, {"id": "order_1", "status": "CREATED"})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+@pytest.fixture
+def paypal_stub():
+    PayPalStubHandler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PayPalStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def _processor(base_url):
+    processor = PayPalProcessor(client_id="id", secret="secret")
+    processor.base_url = base_url
+    return processor
+
+def _request():
+    return InternalChargeRequest(amount=10.0, currency="USD", merchant_id="m1", customer_id="c1", payment_method_token="tok")
+
+def test_charges_reuse_one_connection(paypal_stub):
+    processor = _processor(paypal_stub)
+    for _ in range(3):
+        assert processor.process_charge(_request()).processor_transaction_id == "cap_1"
+
+    # Token + 3 x (create order + capture) over a single kept-alive connection
+    assert PayPalStubHandler.connections == 1
+
+    registry = ProcessorRegistry()
+    registry.register(PaymentProvider.PAYPAL, processor)
+    registry.close_all()
+    assert processor._client is None
+
+def test_async_charges_reuse_one_connection(paypal_stub):
+    processor = _processor(paypal_stub)
+
+    async def run():
+        for _ in range(3):
+            await processor.process_charge_async(_request())
+        await processor.aclose()
+
+    asyncio.run(run())
+    # The token is fetched single-flight on the sync client; charges share the async one
+    assert PayPalStubHandler.connections == 2
+    assert processor._async_client is None
+
+def test_async_client_is_closed_when_the_loop_changes():
+    processor = PayPalProcessor(client_id="id", secret="secret")
+
+    async def client():
+        return processor._async_http()
+
+    async def client_then_yield():
+        current = processor._async_http()
+        await asyncio.sleep(0.01) # let the replaced client finish closing
+        return current
+
+    first = asyncio.run(client())
+    second = asyncio.run(client_then_yield())
+
+    assert second is not first
+    assert first.is_closed
+    assert not second.is_closed
+
+    processor.close()
+    assert second.is_closed
+    assert processor._async_client is None
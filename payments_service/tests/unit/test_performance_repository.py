@@ -1,8 +1,14 @@
+import fnmatch
+import json
 import pytest
-from payments_service.app.routing.decisioning.repository import RoutingPerformanceRepository
+import redis
+from unittest.mock import MagicMock
+from payments_service.app.routing.decisioning.repository import RoutingPerformanceRepository, provider_field, redis_performance_store
 from payments_service.app.routing.decisioning.models import RoutingDimension, ProviderPerformance, PerformanceMetrics, CostStructure
 from payments_service.app.core.models.payment import PaymentProvider
-from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore
+from payments_service.app.core.repositories.datastore import InMemoryKeyValueStore, RedisKeyValueStore
+from payments_service.app.core.utils.cache import TTLCache
+from payments_service.app.core.repositories.migrations import migrate_routing_performance_keys
 
 def test_find_by_dimension_exact_match():
     store = InMemoryKeyValueStore()
@@ -81,3 +87,217 @@ def test_save_performance():
     assert len(results) == 1
     assert results[0].provider == PaymentProvider.INTERNAL
     assert results[0].metrics.auth_rate == 0.99
+
+def _stripe_perf(dim, auth_rate=0.9):
+    return ProviderPerformance(
+        provider=PaymentProvider.STRIPE,
+        dimension=dim,
+        metrics=PerformanceMetrics(
+            auth_rate=auth_rate, fraud_rate=0.01, avg_latency_ms=200,
+            cost_structure=CostStructure(variable_fee_percent=2.9, fixed_fee=0.3)
+        )
+    )
+
+def test_cached_reads_skip_the_store():
+    store = InMemoryKeyValueStore()
+    repo = RoutingPerformanceRepository(store, cache=TTLCache())
+    dim = RoutingDimension(payment_method_type="credit_card", currency="USD")
+    repo.save(_stripe_perf(dim))
+
+    # Mutate the store behind the repository's back: cached reads don't see it
+    store.set(repo._get_key(dim), [])
+    assert len(repo.find_by_dimension(dim)) == 1
+
+    repo.invalidate(dim)
+    assert repo.find_by_dimension(dim) == []
+
+def test_save_writes_through_cache():
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore(), cache=TTLCache())
+    dim = RoutingDimension(payment_method_type="credit_card", currency="USD")
+    assert repo.find_by_dimension(dim) == []
+
+    repo.save(_stripe_perf(dim, auth_rate=0.7))
+    assert repo.find_by_dimension(dim)[0].metrics.auth_rate == 0.7
+
+def test_remote_invalidation_message():
+    publisher = MagicMock()
+    repo = RoutingPerformanceRepository(InMemoryKeyValueStore(), cache=TTLCache(), pubsub_client=publisher)
+    dim = RoutingDimension(payment_method_type="credit_card", currency="USD")
+    repo.save(_stripe_perf(dim))
+
+    channel, message = publisher.publish.call_args.args
+    assert channel == RoutingPerformanceRepository.INVALIDATION_CHANNEL
+
+    # Our own broadcast is ignored
+    version = repo.version
+    repo._on_invalidation({"data": message.encode()})
+    assert repo.version == version
+
+    # Another node's write evicts the entry
+    repo._on_invalidation({"data": f"other-node|{repo._get_key(dim)}".encode()})
+    assert repo.version == version + 1
+    assert repo._cache.get(dim) is None
+
+def test_save_many_groups_by_dimension():
+    store = InMemoryKeyValueStore()
+    repo = RoutingPerformanceRepository(store)
+    visa = RoutingDimension(payment_method_type="credit_card", network="visa")
+    mc = RoutingDimension(payment_method_type="credit_card", network="mastercard")
+    repo.save(_stripe_perf(visa, auth_rate=0.5))
+
+    adyen = _stripe_perf(visa).model_copy(update={"provider": PaymentProvider.ADYEN})
+    repo.save_many([_stripe_perf(visa, auth_rate=0.6), adyen, _stripe_perf(mc), _stripe_perf(visa, auth_rate=0.8)])
+
+    # Existing provider is replaced in place, later records in the batch win
+    assert [(p.provider, p.metrics.auth_rate) for p in repo.find_by_dimension(visa)] == [
+        (PaymentProvider.STRIPE, 0.8), (PaymentProvider.ADYEN, 0.9)
+    ]
+    assert len(repo.find_by_dimension(mc)) == 1
+    assert repo.version == 2
+
+def test_redis_hash_layout_upserts_in_one_pipeline():
+    client = MagicMock()
+    pipe = client.pipeline.return_value
+    dim = RoutingDimension(payment_method_type="credit_card")
+    perf = _stripe_perf(dim)
+    pipe.execute.return_value = [1, {b"stripe": perf.model_dump_json().encode()}]
+
+    store = RedisKeyValueStore(client, list, item_key=provider_field)
+    repo = RoutingPerformanceRepository(store, cache=TTLCache())
+    repo.save_many([perf])
+
+    pipe.hset.assert_called_once_with(repo._get_key(dim), mapping={"stripe": perf.model_dump_json()})
+    pipe.execute.assert_called_once()
+    client.get.assert_not_called()
+    # Merged hash read back in the same round-trip feeds the cache
+    assert repo.find_by_dimension(dim) == [perf]
+
+def test_redis_hash_layout_reads_legacy_json_values():
+    client = MagicMock()
+    dim = RoutingDimension(payment_method_type="credit_card")
+    perf = _stripe_perf(dim)
+    client.pipeline.return_value.execute.return_value = [redis.ResponseError("WRONGTYPE")]
+    client.get.return_value = json.dumps([perf.model_dump(mode="json")]).encode()
+
+    store = RedisKeyValueStore(client, list, item_key=provider_field)
+    assert store.get("legacy") == [perf]
+
+def test_redis_iter_all_scans_namespace_in_batches():
+    client = MagicMock()
+    dim = RoutingDimension(payment_method_type="credit_card")
+    perf = _stripe_perf(dim)
+    client.scan_iter.return_value = iter([b"routing_performance:a", b"routing_performance:b", b"routing_performance:c"])
+    client.mget.side_effect = lambda keys: [json.dumps([perf.model_dump(mode="json")]).encode() for _ in keys]
+
+    store = RedisKeyValueStore(client, list, namespace="routing_performance")
+    repo = RoutingPerformanceRepository(store)
+    assert list(repo.iter_all(batch_size=2)) == [perf, perf, perf]
+
+    client.keys.assert_not_called()
+    client.scan_iter.assert_called_once_with(match="routing_performance:*", count=2)
+    assert [len(c.args[0]) for c in client.mget.call_args_list] == [2, 1]
+
+def test_redis_namespace_prefixes_keys():
+    client = MagicMock()
+    client.get.return_value = None
+    store = RedisKeyValueStore(client, list, namespace="routing_performance")
+    store.get("k")
+    store.delete("k")
+    client.get.assert_called_once_with("routing_performance:k")
+    client.delete.assert_called_once_with("routing_performance:k")
+
+class FakeRedis:
+    """
+    Just enough of redis.Redis (strings and hashes) to run the store against.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def _type(self, key):
+        value = self.data.get(key)
+        return None if value is None else ("hash" if isinstance(value, dict) else "string")
+
+    def scan_iter(self, match="*", count=None, _type=None):
+        return iter([k.encode() for k in list(self.data) if fnmatch.fnmatchcase(k, match) and (_type is None or self._type(k) == _type)])
+
+    def get(self, key):
+        key = key.decode() if isinstance(key, bytes) else key
+        if self._type(key) == "hash":
+            raise redis.ResponseError("WRONGTYPE")
+        return self.data.get(key)
+
+    def hgetall(self, key):
+        key = key.decode() if isinstance(key, bytes) else key
+        if self._type(key) == "string":
+            raise redis.ResponseError("WRONGTYPE")
+        return {f.encode(): v for f, v in self.data.get(key, {}).items()}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self, raise_on_error=True):
+        results = []
+        for name, args, kwargs in self.ops:
+            key = args[0].decode() if isinstance(args[0], bytes) else args[0]
+            data = self.client.data
+            try:
+                if name == "delete":
+                    results.append(int(data.pop(key, None) is not None))
+                elif name == "hsetnx":
+                    fields = data.setdefault(key, {})
+                    results.append(int(fields.setdefault(args[1], args[2]) is args[2]))
+                elif name == "hset":
+                    data.setdefault(key, {}).update(kwargs["mapping"])
+                    results.append(len(kwargs["mapping"]))
+                elif name == "set":
+                    if not (kwargs.get("nx") and key in data):
+                        data[key] = args[1]
+                    results.append(True)
+                else:
+                    results.append(getattr(self.client, name)(key))
+            except redis.ResponseError as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
+
+def test_legacy_performance_keys_are_migrated_into_the_namespace():
+    client = FakeRedis()
+    visa = RoutingDimension(payment_method_type="credit_card", card_network="visa")
+    mc = RoutingDimension(payment_method_type="credit_card", card_network="mastercard")
+    amex = RoutingDimension(payment_method_type="credit_card", card_network="amex")
+    old, newer = _stripe_perf(visa, auth_rate=0.5), _stripe_perf(visa, auth_rate=0.9)
+    adyen = ProviderPerformance(**{**_stripe_perf(visa).model_dump(), "provider": PaymentProvider.ADYEN})
+    # Written before namespacing: bare dimension JSON -> JSON list
+    client.data[visa.model_dump_json()] = json.dumps([old.model_dump(mode="json"), adyen.model_dump(mode="json")]).encode()
+    client.data[mc.model_dump_json()] = json.dumps([_stripe_perf(mc).model_dump(mode="json")]).encode()
+    # Namespaced, but from before the hash layout
+    client.data[f"routing_performance:{amex.model_dump_json()}"] = json.dumps([_stripe_perf(amex).model_dump(mode="json")]).encode()
+    client.data["provider_health:stripe"] = b"down"
+
+    repo = RoutingPerformanceRepository(redis_performance_store(client))
+    # Still readable before migrating
+    assert {p.dimension for p in repo.iter_all()} == {amex}
+    # Written after the upgrade, before the migration ran: kept over the legacy value
+    repo.save(newer)
+
+    assert migrate_routing_performance_keys(client) == 3
+    assert migrate_routing_performance_keys(client) == 0
+
+    records = {(p.dimension.card_network, p.provider): p.metrics.auth_rate for p in repo.iter_all()}
+    assert records == {
+        ("visa", PaymentProvider.STRIPE): 0.9,
+        ("visa", PaymentProvider.ADYEN): 0.9,
+        ("mastercard", PaymentProvider.STRIPE): 0.9,
+        ("amex", PaymentProvider.STRIPE): 0.9,
+    }
+    assert client.data["provider_health:stripe"] == b"down"
+    assert not any(key.startswith("{") for key in client.data)
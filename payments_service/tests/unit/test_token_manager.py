@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from payments_service.app.processors.token_manager import OAuthTokenManager
+
+class DictRedis:
+    """
+    Just enough of the redis client API for the token manager.
+    """
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+class CountingFetcher:
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.calls = 0
+        self.expires_in = expires_in
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return f"tok_{self.calls}", self.expires_in
+
+def test_concurrent_callers_refresh_once():
+    fetch = CountingFetcher(delay=0.05)
+    manager = OAuthTokenManager(fetch)
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        tokens = list(executor.map(lambda _: manager.get_token(), range(20)))
+
+    assert fetch.calls == 1
+    assert set(tokens) == {"tok_1"}
+    manager.close()
+
+def test_token_is_refreshed_ahead_of_expiry():
+    fetch = CountingFetcher(expires_in=1.0)
+    manager = OAuthTokenManager(fetch, expiry_margin_seconds=0, refresh_ahead_seconds=0.8)
+
+    assert manager.get_token() == "tok_1"
+    time.sleep(0.5)
+    # Refreshed by the background timer while tok_1 was still valid
+    assert fetch.calls >= 2
+    assert manager.get_token() != "tok_1"
+    manager.close()
+
+def test_token_is_shared_across_processes():
+    shared = DictRedis()
+    first_fetch, second_fetch = CountingFetcher(), CountingFetcher()
+    first = OAuthTokenManager(first_fetch, redis_client=shared, cache_key="oauth_token:test")
+    second = OAuthTokenManager(second_fetch, redis_client=shared, cache_key="oauth_token:test")
+
+    assert first.get_token() == second.get_token() == "tok_1"
+    assert (first_fetch.calls, second_fetch.calls) == (1, 0)
+    assert "oauth_token:test:lock" not in shared.data
+    first.close()
+    second.close()
+
+def test_waits_for_another_process_holding_the_lock():
+    shared = DictRedis()
+    # Another process holds the refresh lock and publishes its token shortly after
+    shared.set("oauth_token:test:lock", "1")
+    published = json.dumps({"access_token": "tok_other", "expires_at": time.time() + 3600})
+    threading.Timer(0.1, shared.set, args=("oauth_token:test", published)).start()
+
+    fetch = CountingFetcher()
+    waiter = OAuthTokenManager(fetch, redis_client=shared, cache_key="oauth_token:test")
+
+    assert waiter.get_token() == "tok_other"
+    assert fetch.calls == 0
+    waiter.close()